@@ -0,0 +1,59 @@
+import numpy as np
+
+"""Flight of batches of shells stored in NumPy arrays.
+
+The headless analyses of the flight of the shells, such as the range sweep in the menu and the validation
+of the maps, simulate many shells at once. They move the shells with the functions of this module, which
+repeat the explicit Euler step and the wall bounces of `Shell.update` on whole arrays, so that the analyses
+follow the same trajectories as the shells of the game and do not drift apart from it or from each other.
+"""
+
+
+def step_shells(x, y, vel_x, vel_y, wind, gravity, drag_coef, mass, step):
+    """Moves the shells by one step of the explicit Euler method, in the same way as `Shell.update`.
+
+    The walls of the world are not applied, see `bounce_shells`.
+
+    Args:
+        x (numpy.ndarray): Positions of the centers of the shells on the x axis.
+        y (numpy.ndarray): Positions of the centers of the shells on the y axis.
+        vel_x (numpy.ndarray): Velocities of the shells in the x axis.
+        vel_y (numpy.ndarray): Velocities of the shells in the y axis.
+        wind (float or numpy.ndarray): Wind acting on the shells.
+        gravity (float): Gravitational acceleration.
+        drag_coef (float): Drag coefficient of the shells.
+        mass (float): Mass of the shells.
+        step (float): Length of the step in seconds.
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray): The new positions and velocities
+            of the shells, in the order of the arguments.
+    """
+    x = x + vel_x * step
+    y = y + vel_y * step
+    vel_y = vel_y - gravity * step
+    air_vel_x = vel_x - wind
+    drag = drag_coef * np.hypot(air_vel_x, vel_y) / mass
+    return x, y, vel_x - air_vel_x * drag, vel_y - vel_y * drag
+
+
+def bounce_shells(x, y, vel_x, vel_y, world_size, shell_size):
+    """Bounces the shells off the left, right and top walls of the world in place, in the same way
+    as `Shell.update`.
+
+    Args:
+        x (numpy.ndarray): Positions of the centers of the shells on the x axis.
+        y (numpy.ndarray): Positions of the centers of the shells on the y axis.
+        vel_x (numpy.ndarray): Velocities of the shells in the x axis.
+        vel_y (numpy.ndarray): Velocities of the shells in the y axis.
+        world_size (float, float): Width and height of the world.
+        shell_size (float, float): Length and thickness of the shells.
+    """
+    world_width, world_height = world_size
+    half_width = shell_size[0] / 2
+    outside = (x < half_width) | (x > world_width - half_width)
+    vel_x[outside] *= -1
+    np.clip(x, half_width, world_width - half_width, out=x)
+    above = y + shell_size[1] / 2 > world_height
+    vel_y[above] *= -1
+    y[above] = world_height - shell_size[1] / 2
@@ -0,0 +1,160 @@
+from kivy.event import EventDispatcher
+from kivy.properties import NumericProperty, ReferenceListProperty, ObjectProperty, AliasProperty
+
+"""Camera looking at part of the map.
+
+Implements the camera that determines which part of the world is displayed on the screen.
+The camera can scroll across maps many screens wide, zoom in and out and smoothly follow a target,
+such as the shell in flight.
+
+The simulation works in world units, which do not depend on the size or resolution of the window.
+The camera scales the world to the window only when it is drawn, so that with zoom of 1
+the whole height of the world fits the height of the viewport on any display.
+
+Attributes:
+    MIN_ZOOM (float): Minimal zoom, 1 shows the whole height of the world.
+    MAX_ZOOM (float): Maximal zoom.
+    FOLLOW_SPEED (float): Speed the camera catches up with its target, in fractions of the distance per second.
+"""
+
+MIN_ZOOM = 1.0
+MAX_ZOOM = 8.0
+FOLLOW_SPEED = 4.0
+
+
+class Camera(EventDispatcher):
+    """Camera looking at the world.
+
+    The displayed part of the world starts at (`x`, `y`) in world coordinates
+    and spans `viewport_size` / `scale` world units.
+
+    Attributes:
+        x (NumericProperty): World x coordinate displayed at the left edge of the viewport.
+        y (NumericProperty): World y coordinate displayed at the bottom edge of the viewport.
+        zoom (NumericProperty): Magnification of the view, 1 shows the whole height of the world.
+        scale (AliasProperty): Number of screen pixels per world unit, given by the `zoom` and the size of the viewport.
+        viewport_size (ReferenceListProperty): Size of the viewport in screen pixels.
+        world_size (ReferenceListProperty): Size of the world in world units.
+        target (ObjectProperty): Point in world coordinates the camera follows, None if the camera is not following
+            anything.
+    """
+    x = NumericProperty(0)
+    y = NumericProperty(0)
+    zoom = NumericProperty(1)
+    viewport_width = NumericProperty(1)
+    viewport_height = NumericProperty(1)
+    viewport_size = ReferenceListProperty(viewport_width, viewport_height)
+    world_width = NumericProperty(1)
+    world_height = NumericProperty(1)
+    world_size = ReferenceListProperty(world_width, world_height)
+    target = ObjectProperty(None, allownone=True)
+
+    def get_scale(self):
+        """
+        Returns: Number of screen pixels per world unit.
+        """
+        return self.viewport_height / self.world_height * self.zoom
+
+    scale = AliasProperty(get_scale, None, bind=['viewport_size', 'world_size', 'zoom'])
+
+    def get_visible_rect(self):
+        """Returns the part of the world visible in the viewport.
+
+        Returns:
+            (float, float, float, float): min x, min y, max x, max y of the visible part of the world.
+        """
+        return self.x, self.y, self.x + self.viewport_width / self.scale, self.y + self.viewport_height / self.scale
+
+    def to_world(self, point):
+        """Transforms the `point` from viewport coordinates to world coordinates.
+
+        Args:
+            point (float, float): Point in the viewport coordinates.
+
+        Returns:
+            (float, float): The point in world coordinates.
+        """
+        return self.x + point[0] / self.scale, self.y + point[1] / self.scale
+
+    def look_at(self, point):
+        """Immediately centers the view at the `point`.
+
+        Args:
+            point (float, float): Point in world coordinates to center the view at.
+        """
+        self._move_to(point[0] - self.viewport_width / self.scale / 2,
+                      point[1] - self.viewport_height / self.scale / 2)
+
+    def follow(self, target):
+        """Starts smoothly following the `target`.
+
+        Args:
+            target (float, float): Point in world coordinates to follow, None stops the following.
+        """
+        self.target = target
+
+    def update(self, dt):
+        """Moves the camera towards the `target`.
+
+        Args:
+            dt (float): Time elapsed since the last update.
+        """
+        if self.target is None:
+            return
+        step = min(dt * FOLLOW_SPEED, 1)
+        goal_x = self.target[0] - self.viewport_width / self.scale / 2
+        goal_y = self.target[1] - self.viewport_height / self.scale / 2
+        self._move_to(self.x + (goal_x - self.x) * step, self.y + (goal_y - self.y) * step)
+
+    def pan(self, dx, dy):
+        """Moves the view by (`dx`, `dy`) screen pixels and stops following the target.
+
+        Args:
+            dx (float): Movement on the x axis in screen pixels.
+            dy (float): Movement on the y axis in screen pixels.
+        """
+        self.target = None
+        self._move_to(self.x + dx / self.scale, self.y + dy / self.scale)
+
+    def zoom_by(self, factor, anchor):
+        """Changes the zoom by `factor`, keeping the `anchor` at the same place on the screen.
+
+        Args:
+            factor (float): Multiplier of the current zoom.
+            anchor (float, float): Point in the viewport coordinates that should not move.
+        """
+        world_anchor = self.to_world(anchor)
+        self.zoom = max(min(self.zoom * factor, MAX_ZOOM), MIN_ZOOM)
+        self._move_to(world_anchor[0] - anchor[0] / self.scale, world_anchor[1] - anchor[1] / self.scale)
+
+    def reset(self):
+        """Zooms out as far as possible and moves the view to the bottom left corner of the world.
+        """
+        self.target = None
+        self.zoom = MIN_ZOOM
+        self._move_to(0, 0)
+
+    def on_scale(self, instance, value):
+        """Keeps the view inside the world when the scale changes, e.g. when the window is resized.
+        """
+        self._move_to(self.x, self.y)
+
+    def _move_to(self, x, y):
+        """Moves the view to (`x`, `y`), keeping it inside the world.
+
+        If the world is smaller than the view on some axis, the world is centered on that axis.
+
+        Args:
+            x (float): The new world x coordinate of the left edge of the view.
+            y (float): The new world y coordinate of the bottom edge of the view.
+        """
+        view_w = self.viewport_width / self.scale
+        view_h = self.viewport_height / self.scale
+        if view_w >= self.world_width:
+            self.x = (self.world_width - view_w) / 2
+        else:
+            self.x = max(min(x, self.world_width - view_w), 0)
+        if view_h >= self.world_height:
+            self.y = 0
+        else:
+            self.y = max(min(y, self.world_height - view_h), 0)
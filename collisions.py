@@ -22,6 +22,8 @@ class Rectangle:
         self.size = size
         self.bl_offset = bl_offset
         self.rotation = rotation
+        # rectangles are tested against many segments, so the vertexes are computed only once
+        self._vertexes = None
 
     def get_bl(self):
         return self.get_local_bl() + self.center
@@ -60,16 +62,16 @@ class Rectangle:
         return self.bl_offset + self.size
 
     def get_vertexes(self):
-        yield self.get_bl()
-        yield self.get_br()
-        yield self.get_tr()
-        yield self.get_tl()
+        if self._vertexes is None:
+            self._vertexes = (self.get_bl(), self.get_br(), self.get_tr(), self.get_tl())
+        return self._vertexes
 
     def get_sides(self):
-        yield self.get_bl(), self.get_br()
-        yield self.get_br(), self.get_tr()
-        yield self.get_tr(), self.get_tl()
-        yield self.get_tl(), self.get_bl()
+        bl, br, tr, tl = self.get_vertexes()
+        yield bl, br
+        yield br, tr
+        yield tr, tl
+        yield tl, bl
 
     def get_bbox(self):
         x = [vert.x for vert in self.get_vertexes()]
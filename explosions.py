@@ -0,0 +1,177 @@
+import math
+
+"""Batched application of explosions to the terrain.
+
+When several shells detonate in the same frame, their craters often overlap. Instead of removing the terrain
+circle by circle, rewalking the overlapping columns for each explosion, the explosions are collected
+in an `ExplosionQueue`. The circles are then merged per column into a union of intervals of removed terrain,
+which is subtracted from the segments of each column in a single pass.
+
+Repeated explosions in the same area split the columns into ever more segments, many of them thin slivers
+separated by tiny gaps. The changed columns are therefore compacted after the subtraction, see `compact_transitions`,
+so that the number of transitions of a column, which every collision check and redraw walks, stays bounded.
+
+Attributes:
+    MIN_SPAN (float): Default minimal thickness of a segment and of a gap between segments, in world units.
+    MAX_SEGMENTS (int): Default maximal number of segments of a column.
+"""
+
+MIN_SPAN = 1.0
+MAX_SEGMENTS = 16
+
+
+def get_removal_intervals(circles, width):
+    """Merges the `circles` into intervals of removed terrain per column.
+
+    Args:
+        circles (list of Circle): The circles of removed terrain.
+        width (int): Number of columns of the terrain, columns outside the terrain are ignored.
+
+    Returns:
+        dict of (int, list of (float, float)): Sorted disjoint intervals of y coordinates to remove
+            for each affected column.
+    """
+    per_column = {}
+    for circle in circles:
+        c_x, c_y, r = circle.pos.x, circle.pos.y, circle.r
+        for x in range(max(math.floor(c_x - r), 0), min(math.ceil(c_x + r) + 1, width)):
+            dist = r * r - (x - c_x) ** 2
+            if dist < 0:
+                continue
+            half = math.sqrt(dist)
+            per_column.setdefault(x, []).append((c_y - half, c_y + half))
+
+    for x, intervals in per_column.items():
+        if len(intervals) == 1:
+            continue
+        intervals.sort()
+        merged = [intervals[0]]
+        for low, high in intervals[1:]:
+            if low <= merged[-1][1]:
+                if high > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], high)
+            else:
+                merged.append((low, high))
+        per_column[x] = merged
+    return per_column
+
+
+def subtract_intervals(transitions, intervals):
+    """Removes the `intervals` from the solid segments given by `transitions`.
+
+    Args:
+        transitions (list of float): Transitions between empty space and solid ground of a column,
+            see `TerrainModel.solid_parts`.
+        intervals (list of (float, float)): Sorted disjoint intervals to remove.
+
+    Returns:
+        list of float: The transitions of the remaining solid ground.
+    """
+    result = []
+    j = 0
+    for i in range(0, len(transitions), 2):
+        bot, top = transitions[i], transitions[i + 1]
+        # intervals below the segment can not affect this or any higher segment
+        while j < len(intervals) and intervals[j][1] <= bot:
+            j += 1
+        current = bot
+        while j < len(intervals) and intervals[j][0] < top:
+            low, high = intervals[j]
+            if low > current:
+                result.append(current)
+                result.append(low)
+            current = max(current, high)
+            if high >= top:
+                # the interval may reach into the next segment
+                break
+            j += 1
+        if current < top:
+            result.append(current)
+            result.append(top)
+    return result
+
+
+def compact_transitions(transitions, min_span=MIN_SPAN, max_segments=MAX_SEGMENTS):
+    """Drops the thin segments of a column and merges the segments separated by thin gaps.
+
+    Segments thinner than `min_span` are removed, then the segments separated by gaps thinner than `min_span`
+    are merged. If the column still has more than `max_segments` segments, the narrowest gaps are filled
+    until it has `max_segments` segments.
+
+    Args:
+        transitions (list of float): Transitions of the column, see `TerrainModel.solid_parts`.
+        min_span (float): Minimal thickness of a segment and of a gap.
+        max_segments (int): Maximal number of segments.
+
+    Returns:
+        list of float: The compacted transitions, `transitions` itself if nothing changed.
+    """
+    result = []
+    for i in range(0, len(transitions), 2):
+        bot, top = transitions[i], transitions[i + 1]
+        if top - bot < min_span:
+            continue
+        if len(result) != 0 and bot - result[-1] < min_span:
+            result[-1] = top
+        else:
+            result.append(bot)
+            result.append(top)
+
+    while len(result) > 2 * max_segments:
+        # fill the narrowest gap, i.e. drop the transitions on both of its sides
+        gap = min(range(1, len(result) - 1, 2), key=lambda i: result[i + 1] - result[i])
+        del result[gap:gap + 2]
+
+    return result if len(result) != len(transitions) else transitions
+
+
+class ExplosionQueue:
+    """Collects explosions and applies them to the terrain at once.
+
+    Attributes:
+        circles (list of Circle): The queued explosions.
+        min_span (float): Minimal thickness of the segments and the gaps left by the explosions,
+            see `compact_transitions`.
+        max_segments (int): Maximal number of segments of a column left by the explosions.
+    """
+
+    def __init__(self, min_span=MIN_SPAN, max_segments=MAX_SEGMENTS):
+        """
+        Args:
+            min_span (float): Minimal thickness of the segments and the gaps left by the explosions.
+            max_segments (int): Maximal number of segments of a column left by the explosions.
+        """
+        self.circles = []
+        self.min_span = min_span
+        self.max_segments = max_segments
+
+    def __len__(self):
+        return len(self.circles)
+
+    def add(self, circle):
+        """Queues the explosion.
+
+        Args:
+            circle (Circle): Circle of the terrain to remove.
+        """
+        self.circles.append(circle)
+
+    def apply(self, terrain):
+        """Removes the terrain in all the queued explosions and clears the queue.
+
+        Args:
+            terrain (TerrainModel): The terrain to remove the explosions from.
+
+        Returns:
+            (int, int) or None: The range of x coordinates of the changed columns, None if nothing changed.
+        """
+        if len(self.circles) == 0:
+            return None
+        per_column = get_removal_intervals(self.circles, terrain.width)
+        self.circles = []
+        if len(per_column) == 0:
+            return None
+        columns = {x: compact_transitions(subtract_intervals(terrain.solid_parts[x], intervals),
+                                          self.min_span, self.max_segments)
+                   for x, intervals in per_column.items()}
+        return terrain.set_columns(columns)
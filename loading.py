@@ -0,0 +1,138 @@
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+from kivy.uix.screenmanager import ScreenManager
+
+"""Lazy construction of the screens and background loading of the images.
+
+To show the menu as soon as possible, only the menu screen is built when the application starts. The other
+screens are built by the `LazyScreenManager` when they are first used, and the images are loaded by the
+`BackgroundLoader` one per frame after the menu appears, before the first level needs them.
+
+The sprites of the game are packed into a single atlas, `game.atlas` with the image `game-0.png`, so that they
+are loaded from one file into one texture. The atlas is built from the individual images with
+`python -m kivy.atlas game 512x128 tank.png gunbarrel.png shell.png`, the sprites are then
+referred to as `atlas://game/<name of the image>`. The background of the terrain is stretched over the whole world,
+so it is not in the atlas, where its edges would be blended with the neighbouring sprites.
+
+Attributes:
+    ATLAS (str): Name of the atlas of the sprites.
+    TANK_SOURCE (str): Image of the tank body.
+    GUN_BARREL_SOURCE (str): Image of the gun barrel.
+    SHELL_SOURCE (str): Image of the shell.
+    BACKGROUND_SOURCE (str): Image of the background of the terrain, which is not in the atlas.
+    ICON_SOURCE (str): Icon of the application, which is not in the atlas as it is also used for the window.
+"""
+
+ATLAS = 'game'
+TANK_SOURCE = f'atlas://{ATLAS}/tank'
+GUN_BARREL_SOURCE = f'atlas://{ATLAS}/gunbarrel'
+SHELL_SOURCE = f'atlas://{ATLAS}/shell'
+BACKGROUND_SOURCE = 'singlecolor.png'
+ICON_SOURCE = 'tank_icon.png'
+
+
+class LazyScreenManager(ScreenManager):
+    """Screen manager which builds the screens when they are first used.
+
+    A lazy screen is built when it is got by `get_screen`, e.g. when it becomes the current screen.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: Arguments passed to the super constructor.
+        """
+        super().__init__(**kwargs)
+        self._factories = {}
+
+    def add_lazy_screen(self, name, factory):
+        """Adds a screen which is built on its first use.
+
+        Args:
+            name (str): Name of the screen.
+            factory (callable): Called with the `name` to build the screen.
+        """
+        self._factories[name] = factory
+
+    def get_screen(self, name):
+        """Returns the screen, building it if it was not built yet.
+
+        Args:
+            name (str): Name of the screen.
+
+        Returns:
+            Screen: The screen.
+        """
+        factory = self._factories.pop(name, None)
+        if factory is not None:
+            self.add_widget(factory(name))
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        """Checks if the manager has the screen, built or not.
+
+        Args:
+            name (str): Name of the screen.
+
+        Returns:
+            bool: True if the manager has the screen.
+        """
+        return name in self._factories or super().has_screen(name)
+
+
+class BackgroundLoader:
+    """Runs the loading tasks one per frame, so that the UI keeps responding while they run.
+
+    Attributes:
+        images (list of CoreImage): The loaded images, kept so that their textures stay in the memory.
+    """
+
+    def __init__(self):
+        self.images = []
+        self._tasks = []
+        self._event = None
+        self._on_done = None
+
+    def add_task(self, task):
+        """Adds a task run in one of the following frames.
+
+        Args:
+            task (callable): Called with no arguments.
+        """
+        self._tasks.append(task)
+
+    def add_image(self, source):
+        """Adds the loading of an image, loading one image of an atlas loads the whole atlas.
+
+        Args:
+            source (str): The image.
+        """
+        self.add_task(lambda: self.images.append(CoreImage(source)))
+
+    def start(self, on_done=None):
+        """Starts running the tasks, one per frame.
+
+        Args:
+            on_done (callable, optional): Called with no arguments when all the tasks are done.
+        """
+        self._on_done = on_done
+        if self._event is None:
+            self._event = Clock.schedule_interval(self._run_next, 0)
+
+    def _run_next(self, dt):
+        """Runs the next task.
+
+        Args:
+            dt (float): Time elapsed since the last call of this method.
+
+        Returns:
+            bool: False when all the tasks are done, which unschedules this method.
+        """
+        if len(self._tasks) != 0:
+            self._tasks.pop(0)()
+        if len(self._tasks) != 0:
+            return True
+        self._event = None
+        if self._on_done is not None:
+            self._on_done()
+        return False
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import queue
+import threading
+
+"""Lockstep network games.
+
+The game simulation is deterministic, see `state_hash`, so the peers of a network game do not exchange the state
+of the game. They only exchange the setup of the level, which includes the seed, and the inputs of the players,
+the power and angle of each shot. Every peer runs the whole simulation locally. After every turn, the peers send
+the hash of their state to the host, which compares them with its own hashes and reports the peers that desynced.
+
+The peers are connected to the host in a star, the host relays the messages of each peer to the other peers.
+All messages are single lines of JSON. The host keeps the log of the setup and the inputs of the current level,
+a peer joining during the level receives the whole log and catches up by replaying it.
+
+Each message is a dict with the `type` key:
+
+- ``welcome``: sent by the host to a new peer, `peer` is the id of the peer.
+- ``setup``: the settings of a new level, `settings` are the game settings including the seed,
+  `peers` is the number of peers controlling the players, `level` is the number of the level, counted by the host.
+- ``input``: the shot of the player `player`, with the index `player_idx` in the players of the level,
+  in the turn `turn`, with `power` and `angle`. The host only relays the inputs of the players the sending peer
+  controls, at most one per player and turn.
+- ``hash``: the hash `hash` of the state of the peer at the start of the turn `turn` of the level `level`.
+  The host ignores the hashes of the other levels, e.g. a hash of the previous level which arrived late.
+- ``desync``: sent by the host to a peer whose hash of the turn `turn` differs from the hash of the host.
+
+Attributes:
+    DEFAULT_PORT (int): Port the host listens on by default.
+    HOST_PEER_ID (int): Id of the host peer, each other peer gets the lowest free id from 1 up when it joins.
+"""
+
+DEFAULT_PORT = 47100
+HOST_PEER_ID = 0
+
+
+def encode(message):
+    """Encodes the `message` into a line of JSON.
+
+    Args:
+        message (dict): The message.
+
+    Returns:
+        bytes: The encoded message, including the end of the line.
+    """
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line):
+    """Decodes a message from a line of JSON.
+
+    Args:
+        line (bytes): The line, with or without the end of the line.
+
+    Returns:
+        dict: The message.
+    """
+    return json.loads(line.decode())
+
+
+def controls_player(peer_id, peers, player_idx):
+    """Checks if the peer controls the player.
+
+    The players are assigned to the peers in turns, the host controls the first player, the first peer
+    the second player etc. A peer which joined after the level was set up, i.e. whose id is not lower than
+    `peers`, controls no player and only watches the level.
+
+    Args:
+        peer_id (int): Id of the peer.
+        peers (int): Number of peers controlling the players.
+        player_idx (int): Index of the player in the list of the players the level started with.
+
+    Returns:
+        bool: True if the peer controls the player.
+    """
+    return peer_id < peers and player_idx % peers == peer_id
+
+
+class LockstepHost:
+    """Hosts a network game, relaying the messages of the peers.
+
+    The host is a peer too, its own messages are sent by `send`, the messages of the other peers are put
+    into `messages`.
+
+    Attributes:
+        peer_id (int): Id of this peer.
+        messages (queue.Queue): Messages received from the other peers.
+        desynced (dict of (int, int)): The first turn each desynced peer desynced in.
+    """
+
+    def __init__(self, host='0.0.0.0', port=DEFAULT_PORT):
+        """
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 for any free port.
+        """
+        self.peer_id = HOST_PEER_ID
+        self.messages = queue.Queue()
+        self.desynced = {}
+        self._address = (host, port)
+        self._server = None
+        self._writers = {}
+        # the setup and the inputs of the current level
+        self._log = []
+        # number of the peers controlling the players of the current level and the turns and players of its inputs
+        self._level_peers = None
+        self._inputs = set()
+        # number of the current level and the hashes of the host and of the other peers in it by turn
+        self._level = None
+        self._hashes = {}
+        self._peer_hashes = {}
+
+    @property
+    def peers(self):
+        """int: Number of the connected peers, including the host."""
+        return len(self._writers) + 1
+
+    @property
+    def port(self):
+        """int: The port the host listens on."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        """Starts listening for the peers.
+        """
+        self._server = await asyncio.start_server(self._handle_peer, *self._address)
+
+    def close(self):
+        """Disconnects all peers and stops listening.
+        """
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        if self._server is not None:
+            self._server.close()
+
+    def send(self, message):
+        """Sends the message of the host to all the peers.
+
+        Args:
+            message (dict): The message.
+        """
+        if message['type'] == 'setup':
+            self._log = []
+            self._level_peers = message['peers']
+            self._inputs = set()
+            self._level = message['level']
+            self._hashes = {}
+            # the connected peers keep their dicts, which `_on_message` adds their hashes to
+            for hashes in self._peer_hashes.values():
+                hashes.clear()
+            self.desynced = {}
+        if message['type'] == 'hash':
+            self._hashes[message['turn']] = message['hash']
+            for peer_id, hashes in self._peer_hashes.items():
+                if message['turn'] in hashes:
+                    self._check_hash(peer_id, message['turn'], hashes.pop(message['turn']))
+            return
+        if message['type'] == 'input':
+            self._inputs.add((message['turn'], message['player_idx']))
+        self._log.append(message)
+        self._broadcast(message)
+
+    async def _handle_peer(self, reader, writer):
+        """Serves one connected peer.
+        """
+        # a peer reconnecting after it dropped out gets its id back and controls its players again
+        peer_id = HOST_PEER_ID + 1
+        while peer_id in self._writers:
+            peer_id += 1
+        writer.write(encode({'type': 'welcome', 'peer': peer_id}))
+        # the joining peer catches up by replaying the log
+        for message in self._log:
+            writer.write(encode(message))
+        self._writers[peer_id] = writer
+        self._peer_hashes[peer_id] = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                self._on_message(peer_id, decode(line))
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.pop(peer_id, None)
+            self._peer_hashes.pop(peer_id, None)
+            writer.close()
+
+    def _on_message(self, peer_id, message):
+        """Handles the message received from the peer.
+        """
+        if message['type'] == 'hash':
+            if message['level'] != self._level:
+                return
+            if message['turn'] in self._hashes:
+                self._check_hash(peer_id, message['turn'], message['hash'])
+            else:
+                self._peer_hashes[peer_id][message['turn']] = message['hash']
+            return
+        if message['type'] == 'input':
+            key = (message['turn'], message['player_idx'])
+            # a peer can only fire for its own players, once per turn
+            if (self._level_peers is None or not controls_player(peer_id, self._level_peers, message['player_idx'])
+                    or key in self._inputs):
+                return
+            self._inputs.add(key)
+            self._log.append(message)
+            self._broadcast(message, exclude=peer_id)
+            self.messages.put(message)
+
+    def _check_hash(self, peer_id, turn, value):
+        """Reports the peer to itself and to the host if its hash differs from the hash of the host.
+        """
+        if value == self._hashes[turn] or peer_id in self.desynced:
+            return
+        self.desynced[peer_id] = turn
+        message = {'type': 'desync', 'turn': turn, 'peer': peer_id}
+        if peer_id in self._writers:
+            self._writers[peer_id].write(encode(message))
+        self.messages.put(message)
+
+    def _broadcast(self, message, exclude=None):
+        data = encode(message)
+        for peer_id, writer in self._writers.items():
+            if peer_id != exclude:
+                writer.write(data)
+
+
+class LockstepClient:
+    """Peer of a network game connected to a host.
+
+    Attributes:
+        peer_id (int): Id of this peer, None until the host welcomes the peer.
+        messages (queue.Queue): Messages received from the host.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT):
+        """
+        Args:
+            host (str): Address of the host.
+            port (int): Port of the host.
+        """
+        self.peer_id = None
+        self.messages = queue.Queue()
+        self._address = (host, port)
+        self._writer = None
+        self._task = None
+
+    async def connect(self):
+        """Connects to the host and waits for the welcome.
+        """
+        reader, self._writer = await asyncio.open_connection(*self._address)
+        welcome = decode(await reader.readline())
+        self.peer_id = welcome['peer']
+        self._task = asyncio.ensure_future(self._receive(reader))
+
+    def close(self):
+        """Disconnects from the host.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def send(self, message):
+        """Sends the message to the host.
+
+        Args:
+            message (dict): The message.
+        """
+        if self._writer is not None:
+            self._writer.write(encode(message))
+
+    async def _receive(self, reader):
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                self.messages.put(decode(line))
+        except ConnectionError:
+            pass
+
+
+class NetworkThread:
+    """Runs a peer of a network game in its own thread with an asyncio loop.
+
+    The game, running in the main thread, sends the messages through `send` and reads the received messages
+    from `messages`.
+
+    Attributes:
+        peer (LockstepHost or LockstepClient): The peer.
+    """
+
+    def __init__(self, peer):
+        """
+        Args:
+            peer (LockstepHost or LockstepClient): The peer to run.
+        """
+        self.peer = peer
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    @property
+    def peer_id(self):
+        """int: Id of the peer."""
+        return self.peer.peer_id
+
+    @property
+    def is_host(self):
+        """bool: True if the peer hosts the game."""
+        return isinstance(self.peer, LockstepHost)
+
+    @property
+    def messages(self):
+        """queue.Queue: Messages received by the peer."""
+        return self.peer.messages
+
+    def start(self, timeout=10):
+        """Starts the thread and the peer, waiting until the peer is started or connected.
+
+        Args:
+            timeout (float): Maximal time to wait in seconds.
+        """
+        self._thread.start()
+        start = self.peer.start() if self.is_host else self.peer.connect()
+        asyncio.run_coroutine_threadsafe(start, self._loop).result(timeout)
+
+    def send(self, message):
+        """Sends the message from the thread of the peer.
+
+        Args:
+            message (dict): The message.
+        """
+        self._loop.call_soon_threadsafe(self.peer.send, message)
+
+    def get_peers(self):
+        """Returns the number of the peers connected to the host.
+
+        Returns:
+            int: The number of the peers, including the host.
+        """
+        return asyncio.run_coroutine_threadsafe(self._get_peers(), self._loop).result()
+
+    async def _get_peers(self):
+        return self.peer.peers
+
+    def close(self):
+        """Closes the peer and stops the thread.
+        """
+        self._loop.call_soon_threadsafe(self.peer.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,152 @@
+import struct
+import zlib
+from itertools import chain
+
+import numpy as np
+
+"""Offscreen rendering of the map into images.
+
+Renders the terrain, the tanks and the traces of the shells into an RGB array without any window or GL context,
+e.g. for thumbnails of replays and saved maps or for comparing maps in headless runs. The terrain is rendered
+for all the columns of the image at once: the segments of the sampled world columns are turned into +1/-1
+marks at their bottom/top pixel rows and the marks are summed up the rows, which fills the segments, and
+the colors of the image are then looked up from the resulting mask.
+
+Attributes:
+    BACKGROUND_COLOR (float, float, float, float): Default color of the empty space.
+    TERRAIN_COLOR (float, float, float, float): Default color of the terrain.
+"""
+
+BACKGROUND_COLOR = (0, 0, 0, 1)
+TERRAIN_COLOR = (1, 1, 1, 1)
+
+
+def to_rgb(color):
+    """Converts a Kivy color to an RGB triplet.
+
+    Args:
+        color (float, float, float, float): The color with components from 0 to 1, alpha is ignored.
+
+    Returns:
+        numpy.ndarray: The color as 3 bytes.
+    """
+    return np.array([round(component * 255) for component in color[:3]], dtype=np.uint8)
+
+
+def rasterize_terrain(solid_parts, world_size, image_size):
+    """Computes which pixels of the image are covered by the terrain.
+
+    Each pixel column shows the world column under its center.
+
+    Args:
+        solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        world_size (float, float): Width and height of the world shown in the image.
+        image_size (int, int): Width and height of the image in pixels.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the terrain pixels, with rows from the bottom of the world up.
+    """
+    width, height = image_size
+    if len(solid_parts) == 0:
+        return np.zeros((height, width), dtype=bool)
+    scale_x = world_size[0] / width
+    scale_y = height / world_size[1]
+    world_x = ((np.arange(width) + 0.5) * scale_x).astype(np.int64)
+    world_x = world_x[world_x < len(solid_parts)]
+
+    lengths = np.fromiter((len(solid_parts[x]) for x in world_x), dtype=np.int64, count=len(world_x))
+    transitions = np.fromiter(chain.from_iterable(solid_parts[x] for x in world_x), dtype=np.float64,
+                              count=int(lengths.sum()))
+    # pixel column of each segment
+    columns = np.repeat(np.arange(len(world_x)), lengths // 2)
+    rows = np.clip(np.rint(transitions * scale_y), 0, height).astype(np.intp)
+    # the segments of a column do not overlap, so the marks of a pixel sum up to -1, 0 or 1 and fit into bytes,
+    # which keeps the cumulative sum cheap
+    marks = np.zeros((height + 1, width), dtype=np.int8)
+    flat_marks = marks.ravel()
+    for sign, cells in ((1, rows[0::2] * width + columns), (-1, rows[1::2] * width + columns)):
+        cells, counts = np.unique(cells, return_counts=True)
+        flat_marks[cells] += sign * counts.astype(np.int8)
+    # the marks of the row above the image only close the segments reaching the top
+    marks = marks[:height]
+    np.cumsum(marks, axis=0, out=marks)
+    return marks > 0
+
+
+def render_map(solid_parts, world_size, image_size, players=(), background=BACKGROUND_COLOR,
+               terrain_color=TERRAIN_COLOR):
+    """Renders the map into an RGB image.
+
+    Args:
+        solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        world_size (float, float): Width and height of the world shown in the image.
+        image_size (int, int): Width and height of the image in pixels.
+        players (list of Player): Players whose tanks and traces are drawn, in their colors.
+        background (float, float, float, float): Color of the empty space.
+        terrain_color (float, float, float, float): Color of the terrain.
+
+    Returns:
+        numpy.ndarray: The image, of shape (height, width, 3), with the top row first.
+    """
+    width, height = image_size
+    scale_x = width / world_size[0]
+    scale_y = height / world_size[1]
+    # the world y axis points up, the rows of the image go down
+    terrain = rasterize_terrain(solid_parts, world_size, image_size)[::-1]
+    palette = np.stack([to_rgb(background), to_rgb(terrain_color)])
+    image = np.take(palette, terrain.view(np.uint8), axis=0)
+
+    for player in players:
+        color = to_rgb(player.color)
+        for trace in player.traces:
+            if len(trace.points) == 0:
+                continue
+            points = np.array(trace.points, dtype=np.float64)
+            xs = (points[:, 0] * scale_x).astype(np.int64)
+            ys = (points[:, 1] * scale_y).astype(np.int64)
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            image[height - 1 - ys[inside], xs[inside]] = color
+        tank = player.tank
+        if tank is None:
+            continue
+        # the tank is drawn as the box the shells collide with, its body and barrel
+        box_min_x, box_min_y, box_max_x, box_max_y = tank.get_collision_bbox()
+        # the box is clipped to the image, a negative index would wrap around
+        min_x, max_x = np.clip((int(box_min_x * scale_x), int(box_max_x * scale_x) + 1), 0, width)
+        min_y, max_y = np.clip((int(box_min_y * scale_y), int(box_max_y * scale_y) + 1), 0, height)
+        image[height - max_y:height - min_y, min_x:max_x] = color
+
+    return image
+
+
+def encode_png(image):
+    """Encodes the RGB image as PNG.
+
+    Args:
+        image (numpy.ndarray): The image of shape (height, width, 3) of bytes, with the top row first.
+
+    Returns:
+        bytes: The PNG file.
+    """
+    height, width, _ = image.shape
+    # each row is prefixed with the filter type, 0 for no filter
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def save_png(path, image):
+    """Saves the RGB image as a PNG file.
+
+    Args:
+        path (str): Path of the file.
+        image (numpy.ndarray): The image, see `encode_png`.
+    """
+    with open(path, 'wb') as file:
+        file.write(encode_png(image))
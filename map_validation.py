@@ -0,0 +1,191 @@
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+from ballistics import bounce_shells, step_shells
+
+"""Validation of the playability of the generated maps.
+
+A generated map can leave a tank unable to hit any other tank, e.g. when it is walled in by high mountains
+or when the other tanks are out of its range with the chosen physics. The `MapValidator` checks the map
+in a worker process, firing a batch of shells from every tank at many angles and powers, with no wind and
+with the strongest wind of a turn in both directions. All the shells of all the tanks are simulated at once, with
+the same Euler steps and wall bounces as the game, see `ballistics`. A freshly generated terrain has a single
+segment in each column, so a shell hits the terrain when it gets below the skyline of its column.
+
+A tank can hit another tank if any of its shells lands close enough to the other tank to damage it.
+The validation runs in the background while the caller polls it, e.g. once per frame. It is limited by a time
+budget, a map whose validation does not finish in time is accepted and the worker process still validating it
+is terminated, so that the next validation does not wait for it.
+
+The worker process is spawned, not forked, so that it does not inherit the window and the threads of the game.
+A spawned process imports the main module of its parent, which would open another window when the main module
+is the game, so the worker is started with this module, which does not import Kivy, as its main module.
+
+Attributes:
+    VALIDATION_ANGLES (int): Number of angles each tank fires at, spread over the whole upper half circle.
+    VALIDATION_POWERS (int): Number of powers each tank fires with, spread up to the full power.
+    MAX_VALIDATION_STEPS (int): Steps after which the shells still in flight are not simulated further.
+"""
+
+VALIDATION_ANGLES = 61
+VALIDATION_POWERS = 8
+MAX_VALIDATION_STEPS = 60 * 20
+
+
+def find_unreachable(tops, muzzles, targets, world_size, physics, step):
+    """Finds the tanks that can not hit any other tank.
+
+    Args:
+        tops (list of float): Top of the terrain in each column, see `Skyline.tops`.
+        muzzles (list of (float, float)): Positions the shells of each tank are fired from.
+        targets (list of (float, float)): Centers of the tanks.
+        world_size (float, float): Size of the world, the shells bounce off its walls.
+        physics (dict): The `gravity`, `max_muzzle_shell_vel`, `drag_coef`, `max_wind`, `explosion_radius`,
+            `shell_mass` and `shell_size` of the game.
+        step (float): Time step of the simulation of the shells, see `projectiles.STEP`.
+
+    Returns:
+        list of int: Indexes of the tanks which can not hit any other tank.
+    """
+    tops = np.asarray(tops, dtype=np.float64)
+    # the wind of a turn is at most half of the maximum, see `Game._generate_wind`
+    winds = (0, physics['max_wind'] / 2, -physics['max_wind'] / 2)
+    angles = np.radians(np.linspace(1, 179, VALIDATION_ANGLES))
+    powers = np.linspace(1 / VALIDATION_POWERS, 1, VALIDATION_POWERS)
+    # one shell for each tank, wind, angle and power
+    tank, wind, angle, power = (grid.ravel() for grid in np.meshgrid(np.arange(len(muzzles)), winds, angles, powers,
+                                                                       indexing='ij'))
+    muzzles = np.asarray(muzzles, dtype=np.float64)
+    x = muzzles[tank, 0].copy()
+    y = muzzles[tank, 1].copy()
+    speed = physics['max_muzzle_shell_vel'] * power
+    vel_x = speed * np.cos(angle)
+    vel_y = speed * np.sin(angle)
+
+    landing_x = np.full_like(x, np.nan)
+    landing_y = np.full_like(x, np.nan)
+    flying = np.arange(len(x))
+    for _ in range(MAX_VALIDATION_STEPS):
+        if len(flying) == 0:
+            break
+        fx, fy, fvx, fvy = step_shells(x[flying], y[flying], vel_x[flying], vel_y[flying], wind[flying],
+                                       physics['gravity'], physics['drag_coef'], physics['shell_mass'], step)
+        bounce_shells(fx, fy, fvx, fvy, world_size, physics['shell_size'])
+
+        columns = np.clip(fx.astype(np.int64), 0, len(tops) - 1)
+        hit = (fy <= tops[columns]) | (fy < 0)
+        x[flying], y[flying], vel_x[flying], vel_y[flying] = fx, fy, fvx, fvy
+        landed = flying[hit]
+        landing_x[landed] = fx[hit]
+        landing_y[landed] = fy[hit]
+        flying = flying[~hit]
+
+    landed = ~np.isnan(landing_x)
+    reach = physics['explosion_radius']
+    unreachable = []
+    for idx in range(len(muzzles)):
+        own = landed & (tank == idx)
+        hits = False
+        for other, (target_x, target_y) in enumerate(targets):
+            if other == idx:
+                continue
+            if np.any(np.hypot(landing_x[own] - target_x, landing_y[own] - target_y) <= reach):
+                hits = True
+                break
+        if not hits:
+            unreachable.append(idx)
+    return unreachable
+
+
+def _start_pool():
+    """Spawns the worker process with this module as its main module.
+
+    Returns:
+        multiprocessing.pool.Pool: The pool of the single worker process.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = sys.modules[__name__]
+    try:
+        return get_context('spawn').Pool(processes=1)
+    finally:
+        sys.modules['__main__'] = main
+
+
+class MapValidator:
+    """Validates the maps in a worker process, without blocking the caller.
+
+    Attributes:
+        budget (float): Time in seconds a validation may take.
+    """
+
+    def __init__(self, budget):
+        """
+        Args:
+            budget (float): Time in seconds a validation may take.
+        """
+        self.budget = budget
+        self._pool = None
+        self._result = None
+        self._deadline = 0
+
+    @property
+    def running(self):
+        """bool: True if a validation was started and its result was not polled yet."""
+        return self._result is not None
+
+    def start(self, tops, muzzles, targets, world_size, physics, step, budget=None):
+        """Starts checking if every tank can hit at least one other tank, see `find_unreachable`.
+
+        The validation in progress, if any, is cancelled.
+
+        Args:
+            budget (float, optional): Time in seconds the validation may take, `budget` by default.
+        """
+        self.cancel()
+        if self._pool is None:
+            self._pool = _start_pool()
+        self._result = self._pool.apply_async(find_unreachable, (list(tops), muzzles, targets, tuple(world_size),
+                                                                 physics, step))
+        self._deadline = time.perf_counter() + (self.budget if budget is None else max(budget, 0))
+
+    def poll(self):
+        """Checks if the validation finished.
+
+        A validation which did not finish within its budget is cancelled.
+
+        Returns:
+            bool: None if the validation is still in progress or none was started, False if some tank can not hit
+                any other tank, True if all can or the validation did not finish in time.
+        """
+        if self._result is None:
+            return None
+        if self._result.ready():
+            result = self._result
+            self._result = None
+            return len(result.get()) == 0
+        if time.perf_counter() < self._deadline:
+            return None
+        self.cancel()
+        return True
+
+    def cancel(self):
+        """Cancels the validation in progress.
+
+        The worker process can not be interrupted, so it is terminated and a new one is spawned right away,
+        so that it is ready for the next validation.
+        """
+        if self._result is not None and not self._result.ready():
+            self.close()
+            self._pool = _start_pool()
+        self._result = None
+
+    def close(self):
+        """Stops the worker process.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        self._result = None
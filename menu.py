@@ -1,13 +1,25 @@
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
-from kivy.properties import NumericProperty, ObjectProperty, StringProperty, OptionProperty, AliasProperty
+from kivy.properties import NumericProperty, ObjectProperty, StringProperty, OptionProperty, AliasProperty, \
+    BooleanProperty
 from kivy.uix.screenmanager import Screen
+try:
+    from range_analysis import RangeSweep
+except ImportError:
+    # the analysis of the reach of the shells needs NumPy, it is not shown without it
+    RangeSweep = None
 
 """Implementation of the main menu screen.
 
 The main menu screen is used to set up the parameters of the game, such as number of players,
 gravity, shell aerodynamic drag, explosion radius etc. and then start the game.
+
+Attributes:
+    ANALYSIS_BUDGET (float): Time in seconds the analysis of the reach of the shells may take in one frame.
 """
 
+ANALYSIS_BUDGET = 0.004
+
 
 class MenuValueItem(BoxLayout):
     """UI element allowing user to input value using either text input or a slider.
@@ -97,10 +109,24 @@ class MenuPercentItem(BoxLayout):
     normalized_value = AliasProperty(_get_normalized_value, _set_normalized_value, bind=['value', 'max', 'min'])
 
 
+class MenuCheckItem(BoxLayout):
+    """UI element allowing user to switch an option on or off.
+
+    Attributes:
+        active (BooleanProperty): True if the option is switched on.
+        label (StringProperty): Text describing the option.
+    """
+    active = BooleanProperty(False)
+    label = StringProperty("No name")
+
+
 class Menu(Screen):
     """The main menu screen.
 
     The initial screen the game starts at, allowing user to set properties of the game and start it.
+
+    Attributes:
+        analysis (Label): Shows the results of the analysis of the reach of the shells.
     """
     num_players = ObjectProperty(None)
     gravity_perc = ObjectProperty(None)
@@ -109,6 +135,15 @@ class Menu(Screen):
     wind = ObjectProperty(None)
     explosion_r = ObjectProperty(None)
     shell_mass_perc = ObjectProperty(None)
+    map_screens = ObjectProperty(None)
+    submunitions = ObjectProperty(None)
+    simultaneous_fire = ObjectProperty(None)
+    settle_terrain = ObjectProperty(None)
+    validate_maps = ObjectProperty(None)
+    playback_speed = ObjectProperty(None)
+    seed = ObjectProperty(None)
+    start_button = ObjectProperty(None)
+    analysis = ObjectProperty(None)
 
     def __init__(self, **kwargs):
         """
@@ -116,6 +151,57 @@ class Menu(Screen):
             **kwargs: Arguments passed to the super constructor.
         """
         super().__init__(**kwargs)
+        self._sweep = None
+        self._sweep_event = None
+        for item in (self.num_players, self.gravity_perc, self.shell_vel_perc, self.drag_perc, self.wind,
+                     self.shell_mass_perc, self.map_screens):
+            item.bind(value=self.update_analysis)
+
+    def update_analysis(self, *args):
+        """Starts the analysis of the reach of the shells with the current settings.
+
+        The analysis of the previous settings is dropped, the new one runs over the following frames.
+
+        Args:
+            *args: Arguments of the event that changed the settings.
+        """
+        if RangeSweep is None:
+            return
+        self._sweep = RangeSweep(self.GRAVITY * self.gravity_perc.value / 100,
+                                 self.MAX_MUZZLE_SHELL_VEL * self.shell_vel_perc.value / 100,
+                                 self.DRAG_COEFFICIENT * self.drag_perc.value / 100,
+                                 self.SHELL_MASS * self.shell_mass_perc.value / 100,
+                                 # the wind of a turn is at most half of the maximum, see `Game._generate_wind`
+                                 self.wind.value / 2)
+        if self._sweep_event is None:
+            self._sweep_event = Clock.schedule_interval(self._advance_analysis, 0)
+
+    def _advance_analysis(self, dt):
+        """Advances the analysis by `ANALYSIS_BUDGET` and shows its results when it is done.
+
+        Args:
+            dt (float): Time elapsed since the last call of this method.
+
+        Returns:
+            bool: False when the analysis is done, which unschedules this method.
+        """
+        if not self._sweep.advance(ANALYSIS_BUDGET):
+            return True
+        self._sweep_event = None
+        result = self._sweep.get_result()
+        players = int(self.num_players.value)
+        # the same world width as the game uses
+        world_width = max(self.map_screens.value * self.WORLD_SCREEN_WIDTH, (players + 1) * self.MIN_TANK_SPACING)
+        spacing = world_width / (players + 1)
+        text = (f'Range {result.tailwind_range:.0f} with the wind, {result.headwind_range:.0f} against it, '
+                f'apex {result.apex:.0f}')
+        if len(result.flight_times) != 0:
+            text += f', flight {result.flight_times[0]:.1f}-{result.flight_times[-1]:.1f} s ' \
+                    f'(median {result.flight_times[2]:.1f} s)'
+        if result.headwind_range < spacing:
+            text += f'\n[color=ff4040]Tanks {spacing:.0f} apart may be out of reach against the wind[/color]'
+        self.analysis.text = text
+        return False
 
     def start_game(self):
         """Reads values from the UI elements, sets up the game and starts it.
@@ -130,6 +216,10 @@ class Menu(Screen):
         self.wind.manual_validate_text()
         self.explosion_r.manual_validate_text()
         self.shell_mass_perc.manual_validate_text()
+        self.map_screens.manual_validate_text()
+        self.submunitions.manual_validate_text()
+        self.playback_speed.manual_validate_text()
+        self.seed.manual_validate_text()
 
         game = self.manager.get_screen('game')
         game.players = self.player_list[:self.num_players.value]
@@ -139,6 +229,13 @@ class Menu(Screen):
         game.max_wind = self.wind.value
         game.explosion_radius = self.explosion_r.value
         game.shell_mass = self.SHELL_MASS * self.shell_mass_perc.value / 100
+        game.map_screens = self.map_screens.value
+        game.submunitions = self.submunitions.value
+        game.simultaneous_fire = self.simultaneous_fire.active
+        game.settle_terrain = self.settle_terrain.active
+        game.validate_maps = self.validate_maps.active
+        game.playback_speed = int(self.playback_speed.value)
+        game.seed = int(self.seed.value)
 
         self.manager.current = 'game'
 
@@ -0,0 +1,700 @@
+import math
+
+from kivy.core.image import Image as CoreImage
+from kivy.graphics.context_instructions import Color
+from kivy.graphics.vertex_instructions import Mesh
+from kivy.uix.widget import Widget
+from kivy.vector import Vector
+
+import collisions
+from explosions import ExplosionQueue, MIN_SPAN, MAX_SEGMENTS
+from loading import SHELL_SOURCE
+
+"""Projectiles in flight.
+
+This module implements the shells and the engine that moves all shells in flight, detects their collisions
+and detonates them. All shells are updated in one batched pass each frame, sharing the collision data of the tanks
+and the terrain, and all their explosions are applied to the terrain at once. Shells are plain objects,
+all of them are drawn by a single `ShellDisplay`.
+
+The flight of a shell can be integrated by one of the `INTEGRATORS`. The game moves the shells in fixed steps
+of the explicit Euler method, which the simulation and its state hashes are defined by. Analyses of whole
+trajectories, which do not need to test collisions in every step, such as the `RangeSweep` of `range_analysis`,
+can use the classic Runge-Kutta method or the adaptive Dormand-Prince method, which takes as few steps as the error
+tolerance allows.
+In all the methods, the drag of one step of the Euler method is the drag of `STEP` seconds of flight.
+
+Attributes:
+    CLUSTER_SPREAD (float): Angle in degrees between the outermost submunitions of a cluster shell.
+    SUBMUNITION_SCALE (float): Size and explosion radius of a submunition relative to the cluster shell.
+    STEP (float): Time step of the simulation of the shells in seconds.
+    MAX_STEPS_PER_UPDATE (int): Maximal number of steps simulated in one frame at the normal speed,
+        the simulation slows down instead of taking ever longer frames when the frames are late.
+    MAX_PREDICTED_STEPS (int): Maximal number of steps the flight of a shell is predicted for.
+    EULER (str): The explicit Euler method, one step per update.
+    RK4 (str): The classic fourth order Runge-Kutta method, one step per update.
+    ADAPTIVE (str): The Dormand-Prince 5(4) method with adaptive steps.
+    INTEGRATORS (tuple of str): All the integrators of the flight of the shells.
+    DEFAULT_TOLERANCE (float): Default error tolerance of one step of the adaptive integrator, in world units.
+"""
+
+CLUSTER_SPREAD = 40
+SUBMUNITION_SCALE = 0.5
+STEP = 1 / 60
+MAX_STEPS_PER_UPDATE = 4
+MAX_PREDICTED_STEPS = 60 * 30
+EULER = 'euler'
+RK4 = 'rk4'
+ADAPTIVE = 'adaptive'
+INTEGRATORS = (EULER, RK4, ADAPTIVE)
+DEFAULT_TOLERANCE = 1e-3
+
+# the Butcher tableau of the Dormand-Prince 5(4) method
+_DP_C = (0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1)
+_DP_A = ((),
+         (1 / 5,),
+         (3 / 40, 9 / 40),
+         (44 / 45, -56 / 15, 32 / 9),
+         (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+         (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+         (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84))
+# weights of the fifth order solution, the difference of the fourth order solution from it
+_DP_B = (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0)
+_DP_E = (71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+# shortest step of the adaptive integrator, in seconds
+_MIN_ADAPTIVE_STEP = 1e-6
+
+
+def clamp(value, min_val, max_val):
+    """Clamp the value between min_val and max_val.
+
+    Args:
+        value: The value to clamp.
+        min_val: Lower bound.
+        max_val: Upper bound.
+
+    Returns: `value` between `min_val` and `max_val` or `min_val` or `max_val`.
+
+    """
+    return max(min(value, max_val), min_val)
+
+
+class Shell:
+    """Class implementing shell behavior.
+
+    Provides shell ballistics, aerodynamics and resources for hit detection.
+
+    Attributes:
+        player: Owner of the shell.
+        init_power: Power the shell was shot with.
+        init_angle: Angle the shell was shot at, in degrees from the x axis.
+        mass: Mass of the shell.
+        gravity: Gravitational acceleration applied to shell each update.
+        wind: Wind acting on the shell during it's flight.
+        drag_coef: Drag coefficient of the shell.
+        explosion_radius: The radius of the terrain destroyed on detonation.
+        center_x (float): Position of the center of the shell on the x axis.
+        center_y (float): Position of the center of the shell on the y axis.
+        velocity_x (float): Shell velocity in the x axis.
+        velocity_y (float): Shell velocity in the y axis.
+        width (float): Length of the shell.
+        height (float): Thickness of the shell.
+        submunitions (int): Number of submunitions the shell splits into at the top of its trajectory,
+            0 for shells that do not split.
+    """
+    __slots__ = ('player', 'init_power', 'init_angle', 'mass', 'gravity', 'wind', 'drag_coef', 'explosion_radius',
+                 'center_x', 'center_y', 'velocity_x', 'velocity_y', 'width', 'height', 'submunitions')
+
+    def __init__(self, player, power, angle, start_vel, mass, gravity, wind, drag_coef, explosion_radius,
+                 size, center, submunitions=0):
+        """
+
+        Args:
+            player: Owner of the shell.
+            power: Power the shell was shot with.
+            angle: Angle the shell was shot at, in degrees from the x axis.
+            start_vel: Initial velocity.
+            mass: Mass of the shell.
+            gravity: Gravitational acceleration applied to shell each update.
+            wind: Wind acting on the shell during it's flight.
+            drag_coef: Drag coefficient of the shell.
+            explosion_radius: The radius of the terrain destroyed on detonation.
+            size (float, float): Length and thickness of the shell.
+            center (float, float): Initial position of the center of the shell.
+            submunitions (int): Number of submunitions the shell splits into, 0 for shells that do not split.
+        """
+        self.player = player
+        self.init_power = power
+        self.init_angle = angle
+        self.mass = mass
+        self.gravity = gravity
+        self.wind = wind
+        self.drag_coef = drag_coef
+        self.explosion_radius = explosion_radius
+        self.velocity_x = start_vel * math.cos(math.radians(angle))
+        self.velocity_y = start_vel * math.sin(math.radians(angle))
+        self.width, self.height = size
+        self.center_x, self.center_y = center
+        self.submunitions = submunitions
+
+    @property
+    def center(self):
+        """(float, float): Position of the center of the shell."""
+        return self.center_x, self.center_y
+
+    def update(self, dt, world_width, world_height, integrator=EULER, tolerance=DEFAULT_TOLERANCE):
+        """Updates the position and the velocity of the shell.
+
+        Moves the shell based on it's current velocity and the time passed (`dt`).
+        Updates the velocity based on `self.gravity`, `self.wind`, `self.drag_coef` and the time passed.
+        Bounces the shell off the left, right and top walls of the world.
+
+        Args:
+            dt: Delta t, the change of time the shell should be updated by.
+            world_width: Width of the world.
+            world_height: Height of the world.
+            integrator (str): The integrator of the flight, one of `INTEGRATORS`.
+            tolerance (float): Error tolerance of one step of the `ADAPTIVE` integrator.
+
+        Returns:
+            int: Number of steps of the integrator taken.
+        """
+        if integrator == RK4:
+            self._rk4_step(dt)
+            self._bounce(world_width, world_height)
+            return 1
+        if integrator == ADAPTIVE:
+            return self._advance_adaptive(dt, world_width, world_height, tolerance)
+
+        # move the shell based on the current velocity and change of time
+        self.center_x += self.velocity_x * dt
+        self.center_y += self.velocity_y * dt
+        # apply gravitational acceleration
+        self.velocity_y -= self.gravity * dt
+
+        # based on https://en.wikipedia.org/wiki/Drag_equation
+        # hides the density, area and other constants for the shell into the drag coefficient
+        # the drag is air_vel.normalize() * drag_coef * air_vel.length2() per `STEP`
+        air_vel_x = self.velocity_x - self.wind
+        air_vel_y = self.velocity_y
+        drag = self.drag_coef * math.hypot(air_vel_x, air_vel_y) / self.mass * (dt / STEP)
+        self.velocity_x -= air_vel_x * drag
+        self.velocity_y -= air_vel_y * drag
+
+        self._bounce(world_width, world_height)
+        return 1
+
+    def _bounce(self, world_width, world_height):
+        """Bounces the shell off the left, right and top walls of the world, if it got past them.
+
+        Args:
+            world_width: Width of the world.
+            world_height: Height of the world.
+
+        Returns:
+            bool: True if the shell bounced.
+        """
+        bounced = False
+        half_width = self.width / 2
+        if (self.center_x < half_width) or (self.center_x > world_width - half_width):
+            self.velocity_x *= -1
+            self.center_x = clamp(self.center_x, half_width, world_width - half_width)
+            bounced = True
+
+        if self.center_y + self.height / 2 > world_height:
+            self.velocity_y *= -1
+            self.center_y = world_height - self.height / 2
+            bounced = True
+        return bounced
+
+    def _derivative(self, state):
+        """Computes the derivative of the state of the shell in flight.
+
+        Args:
+            state ((float, float, float, float)): Position and velocity of the shell.
+
+        Returns:
+            (float, float, float, float): Velocity and acceleration of the shell.
+        """
+        _, _, vel_x, vel_y = state
+        air_vel_x = vel_x - self.wind
+        # the drag rate of the Euler method with the step of `STEP`
+        drag = self.drag_coef * math.hypot(air_vel_x, vel_y) / (self.mass * STEP)
+        return vel_x, vel_y, -air_vel_x * drag, -self.gravity - vel_y * drag
+
+    def _get_state(self):
+        return self.center_x, self.center_y, self.velocity_x, self.velocity_y
+
+    def _set_state(self, state):
+        self.center_x, self.center_y, self.velocity_x, self.velocity_y = state
+
+    def _rk4_step(self, dt):
+        """Moves the shell by one step of the classic Runge-Kutta method, without bouncing off the walls.
+
+        Args:
+            dt (float): Length of the step.
+        """
+        state = self._get_state()
+        k1 = self._derivative(state)
+        k2 = self._derivative([y + dt / 2 * k for y, k in zip(state, k1)])
+        k3 = self._derivative([y + dt / 2 * k for y, k in zip(state, k2)])
+        k4 = self._derivative([y + dt * k for y, k in zip(state, k3)])
+        self._set_state(tuple(y + dt / 6 * (a + 2 * b + 2 * c + d) for y, a, b, c, d in zip(state, k1, k2, k3, k4)))
+
+    def _dopri_step(self, state, dt):
+        """Computes one step of the Dormand-Prince method.
+
+        Args:
+            state ((float, float, float, float)): Position and velocity of the shell.
+            dt (float): Length of the step.
+
+        Returns:
+            ((float, float, float, float), float): The state after the step and the estimate of its error.
+        """
+        stages = []
+        for a in _DP_A:
+            stage_state = [y + dt * sum(a_j * k[i] for a_j, k in zip(a, stages)) for i, y in enumerate(state)]
+            stages.append(self._derivative(stage_state))
+        result = tuple(y + dt * sum(b * k[i] for b, k in zip(_DP_B, stages)) for i, y in enumerate(state))
+        error = max(abs(dt * sum(e * k[i] for e, k in zip(_DP_E, stages))) for i in range(len(state)))
+        return result, error
+
+    def _crosses_wall(self, state, world_width, world_height):
+        half_width = self.width / 2
+        return (state[0] < half_width or state[0] > world_width - half_width
+                or state[1] + self.height / 2 > world_height)
+
+    def _wall_fraction(self, start, end, world_width, world_height):
+        """Estimates the part of the step from `start` to `end` after which the shell hits a wall.
+
+        Returns:
+            float: The part of the step, from 0 to 1.
+        """
+        half_width = self.width / 2
+        fraction = 1
+        for axis, low, high in ((0, half_width, world_width - half_width),
+                                (1, float('-inf'), world_height - self.height / 2)):
+            delta = end[axis] - start[axis]
+            if end[axis] > high and delta > 0:
+                fraction = min(fraction, (high - start[axis]) / delta)
+            elif end[axis] < low and delta < 0:
+                fraction = min(fraction, (low - start[axis]) / delta)
+        return clamp(fraction, 0, 1)
+
+    def _advance_adaptive(self, duration, world_width, world_height, tolerance):
+        """Moves the shell by `duration` with the adaptive Dormand-Prince method.
+
+        The steps are made as long as the error `tolerance` allows. A step that would get the shell past
+        a wall is shortened to end at the wall, where the shell bounces.
+
+        Args:
+            duration (float): Time to move the shell by.
+            world_width: Width of the world.
+            world_height: Height of the world.
+            tolerance (float): Maximal error of one step.
+
+        Returns:
+            int: Number of the accepted steps.
+        """
+        time = 0
+        step = duration
+        steps = 0
+        while duration - time > _MIN_ADAPTIVE_STEP:
+            step = min(step, duration - time)
+            state = self._get_state()
+            result, error = self._dopri_step(state, step)
+            if error > tolerance and step > _MIN_ADAPTIVE_STEP:
+                step = max(step * max(0.2, 0.9 * (tolerance / error) ** 0.2), _MIN_ADAPTIVE_STEP)
+                continue
+            if self._crosses_wall(result, world_width, world_height) and step > _MIN_ADAPTIVE_STEP:
+                shorter = max(step * self._wall_fraction(state, result, world_width, world_height),
+                              _MIN_ADAPTIVE_STEP)
+                if shorter < step:
+                    step = shorter
+                    continue
+            self._set_state(result)
+            self._bounce(world_width, world_height)
+            time += step
+            steps += 1
+            growth = 5 if error == 0 else min(5, max(0.2, 0.9 * (tolerance / error) ** 0.2))
+            step *= growth
+        return steps
+
+    def copy(self):
+        """
+        Returns:
+            Shell: A new shell in the same state as this shell.
+        """
+        shell = Shell.__new__(Shell)
+        for name in Shell.__slots__:
+            setattr(shell, name, getattr(self, name))
+        return shell
+
+    def get_angle(self):
+        """
+        Returns: The current angle of the shell from the x axis.
+        """
+        return math.degrees(math.atan2(self.velocity_y, self.velocity_x))
+
+    def get_bbox(self):
+        """Returns bounding box of the shell in any rotation.
+
+        Returns:
+            (float, float, float, float): min x, min y, max x, max y of the box.
+        """
+        r = math.hypot(self.width, self.height) / 2
+        return self.center_x - r, self.center_y - r, self.center_x + r, self.center_y + r
+
+    def get_rectangle(self):
+        """Returns `Rectangle` for collision detection.
+        Returns: `Rectangle` representing the part of space occupied by the shell for collision detection.
+        """
+        return collisions.Rectangle(Vector(self.center_x, self.center_y), Vector(self.width, self.height),
+                                    Vector(-self.width / 2, -self.height / 2), self.get_angle())
+
+    def split(self):
+        """Splits the shell into its submunitions.
+
+        The submunitions are spread evenly around the current direction of the shell.
+
+        Returns:
+            list of Shell: The submunitions.
+        """
+        speed = math.hypot(self.velocity_x, self.velocity_y)
+        angle = self.get_angle()
+        parts = []
+        for i in range(self.submunitions):
+            if self.submunitions > 1:
+                offset = CLUSTER_SPREAD * (i / (self.submunitions - 1) - 0.5)
+            else:
+                offset = 0
+            parts.append(Shell(self.player, self.init_power, self.init_angle, speed, self.mass, self.gravity,
+                               self.wind, self.drag_coef, self.explosion_radius * SUBMUNITION_SCALE,
+                               (self.width * SUBMUNITION_SCALE, self.height * SUBMUNITION_SCALE),
+                               self.center, 0))
+            parts[-1].velocity_x = speed * math.cos(math.radians(angle + offset))
+            parts[-1].velocity_y = speed * math.sin(math.radians(angle + offset))
+        return parts
+
+
+class Impact:
+    """End of flight of a shell.
+
+    Attributes:
+        shell (Shell): The shell that ended its flight.
+        player (Player, optional): Player whose tank was hit by the shell, None if no tank was hit.
+        explosion (Circle, optional): Terrain destroyed by the shell, None if the shell did not hit the terrain.
+        parts (list of Shell): Submunitions the shell split into, empty if the shell did not split.
+    """
+    def __init__(self, shell, player=None, explosion=None, parts=()):
+        self.shell = shell
+        self.player = player
+        self.explosion = explosion
+        self.parts = parts
+
+
+class ProjectileEngine:
+    """Moves all shells in flight and detects their impacts.
+
+    The shells are moved in fixed steps of `STEP` seconds. Each step moves all the shells, collects the collision
+    shapes of the tanks once for all shells and applies all the explosions of the step to the terrain at once.
+
+    The flight of a shell is deterministic until the terrain or the tanks change, so the step of the next event
+    of each shell, its impact or split, is predicted by simulating a copy of the shell when it is added.
+    The shell is then only moved, without any collision tests, until the predicted step. When the terrain under
+    the path of the shell or any tank changes, the prediction is dropped and the shell is tested for collisions
+    in every step for the rest of its flight, so that frequent changes do not cause repeated predictions.
+
+    Attributes:
+        shells (list of Shell): The shells in flight.
+        terrain (TerrainModel): The terrain the shells collide with.
+        world_size (float, float): Size of the world, the shells bounce off its walls.
+        explosions (ExplosionQueue): Explosions of the current update.
+    """
+
+    def __init__(self, min_span=MIN_SPAN, max_segments=MAX_SEGMENTS):
+        """
+        Args:
+            min_span (float): Minimal thickness of the segments and the gaps left by the explosions,
+                see `explosions.compact_transitions`.
+            max_segments (int): Maximal number of segments of a column left by the explosions.
+        """
+        self.shells = []
+        self.terrain = None
+        self.world_size = (1, 1)
+        self.explosions = ExplosionQueue(min_span, max_segments)
+        # number of the last step
+        self._step = 0
+        # predicted step of the next event of the shells and the x range of their path until it,
+        # None for the shells tested in every step
+        self._predictions = {}
+        self._targets_bboxes = []
+
+    def add(self, shell):
+        """Adds the `shell` to the shells in flight.
+
+        Args:
+            shell (Shell): The new shell.
+        """
+        self.shells.append(shell)
+
+    def clear(self):
+        """Removes all shells.
+        """
+        self.shells = []
+        self._predictions = {}
+
+    def invalidate(self, first, last):
+        """Drops the predictions of the shells whose path goes over the changed columns.
+
+        Args:
+            first (int): The first changed column.
+            last (int): The last changed column.
+        """
+        for shell, prediction in self._predictions.items():
+            if prediction is not None and prediction[2] >= first and prediction[1] <= last + 1:
+                self._predictions[shell] = None
+
+    def evaluate(self, shell, players, max_steps=MAX_PREDICTED_STEPS):
+        """Simulates the whole flight of the `shell`, without changing the terrain or the shells in flight.
+
+        The flight is simulated against the current terrain, which is changed by the explosions of the shell and
+        its submunitions as in the game, and then restored from a `TerrainSnapshot` taken before the flight.
+        Used to evaluate what a shot would do before firing it.
+
+        Args:
+            shell (Shell): The shell to evaluate, it is not changed.
+            players (list of Player): Players whose tanks the shell can hit.
+            max_steps (int): Maximal number of steps to simulate.
+
+        Returns:
+            (list of Impact, (int, int) or None): The impacts of the shell and its submunitions, the range of x
+                coordinates of the terrain the shot would change or None if it would not destroy any terrain.
+        """
+        engine = ProjectileEngine(self.explosions.min_span, self.explosions.max_segments)
+        engine.terrain = self.terrain
+        engine.world_size = self.world_size
+        engine.add(shell.copy())
+        snapshot = self.terrain.snapshot()
+        impacts = []
+        first = last = None
+        try:
+            for _ in range(max_steps):
+                if len(engine.shells) == 0:
+                    break
+                # the explosions are applied after every step, so that the submunitions fly over the craters
+                step_impacts, changed = engine.run(1, players)
+                impacts.extend(step_impacts)
+                if changed is not None:
+                    first = changed[0] if first is None else min(first, changed[0])
+                    last = changed[1] if last is None else max(last, changed[1])
+        finally:
+            snapshot.restore()
+        return impacts, (first, last) if first is not None else None
+
+    def run(self, steps, players, on_step=None):
+        """Moves all shells by the given number of `steps` and detonates the colliding ones.
+
+        Args:
+            steps (int): Number of steps to simulate, fewer steps are simulated if all shells detonate.
+            players (list of Player): Players whose tanks the shells can hit.
+            on_step (callable, optional): Called with the length of the step after every step of the simulation.
+
+        Returns:
+            (list of Impact, (int, int) or None): The impacts of the shells that ended their flight in these steps,
+                the range of x coordinates of the changed terrain or None if no terrain was destroyed.
+        """
+        # collision shapes of the tanks are shared by all the shells
+        targets = [(player, player.tank.get_collision_bbox(), player.tank.get_collision_rectangles())
+                   for player in players]
+        bboxes = [bbox for player, bbox, shapes in targets]
+        if bboxes != self._targets_bboxes:
+            # a tank moved or was destroyed
+            self._predictions = dict.fromkeys(self._predictions)
+            self._targets_bboxes = bboxes
+
+        impacts = []
+        for i in range(steps):
+            if len(self.shells) == 0:
+                break
+            self._step += 1
+            self._update_step(targets, impacts)
+            if on_step is not None:
+                on_step(STEP)
+
+        changed = self.explosions.apply(self.terrain)
+        if changed is not None:
+            self.invalidate(*changed)
+        return impacts, changed
+
+    def _update_step(self, targets, impacts):
+        """Moves all shells by one step, checking the collisions of the shells at their predicted event.
+
+        Args:
+            targets (list of (Player, (float, float, float, float), list of Rectangle)): Players with the bounding
+                boxes and collision shapes of their tanks.
+            impacts (list of Impact): List the impacts of this step are appended to.
+        """
+        world_width, world_height = self.world_size
+        in_flight = []
+        for shell in self.shells:
+            if shell not in self._predictions:
+                self._predictions[shell] = self._predict(shell, targets)
+            prediction = self._predictions[shell]
+            rising = shell.velocity_y > 0
+            previous = shell.center
+            shell.update(STEP, world_width, world_height)
+            if prediction is not None:
+                if self._step < prediction[0]:
+                    in_flight.append(shell)
+                    continue
+                # predict again after the event
+                del self._predictions[shell]
+
+            impact = self._collide(shell, targets, previous)
+            if impact is None and shell.submunitions != 0 and rising and shell.velocity_y <= 0:
+                impact = Impact(shell, parts=shell.split())
+                in_flight.extend(impact.parts)
+            if impact is None:
+                in_flight.append(shell)
+                continue
+            self._predictions.pop(shell, None)
+            impacts.append(impact)
+            if impact.explosion is not None:
+                self.explosions.add(impact.explosion)
+        self.shells = in_flight
+
+    def _predict(self, shell, targets):
+        """Predicts the step of the next event of the `shell`, starting with the current step.
+
+        Args:
+            shell (Shell): The shell to predict.
+            targets (list of (Player, (float, float, float, float), list of Rectangle)): Players with the bounding
+                boxes and collision shapes of their tanks.
+
+        Returns:
+            (int, float, float): The step of the impact or the split of the shell, or the last predicted step
+                if there is no event in `MAX_PREDICTED_STEPS`, and the x range of the path of the shell until then.
+        """
+        world_width, world_height = self.world_size
+        shell = shell.copy()
+        min_x = max_x = shell.center_x
+        for step in range(self._step, self._step + MAX_PREDICTED_STEPS):
+            rising = shell.velocity_y > 0
+            previous = shell.center
+            shell.update(STEP, world_width, world_height)
+            bbox = shell.get_bbox()
+            min_x = min(min_x, bbox[0])
+            max_x = max(max_x, bbox[2])
+            if self._collide(shell, targets, previous) is not None:
+                return step, min_x, max_x
+            if shell.submunitions != 0 and rising and shell.velocity_y <= 0:
+                return step, min_x, max_x
+        return self._step + MAX_PREDICTED_STEPS - 1, min_x, max_x
+
+    def _collide(self, shell, targets, previous):
+        """Checks if the `shell` collides with any tank or the terrain.
+
+        Cheap bounding box tests are used first, the exact shape of the shell is only
+        tested when the bounding boxes overlap. The path of the center of the shell since the last update is cast
+        against the terrain as well, so that fast shells do not pass through thin parts of the terrain.
+
+        Args:
+            shell (Shell): The shell to check.
+            targets (list of (Player, (float, float, float, float), list of Rectangle)): Players with the bounding
+                boxes and collision shapes of their tanks.
+            previous (float, float): Position of the center of the shell before the last update.
+
+        Returns:
+            Impact: The impact of the `shell` if it collided with anything, None otherwise.
+        """
+        min_x, min_y, max_x, max_y = shell.get_bbox()
+        rect = None
+        if min_y < 0:
+            rect = shell.get_rectangle()
+            # shell went under the map
+            if rect.get_bbox()[1] < 0:
+                return Impact(shell)
+
+        for player, bbox, shapes in targets:
+            if max_x < bbox[0] or min_x > bbox[2] or max_y < bbox[1] or min_y > bbox[3]:
+                continue
+            if rect is None:
+                rect = shell.get_rectangle()
+            for shape in shapes:
+                if rect.collide_rectangle(shape):
+                    return Impact(shell, player=player)
+
+        # the shell and its path are above all the terrain
+        if self.terrain.get_max_top(min(min_x, previous[0]), max(max_x, previous[0])) < min(min_y, previous[1]):
+            return None
+        if rect is None:
+            rect = shell.get_rectangle()
+        if self.terrain.collide_with(rect):
+            return Impact(shell, explosion=collisions.Circle(rect.center, shell.explosion_radius))
+        hit = self.terrain.pyramid.cast_segment(previous, shell.center)
+        if hit is not None:
+            return Impact(shell, explosion=collisions.Circle(hit, shell.explosion_radius))
+        return None
+
+
+class ShellDisplay(Widget):
+    """Draws all shells in flight.
+
+    All shells are drawn as textured quads of a single mesh, which is updated every frame.
+
+    Attributes:
+        SOURCE (str): Image of the shell.
+    """
+    SOURCE = SHELL_SOURCE
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: Arguments passed to the super constructor.
+        """
+        super().__init__(**kwargs)
+        self._mesh = None
+        self._u = self._v = 0
+        self._u_size = self._v_size = 1
+
+    def draw_shells(self, shells):
+        """Draws the `shells`, replacing the previously drawn shells.
+
+        Args:
+            shells (list of Shell): The shells to draw.
+        """
+        if self._mesh is None:
+            texture = CoreImage(self.SOURCE).texture
+            # the shell is a region of the atlas
+            self._u, self._v = texture.uvpos
+            self._u_size, self._v_size = texture.uvsize
+            with self.canvas:
+                Color(1, 1, 1, 1)
+                self._mesh = Mesh(mode='triangles', texture=texture)
+
+        u0, v0 = self._u, self._v
+        u1, v1 = self._u + self._u_size, self._v + self._v_size
+        vertices = []
+        indices = []
+        for i, shell in enumerate(shells):
+            angle = math.radians(shell.get_angle())
+            # half of the length and thickness of the shell, rotated
+            l_x = math.cos(angle) * shell.width / 2
+            l_y = math.sin(angle) * shell.width / 2
+            t_x = -math.sin(angle) * shell.height / 2
+            t_y = math.cos(angle) * shell.height / 2
+            c_x, c_y = shell.center_x, shell.center_y
+            vertices.extend((c_x - l_x - t_x, c_y - l_y - t_y, u0, v0,
+                             c_x + l_x - t_x, c_y + l_y - t_y, u1, v0,
+                             c_x + l_x + t_x, c_y + l_y + t_y, u1, v1,
+                             c_x - l_x + t_x, c_y - l_y + t_y, u0, v1))
+            indices.extend((i * 4, i * 4 + 1, i * 4 + 2, i * 4 + 2, i * 4 + 3, i * 4))
+        self._mesh.vertices = vertices
+        self._mesh.indices = indices
+
+    def clear(self):
+        """Removes all drawn shells.
+        """
+        self.canvas.clear()
+        self._mesh = None
@@ -0,0 +1,138 @@
+from collections import deque
+
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import NumericProperty
+
+"""Adaptive quality of the rendering.
+
+The `QualityController` keeps the frames of the game within the frame time budget on weak machines and large maps.
+It watches the frame times while the world is in motion and when they overrun the budget, it lowers the detail
+of the costly parts of the rendering one level at a time. When the frames are back within the budget and
+the game spends only a small part of the budget updating the world, it raises the detail again. A raise which
+makes the frames overrun again doubles the time before the next raise, so that the quality does not keep
+flipping between two levels.
+
+The detail of each level is given by a `QualityLevel`, from the full detail of the first level in `LEVELS`:
+
+- terrain column group: number of terrain columns drawn as one quad, with the segments of the first of them.
+- trace time step: time in seconds between the samples of the tracers of the shells in flight.
+- trace point stride: only every n-th point of the previous traces is drawn.
+
+The detail only affects what is drawn, never the simulation, so the peers of a network game can use
+different levels.
+
+Attributes:
+    LEVELS (list of QualityLevel): The quality levels, from the highest to the lowest.
+    WINDOW (int): Number of the frames the decisions are based on.
+    OVERRUN (float): Fraction of the budget above which the average frame time lowers the quality.
+    HEADROOM (float): Fraction of the budget below which the average time of the update of the world
+        raises the quality.
+    MAX_FRAME_TIME (float): Frames longer than this, e.g. when the window is dragged, are not counted.
+    RAISE_DELAY (int): Number of the frames after a change of the quality before it is raised.
+    MAX_RAISE_DELAY (int): The longest delay of the raise, after repeated failed raises.
+"""
+
+
+class QualityLevel:
+    """Detail of the rendering at one quality level.
+
+    Attributes:
+        terrain_column_group (int): Number of terrain columns drawn as one quad, divides `terrain.CHUNK_WIDTH`.
+        trace_time_step (float): Time in seconds between the samples of the tracers.
+        trace_point_stride (int): Only every n-th point of the previous traces is drawn.
+    """
+
+    def __init__(self, terrain_column_group, trace_time_step, trace_point_stride):
+        self.terrain_column_group = terrain_column_group
+        self.trace_time_step = trace_time_step
+        self.trace_point_stride = trace_point_stride
+
+
+LEVELS = [
+    QualityLevel(1, 0.1, 1),
+    QualityLevel(2, 0.1, 2),
+    QualityLevel(2, 0.2, 2),
+    QualityLevel(4, 0.2, 4),
+    QualityLevel(8, 0.3, 4),
+]
+WINDOW = 30
+OVERRUN = 1.25
+HEADROOM = 0.5
+MAX_FRAME_TIME = 1.0
+RAISE_DELAY = 120
+MAX_RAISE_DELAY = 120 * 32
+
+
+class QualityController(EventDispatcher):
+    """Lowers and raises the detail of the rendering to keep the frames within the budget.
+
+    Attributes:
+        level (NumericProperty): Index of the current level in `LEVELS`, 0 is the full detail.
+        budget (float): Time of one frame in seconds.
+    """
+
+    level = NumericProperty(0)
+
+    def __init__(self, budget, **kwargs):
+        """
+        Args:
+            budget (float): Time of one frame in seconds.
+            **kwargs: Arguments passed to the super constructor.
+        """
+        super().__init__(**kwargs)
+        self.budget = budget
+        self._frame_times = deque(maxlen=WINDOW)
+        self._update_times = deque(maxlen=WINDOW)
+        self._frames_since_change = 0
+        self._raise_delay = RAISE_DELAY
+        self._raised = False
+
+    @property
+    def settings(self):
+        """QualityLevel: The detail of the current level."""
+        return LEVELS[self.level]
+
+    def restart(self):
+        """Forgets the measured frames, e.g. when a new level starts.
+        """
+        self._frame_times.clear()
+        self._update_times.clear()
+        self._frames_since_change = 0
+
+    def add_frame(self, frame_time, update_time):
+        """Records a frame of the world in motion and changes the quality if needed.
+
+        Args:
+            frame_time (float): Time in seconds since the previous frame.
+            update_time (float): Time in seconds the update of the world took in the frame.
+        """
+        if frame_time > MAX_FRAME_TIME:
+            return
+        self._frame_times.append(frame_time)
+        self._update_times.append(update_time)
+        self._frames_since_change += 1
+        if len(self._frame_times) < WINDOW:
+            return
+        frame_time = sum(self._frame_times) / len(self._frame_times)
+        update_time = sum(self._update_times) / len(self._update_times)
+        if frame_time > self.budget * OVERRUN:
+            if self.level < len(LEVELS) - 1:
+                if self._raised and self._frames_since_change < self._raise_delay:
+                    # the last raise was too much for this machine, wait longer before the next one
+                    self._raise_delay = min(self._raise_delay * 2, MAX_RAISE_DELAY)
+                self._change(self.level + 1, False)
+        elif update_time < self.budget * HEADROOM and self.level > 0 and self._frames_since_change >= self._raise_delay:
+            self._change(self.level - 1, True)
+
+    def _change(self, level, raised):
+        """Switches to the `level`.
+
+        Args:
+            level (int): Index of the new level in `LEVELS`.
+            raised (bool): True if the quality is raised.
+        """
+        Logger.info(f"Quality: {'raised' if raised else 'lowered'} to level {level} of {len(LEVELS) - 1}")
+        self._raised = raised
+        self.restart()
+        self.level = level
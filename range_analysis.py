@@ -0,0 +1,224 @@
+import math
+import time
+
+import numpy as np
+
+from ballistics import step_shells
+from projectiles import Shell, STEP, EULER, DEFAULT_TOLERANCE
+
+"""Analysis of the reach of the shells for the physics settings of a game.
+
+High gravity or drag can make the tanks unable to hit each other across longer distances. The `RangeSweep`
+fires a batch of shells at many angles and powers from a flat ground, giving the maximal range with and against
+the wind, the apex height and the distribution of the flight times. The sweep can be advanced a few steps at a time,
+so that it can run over several frames without slowing the UI down.
+
+With the `EULER` integrator, all the shells are simulated at once with the same Euler steps as the game uses,
+see `ballistics`, so the results are those of the shots of the game. With the other integrators of `projectiles`,
+each shell is flown by `fly_shell` with far fewer, longer steps, which follow the flight without the error
+of the Euler steps.
+
+Attributes:
+    SWEEP_ANGLES (int): Number of angles fired at, spread over the whole upper half circle.
+    SWEEP_POWERS (int): Number of powers fired with, spread up to the full power.
+    MAX_FLIGHT_STEPS (int): Steps after which the shells still in flight are not simulated further.
+    FLIGHT_CHUNK (float): Time in seconds a shell flown by `fly_shell` is updated by at once, between the checks
+        of its landing and apex.
+    LANDING_PRECISION (float): Time in seconds the landing of a shell flown by `fly_shell` is searched to,
+        before it is interpolated.
+"""
+
+SWEEP_ANGLES = 89
+SWEEP_POWERS = 10
+MAX_FLIGHT_STEPS = 60 * 60
+FLIGHT_CHUNK = 6 * STEP
+LANDING_PRECISION = STEP / 16
+
+# the shells flown by `fly_shell` start in the middle of a world too wide for them to reach its walls
+_ORIGIN = 1e6
+
+
+def fly_shell(shell, integrator, max_time, tolerance=DEFAULT_TOLERANCE):
+    """Flies the shell fired from the ground at y = 0 until it gets back to the ground.
+
+    The shell is updated by `FLIGHT_CHUNK` at a time, the chunk in which it lands is bisected until
+    `LANDING_PRECISION` and the landing is interpolated within the last part.
+
+    Args:
+        shell (Shell): The shell, its center is moved by the flight.
+        integrator (str): The integrator of the flight, one of `projectiles.INTEGRATORS`.
+        max_time (float): Time in seconds after which the shell is not flown further.
+        tolerance (float): Error tolerance of one step of the `ADAPTIVE` integrator.
+
+    Returns:
+        (float, float, float, int): The distance from the start to the landing, None if the shell did not land
+            in `max_time`, the flight time, the highest point of the flight and the number of the steps
+            of the integrator taken.
+    """
+    start_x = shell.center_x
+    shell.center_x += _ORIGIN
+    world_size = (2 * _ORIGIN, math.inf)
+    flight_time = 0
+    apex = shell.center_y
+    steps = 0
+    while flight_time < max_time:
+        before = shell.copy()
+        steps += shell.update(FLIGHT_CHUNK, *world_size, integrator, tolerance)
+        if shell.center_y >= 0:
+            apex = max(apex, shell.center_y)
+            flight_time += FLIGHT_CHUNK
+            continue
+        # `before` is above the ground and `shell` below it, `span` seconds later
+        span = FLIGHT_CHUNK
+        while span > LANDING_PRECISION:
+            span /= 2
+            middle = before.copy()
+            steps += middle.update(span, *world_size, integrator, tolerance)
+            if middle.center_y < 0:
+                shell = middle
+            else:
+                apex = max(apex, middle.center_y)
+                before = middle
+                flight_time += span
+        fraction = before.center_y / (before.center_y - shell.center_y)
+        landing_x = before.center_x + (shell.center_x - before.center_x) * fraction
+        return landing_x - _ORIGIN - start_x, flight_time + span * fraction, apex, steps
+    return None, flight_time, apex, steps
+
+
+class RangeResult:
+    """Results of a `RangeSweep`.
+
+    Attributes:
+        tailwind_range (float): The longest distance a shell flew with the wind.
+        headwind_range (float): The longest distance a shell flew against the wind.
+        apex (float): The highest point above the ground any shell reached.
+        flight_times (list of float): Quartiles of the flight times of the shells that landed, the shortest,
+            the first quartile, the median, the third quartile and the longest, empty if no shell landed.
+    """
+
+    def __init__(self, tailwind_range, headwind_range, apex, flight_times):
+        self.tailwind_range = tailwind_range
+        self.headwind_range = headwind_range
+        self.apex = apex
+        self.flight_times = flight_times
+
+
+class RangeSweep:
+    """Simulates a batch of shells fired from a flat ground with the given physics settings.
+
+    The wind blows to the right, so the shells fired to the right fly with the wind and the shells fired to
+    the left against it.
+
+    Attributes:
+        integrator (str): The integrator of the flights, one of `projectiles.INTEGRATORS`.
+        steps (int): Number of the simulated steps, of all the shells together with other integrators
+            than `EULER`.
+    """
+
+    def __init__(self, gravity, max_muzzle_vel, drag_coef, mass, wind, integrator=EULER,
+                 tolerance=DEFAULT_TOLERANCE):
+        """
+        Args:
+            gravity (float): Gravitational acceleration.
+            max_muzzle_vel (float): Velocity of the shells fired at the full power.
+            drag_coef (float): Drag coefficient of the shells.
+            mass (float): Mass of the shells.
+            wind (float): Strength of the wind.
+            integrator (str): The integrator of the flights, one of `projectiles.INTEGRATORS`.
+            tolerance (float): Error tolerance of one step of the `ADAPTIVE` integrator.
+        """
+        angles = np.radians(np.linspace(1, 179, SWEEP_ANGLES))
+        powers = np.linspace(1 / SWEEP_POWERS, 1, SWEEP_POWERS)
+        angles, powers = (grid.ravel() for grid in np.meshgrid(angles, powers))
+        self.integrator = integrator
+        self.steps = 0
+        self._tolerance = tolerance
+        # the shells flown one by one by `fly_shell`, None for the Euler steps of the whole batch
+        self._shells = None
+        if integrator != EULER:
+            self._shells = [Shell(None, power, math.degrees(angle), max_muzzle_vel * power, mass, gravity, wind,
+                                  drag_coef, 0, (0, 0), (0, 0)) for angle, power in zip(angles, powers)]
+        self._flown = 0
+        self._gravity = gravity
+        self._drag_coef = drag_coef
+        self._mass = mass
+        self._wind = wind
+        self._x = np.zeros_like(angles)
+        self._y = np.zeros_like(angles)
+        self._vel_x = max_muzzle_vel * powers * np.cos(angles)
+        self._vel_y = max_muzzle_vel * powers * np.sin(angles)
+        self._apex = np.zeros_like(angles)
+        # distance and time of the landing of each shell, NaN for the shells in flight
+        self._distance = np.full_like(angles, np.nan)
+        self._flight_time = np.full_like(angles, np.nan)
+        self._flying = np.ones(angles.shape, dtype=bool)
+
+    @property
+    def done(self):
+        """bool: True if all the shells landed or the flights reached `MAX_FLIGHT_STEPS`."""
+        if self._shells is not None:
+            return self._flown == len(self._shells)
+        return self.steps >= MAX_FLIGHT_STEPS or not self._flying.any()
+
+    def advance(self, budget):
+        """Simulates the steps of the shells in flight until the time `budget` runs out or the sweep is done.
+
+        Args:
+            budget (float): Time in seconds the simulation may take.
+
+        Returns:
+            bool: True if the sweep is done.
+        """
+        deadline = time.perf_counter() + budget
+        while not self.done and time.perf_counter() < deadline:
+            if self._shells is None:
+                self._step()
+            else:
+                self._fly_next()
+        return self.done
+
+    def _step(self):
+        """Moves the shells in flight by one step, in the same way as `Shell.update`.
+        """
+        idx = np.flatnonzero(self._flying)
+        x, y, vel_x, vel_y = step_shells(self._x[idx], self._y[idx], self._vel_x[idx], self._vel_y[idx], self._wind,
+                                         self._gravity, self._drag_coef, self._mass, STEP)
+        self.steps += 1
+
+        self._x[idx] = x
+        self._y[idx] = y
+        self._vel_x[idx] = vel_x
+        self._vel_y[idx] = vel_y
+        self._apex[idx] = np.maximum(self._apex[idx], y)
+        landed = idx[y < 0]
+        self._distance[landed] = self._x[landed]
+        self._flight_time[landed] = self.steps * STEP
+        self._flying[landed] = False
+
+    def _fly_next(self):
+        """Flies the next shell of the batch with the `integrator` until it lands.
+        """
+        idx = self._flown
+        distance, flight_time, apex, steps = fly_shell(self._shells[idx], self.integrator, MAX_FLIGHT_STEPS * STEP,
+                                                       self._tolerance)
+        self.steps += steps
+        self._apex[idx] = apex
+        if distance is not None:
+            self._distance[idx] = distance
+            self._flight_time[idx] = flight_time
+        self._flying[idx] = False
+        self._flown += 1
+
+    def get_result(self):
+        """Returns the results of the shells simulated so far.
+
+        Returns:
+            RangeResult: The results.
+        """
+        distance = self._distance[~np.isnan(self._distance)]
+        times = self._flight_time[~np.isnan(self._flight_time)]
+        return RangeResult(float(max(distance.max(initial=0), 0)),
+                           float(max(-distance.min(initial=0), 0)),
+                           float(self._apex.max()),
+                           np.percentile(times, [0, 25, 50, 75, 100]).tolist() if len(times) != 0 else [])
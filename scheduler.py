@@ -0,0 +1,137 @@
+import heapq
+from itertools import count
+
+"""Events scheduled in the time of the simulation.
+
+The timed behaviour of the game, such as the sampling of the shells by the tracers, runs in the time of
+the simulation rather than in the time of the wall clock, so that it is the same for any playback speed,
+when the shots are resolved instantly and when a peer of a network game catches up. The `SimulationScheduler`
+keeps the events in a priority queue ordered by the time they are due and the game advances it with every
+step of the world, firing the due events in order.
+
+Events due at the same time fire in the order they were scheduled, so the order of the events is the same
+on every run.
+
+Attributes:
+    TIME_TOLERANCE (float): Events due this close after the end of an advance fire in it, so that the rounding
+        errors of the summed steps do not delay the events due at the end of a step to the next step.
+"""
+
+TIME_TOLERANCE = 1e-9
+
+
+class SimulationEvent:
+    """An event scheduled by the `SimulationScheduler`.
+
+    Attributes:
+        time (float): Time of the simulation the event is due at.
+        callback (callable): Called with the `delay` when the event fires.
+        delay (float): Time between the scheduling of the event and its firing, or between the firings
+            of a repeated event.
+        repeat (bool): True if the event fires every `delay` seconds until it is cancelled.
+        cancelled (bool): True if the event was cancelled or fired its last time.
+    """
+
+    def __init__(self, time, callback, delay, repeat=False):
+        self.time = time
+        self.callback = callback
+        self.delay = delay
+        self.repeat = repeat
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancels the event, it is not fired any more.
+        """
+        self.cancelled = True
+
+
+class SimulationScheduler:
+    """Priority queue of the events, driven by the time of the simulation.
+
+    Attributes:
+        time (float): The current time of the simulation in seconds.
+    """
+
+    def __init__(self):
+        self.time = 0
+        self._queue = []
+        self._order = count()
+
+    def __len__(self):
+        """Returns the number of the events which were not cancelled."""
+        return sum(1 for _, _, event in self._queue if not event.cancelled)
+
+    def schedule_once(self, callback, delay):
+        """Schedules the `callback` to be called once, `delay` seconds from now.
+
+        Args:
+            callback (callable): Called with the time elapsed since the scheduling.
+            delay (float): Time in seconds from now the callback is due at.
+
+        Returns:
+            SimulationEvent: The scheduled event.
+        """
+        return self._push(SimulationEvent(self.time + delay, callback, delay))
+
+    def schedule_interval(self, callback, interval):
+        """Schedules the `callback` to be called every `interval` seconds, starting `interval` seconds from now.
+
+        Args:
+            callback (callable): Called with the time elapsed since the last call. If it returns False,
+                the event is cancelled.
+            interval (float): Interval in seconds.
+
+        Returns:
+            SimulationEvent: The scheduled event.
+
+        Raises:
+            ValueError: If the `interval` is not positive.
+        """
+        if interval <= 0:
+            raise ValueError(f'the interval must be positive, not {interval}')
+        return self._push(SimulationEvent(self.time + interval, callback, interval, repeat=True))
+
+    def _push(self, event):
+        """Adds the event into the queue.
+
+        Args:
+            event (SimulationEvent): The event.
+
+        Returns:
+            SimulationEvent: The event.
+        """
+        heapq.heappush(self._queue, (event.time, next(self._order), event))
+        return event
+
+    def advance(self, dt):
+        """Advances the time by `dt`, firing the events due until then in the order of their times.
+
+        The events scheduled by the fired callbacks fire in the same call if they are due in time.
+
+        Args:
+            dt (float): Time of the simulation in seconds to advance by.
+        """
+        end = self.time + dt
+        while len(self._queue) != 0 and self._queue[0][0] <= end + TIME_TOLERANCE:
+            due, _, event = heapq.heappop(self._queue)
+            if event.cancelled:
+                continue
+            self.time = max(due, self.time)
+            if not event.repeat:
+                event.cancelled = True
+                event.callback(event.delay)
+                continue
+            # the next time is counted from the due time, so that the repeated events do not drift
+            event.time = due + event.delay
+            self._push(event)
+            if event.callback(event.delay) is False:
+                event.cancel()
+        self.time = end
+
+    def clear(self):
+        """Cancels all the events and resets the time to 0.
+        """
+        for _, _, event in self._queue:
+            event.cancel()
+        self._queue = []
+        self.time = 0
@@ -1,21 +1,47 @@
+import argparse
 import math
+import sys
+import time
+
+from startup import StartupProfile
+
+startup_profile = StartupProfile()
+startup_profile.trace_imports()
 
 from kivy.app import App
 from kivy.clock import Clock
-from kivy.graphics.context_instructions import Color
-from kivy.graphics.vertex_instructions import Line, Rectangle
+from kivy.logger import Logger
+from kivy.graphics.context_instructions import Color, PushMatrix, PopMatrix, Scale, Translate
+from kivy.graphics.vertex_instructions import Mesh, Rectangle
+from kivy.core.image import Image as CoreImage
 from kivy.uix.image import Image
 from kivy.uix.relativelayout import RelativeLayout
-from kivy.uix.screenmanager import ScreenManager, Screen
-from kivy.properties import NumericProperty, ReferenceListProperty, ObjectProperty, AliasProperty
+from kivy.uix.screenmanager import Screen
+from kivy.properties import NumericProperty, ReferenceListProperty, ObjectProperty
 from kivy.vector import Vector
 
 from kivy.core.window import Window
 from collections import deque
-from random import random, randrange
+from random import Random, randrange
 from shell_tracing import Trace, Tracer, TraceDisplay
+from projectiles import Shell, ShellDisplay, ProjectileEngine, STEP, MAX_STEPS_PER_UPDATE
 from terrain_generation import generate_terrain
+from terrain import TerrainModel
+from terrain_settling import TerrainSettler
+from tank_physics import TankPhysics, MAX_HEALTH, DIRECT_HIT_DAMAGE, get_splash_damage
+from camera import Camera
+from quality import QualityController
+from scheduler import SimulationScheduler
+from state_hash import hash_state
+from lockstep import LockstepHost, LockstepClient, NetworkThread, controls_player, DEFAULT_PORT
 from menu import Menu
+from loading import LazyScreenManager, BackgroundLoader, BACKGROUND_SOURCE, ICON_SOURCE
+from soak import SoakRunner
+try:
+    from map_validation import MapValidator
+except ImportError:
+    # the validation of the maps needs NumPy, the maps are not validated without it
+    MapValidator = None
 from victory import Victory
 from gameui import ValueItem, TextItem
 import collisions
@@ -24,6 +50,10 @@ import collisions
 
 This module reimplements the good old Scorched earth game.
 
+All positions, sizes, velocities and accelerations of the game are given in world units, which are independent
+of the window. The world is `WORLD_HEIGHT` units high and is scaled to the window only when it is drawn,
+so the simulation is the same on any display and window size.
+
 Attributes:
     MAX_MUZZLE_SHELL_VEL (float): Default muzzle shell velocity, i.e. shell velocity when leaving the gun barrel's muzzle.
     
@@ -43,6 +73,30 @@ Attributes:
     DEFAULT_SHELL_EXPLOSION_RADIUS  (float): Default radius of the shell explosions.
     
     TANK_BODY_SIZE (float): Default size of the visible tank body, without the gun barrel.
+
+    SPACE_AROUND (int): How much wider than the tank body the flat space for a tank is.
+
+    WORLD_HEIGHT (int): Height of the world in world units.
+
+    WORLD_SCREEN_WIDTH (int): Width of one screen of the world in world units, the world is a chosen number
+        of screens wide.
+
+    MIN_TANK_SPACING (int): Minimal average distance between the tanks, the world is made wider if the chosen
+        number of screens does not fit all the tanks.
+
+    INSTANT_PLAYBACK (int): Playback speed of the shots resolved immediately, without playing back the flight.
+
+    MAX_INSTANT_STEPS (int): Maximal number of steps of the world simulated in one update
+        when the shots are resolved immediately.
+
+    MAX_SEED (int): The highest seed of the random number generator of the levels.
+
+    MAX_MAP_ATTEMPTS (int): Maximal number of maps generated for a level when the maps are validated.
+
+    VALIDATION_BUDGET (float): Time in seconds the validation of one map may take.
+
+    startup_profile (StartupProfile): Profile of the startup of the application, the imports of this module
+        and the building of the application until the first frame of the menu, which is logged.
 """
 
 MAX_MUZZLE_SHELL_VEL = 750
@@ -54,23 +108,21 @@ INIT_ANGLE = 90
 INIT_POWER = 50
 DEFAULT_SHELL_EXPLOSION_RADIUS = 50
 TANK_BODY_SIZE = (25, 25)
+SPACE_AROUND = 4
+WORLD_HEIGHT = 1000
+WORLD_SCREEN_WIDTH = 1000
+MIN_TANK_SPACING = 150
+INSTANT_PLAYBACK = 0
+MAX_INSTANT_STEPS = 60 * 60
+MAX_SEED = 999999
+MAX_MAP_ATTEMPTS = 5
+VALIDATION_BUDGET = 0.5
 
+startup_profile.stop_tracing()
+startup_profile.mark('imports')
 
 
 
-def clamp(value, min_val, max_val):
-    """Clamp the value between min_val and max_val.
-
-    Args:
-        value: The value to clamp.
-        min_val: Lower bound.
-        max_val: Upper bound.
-
-    Returns: `value` between `min_val` and `max_val` or `min_val` or `max_val`.
-
-    """
-    return max(min(value, max_val), min_val)
-
 
 def get_wind_text(wind):
     """Get text representation of wind.
@@ -91,102 +143,16 @@ def get_wind_text(wind):
         return 'NO WIND'
 
 
-class Shell(Image):
-    """Class implementing shell graphics and behavior.
-
-    Provides shell ballistics, aerodynamics and resources for hit detection.
-
-    Attributes:
-        velocity_x (NumericProperty): Shell velocity in the x axis.
-        velocity_y (NumericProperty): Shell velocity in the y axis.
-        velocity (ReferenceListProperty): Shell velocity vector.
-        player: Owner of the shell.
-        init_power: Power the shell was shot with.
-        init_angle: Angle the shell was shot at, in degrees from the x axis.
-        mass: Mass of the shell.
-        gravity: Gravitational acceleration applied to shell each update.
-        wind: Wind acting on the shell during it's flight.
-        drag_coef: Drag coefficient of the shell.
-        explosion_radius: The radius of the terrain destroyed on detonation.
-    """
-
-    velocity_x = NumericProperty(0)
-    velocity_y = NumericProperty(0)
-    velocity = ReferenceListProperty(velocity_x, velocity_y)
-
-    def __init__(self, player, power, angle, start_vel, mass, gravity, wind, drag_coef, explosion_radius, **kwargs):
-        """
-
-        Args:
-            player: Owner of the shell.
-            power: Power the shell was shot with.
-            angle: Angle the shell was shot at, in degrees from the x axis.
-            start_vel: Initial velocity vector.
-            mass: Mass of the shell.
-            gravity: Gravitational acceleration applied to shell each update.
-            wind: Wind acting on the shell during it's flight.
-            drag_coef: Drag coefficient of the shell.
-            explosion_radius: The radius of the terrain destroyed on detonation.
-            **kwargs: Arguments passed to the super() constructor.
-        """
-        super().__init__(**kwargs)
-        self.player = player
-        self.init_power = power
-        self.init_angle = angle
-        self.mass = mass
-        self.gravity = gravity
-        self.wind = wind
-        self.drag_coef = drag_coef
-        vel_vec = Vector(start_vel, 0).rotate(angle)
-        self.velocity = (vel_vec.x, vel_vec.y)
-        self.explosion_radius = explosion_radius
-
-    def update(self, dt):
-        """Updates the position and the velocity of the shell.
-
-        Moves the shell based on it's current velocity and the time passed (`dt`).
-        Updates the velocity based on `self.gravity`, `self.wind`, `self.drag_coef` and the time passed.
+def get_health_text(health):
+    """Get text representation of the health of a tank.
 
-        Args:
-            dt: Delta t, the change of time the shell should be updated by.
-        """
-        # move the shell based on the current velocity and change of time
-        self.center = Vector(*self.center) + Vector(*self.velocity) * dt
-        # apply gravitational acceleration
-        self.velocity_y -= self.gravity * dt
-
-        air_vel = Vector(self.velocity_x - self.wind, self.velocity_y)
-
-        # based on https://en.wikipedia.org/wiki/Drag_equation
-        # hides the density, area and other constants for the shell into the drag coefficient
-        drag = air_vel.normalize() * self.drag_coef * air_vel.length2()
-        vel_vec = Vector(*self.velocity) - (drag / self.mass)
-        self.velocity = (vel_vec.x, vel_vec.y)
-
-        # bounce off the walls
-        if (self.x < 0) or (self.right > self.parent.width):
-            self.velocity_x *= -1
-            self.right = clamp(self.right, 0, self.parent.width)
-            self.x = clamp(self.x, 0, self.parent.width)
-
-        if self.top > self.parent.height:
-            self.velocity_y *= -1
-            self.top = clamp(self.top, 0, self.parent.height)
-
-    def get_angle(self):
-        """
-        Returns: The current angle of the shell from the x axis.
-        """
-        return Vector(*self.velocity).angle((1, 0))
+    Args:
+        health (float): The health to transform.
 
-    angle = AliasProperty(get_angle, None, bind=["velocity"])
+    Returns: Text representation of the `health`.
 
-    def get_rectangle(self):
-        """Returns `Rectangle` for collision detection.
-        Returns: `Rectangle` representing the part of space occupied by the shell for collision detection.
-        """
-        return collisions.Rectangle(Vector(*self.center), Vector(*self.size), Vector(-self.width / 2, -self.height / 2),
-                                    self.get_angle())
+    """
+    return f"HP {math.ceil(health):3d}"
 
 
 class GunBarrel(Image):
@@ -244,8 +210,11 @@ class Tank(RelativeLayout):
         self.barrel.color = color
         self.barrel.angle = barrel_angle
         self.size = (2 * body_size[0], 2 * body_size[1])
+        self._collision_key = None
+        self._collision_rects = []
+        self._collision_bbox = None
 
-    def get_muzzle_pos(self, shell_length):
+    def get_muzzle_pos(self, shell_length, angle=None):
         """Get the spawn position of the shell.
 
         Calculates the position to spawn the shell at based on the `self.barrel` angle,
@@ -254,37 +223,61 @@ class Tank(RelativeLayout):
 
         Args:
             shell_length (float): Length of the shell to be shot from the barrel.
+            angle (float, optional): Angle of the barrel to use instead of the current one.
 
         Returns (Vector): Position to spawn the shell at.
 
         """
         # the barrel size is given in the base position, where width is the length of the barrel
-        rel_pos = Vector(self.barrel.width + shell_length / 2 + 1, 0).rotate(self.barrel.angle)
+        rel_pos = Vector(self.barrel.width + shell_length / 2 + 1, 0).rotate(
+            self.barrel.angle if angle is None else angle)
         rel_pos += Vector(*self.center)
         return rel_pos
 
-    def collide_with(self, shell):
-        """Checks if the tank is colliding with the `shell`.
+    def get_collision_rectangles(self):
+        """Returns the shapes representing parts of the tank for collision detection.
 
-        Calculates if the shapes representing parts of the tank and the `shell` overlap.
+        The shapes are cached and only rebuilt when the tank moves or the barrel rotates, so that
+        they can be shared by all the shells in flight.
 
-        Args:
-            shell (Shell): Shell to check the collisions with.
+        Returns:
+            list of Rectangle: Rectangles representing the body and the barrel of the tank.
+        """
+        key = (self.x, self.y, self.body.x, self.body.y, self.barrel.x, self.barrel.y,
+               self.barrel.width, self.barrel.height, self.barrel.angle)
+        if self._collision_key != key:
+            body_rect = collisions.Rectangle(Vector(*self.to_parent(self.body.center_x, self.body.center_y)),
+                                             Vector(*self.body.size),
+                                             -Vector(*self.body.size) / 2,
+                                             0)
+            barrel_rect = collisions.Rectangle(Vector(*self.to_parent(self.barrel.x, self.barrel.center_y)),
+                                               Vector(*self.barrel.size),
+                                               Vector(0, -self.barrel.height / 2),
+                                               self.barrel.angle)
+            self._collision_rects = [body_rect, barrel_rect]
+            bboxes = [rect.get_bbox() for rect in self._collision_rects]
+            self._collision_bbox = (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+                                    max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+            self._collision_key = key
+        return self._collision_rects
+
+    def get_collision_bbox(self):
+        """Returns the bounding box of the collision shapes of the tank.
 
         Returns:
-            bool: True if part of the tank is colliding with the shell, False otherwise.
+            (float, float, float, float): min x, min y, max x, max y of the box.
+        """
+        self.get_collision_rectangles()
+        return self._collision_bbox
 
+    def get_footprint(self):
+        """Returns the part of the terrain the tank stands on.
+
+        Returns:
+            (float, float, float): min x, max x and the y coordinate of the bottom of the tank body.
         """
-        body_rect = collisions.Rectangle(Vector(*self.to_parent(self.body.center_x, self.body.center_y)),
-                                         Vector(*self.body.size),
-                                         -Vector(*self.body.size) / 2,
-                                         0)
-        barrel_rect = collisions.Rectangle(Vector(*self.to_parent(self.barrel.x, self.barrel.center_y)),
-                                           Vector(*self.barrel.size),
-                                           Vector(0, -self.barrel.height / 2),
-                                           self.barrel.angle)
-        shell_rect = shell.get_rectangle()
-        return shell_rect.collide_rectangle(body_rect) or shell_rect.collide_rectangle(barrel_rect)
+        # the tank body size is set as half the size of the tank widget in the kv file
+        return self.x + self.width / 4, self.right - self.width / 4, self.y + self.height / 4
 
     def set_position(self, pos):
         """Sets the position of the bottom left corner of the tank body to `pos`.
@@ -305,6 +298,9 @@ class Player:
         traces (deque): Last `self.MAX_TRACES` traces of the shells fired by this player.
         kills (int): Number of players killed by this player.
         shots (int): Number of shots this player fired.
+        health (float): Remaining health of the tank of the player.
+        last_attacker (Player, optional): The player who damaged the tank of this player last, credited
+            with the kill if the tank is destroyed by a fall.
     """
     MAX_TRACES = 10
 
@@ -315,6 +311,8 @@ class Player:
         self.traces = deque([], self.MAX_TRACES)
         self.kills = 0
         self.shots = 0
+        self.health = MAX_HEALTH
+        self.last_attacker = None
 
     def add_trace(self, trace):
         """Add trace to history of traces.
@@ -335,18 +333,6 @@ class Player:
         """
         self.tank = tank
 
-    def collide_with(self, shell):
-        """Checks for collision of the `shell` with the players tank.
-
-        Args:
-            shell: The shell to check the collision with.
-
-        Returns:
-            bool: True if players tank is colliding with the `shell`, False otherwise.
-
-        """
-        return self.tank.collide_with(shell)
-
     def reset(self):
         """Clears game specific state from the player.
 
@@ -356,6 +342,8 @@ class Player:
         self.tank = None
         self.kills = 0
         self.shots = 0
+        self.health = MAX_HEALTH
+        self.last_attacker = None
 
 
 player_list = [
@@ -376,19 +364,17 @@ List of available player instances.
 
 
 class Terrain(Image):
-    """Terrain representation
+    """Graphical representation of the terrain.
 
-    Attributes:
-        solid_parts (list of list of int): Represents the solid parts of th
-            terrain. The outer list is indexed by x coordinates, the inner list contains ordered
-            list of y coordinates of start/end of the terrain. The list is ordered in increasing order
-            i.e. from bottom to top of the screen.
+    Draws the terrain stored in the `model`. The terrain is drawn chunk by chunk, only the chunks in the current
+    view are on the canvas and only the changed chunks are rebuilt when they come into the view.
 
-            In other words, represents vertical slices of the map, where in each slice we remember
-            where the terrain starts/ends. First value is always 0 ,representing the start of the terrain at 0.
+    Attributes:
+        model (TerrainModel): The terrain data.
+        column_group (int): Number of columns drawn as one quad, with the segments of the first of them.
     """
 
-    background_image = ObjectProperty(Image(source='singlecolor.png'))
+    background_image = ObjectProperty(None)
 
     def __init__(self, **kwargs):
         """Initializes the instance.
@@ -396,44 +382,99 @@ class Terrain(Image):
         Args:
             **kwargs: Arguments passed to the super constructor.
         """
+        # the background is loaded with the first terrain, not when this module is imported
+        kwargs.setdefault('background_image', CoreImage(BACKGROUND_SOURCE))
         super().__init__(**kwargs)
+        self.model = TerrainModel()
+        self.column_group = 1
+        self._color = (1, 1, 1, 1)
+        self._view = range(0)
+        self._chunk_meshes = {}
 
-    @staticmethod
-    def _get_segments(transitions):
-        """Generates segments of solid ground from the transitions.
+    @property
+    def solid_parts(self):
+        """list of list of float: The solid parts of the terrain, see `TerrainModel.solid_parts`."""
+        return self.model.solid_parts
 
-        Generates segments of solid ground from the given transitions, which represent
-        just the transitions from empty space to solid ground.
+    def set_solid_parts(self, solid_parts):
+        """Replaces the whole terrain.
 
-        Segments are generated from bottom to top, i.e. from lower y values to higher y values.
-        Each segment is represented by two y values, first of the bottom edge, second of the top edge.
+        Args:
+            solid_parts (list of list of float): The new terrain, see `TerrainModel.solid_parts`.
+        """
+        self.model.set_solid_parts(solid_parts)
+        self._chunk_meshes = {}
+
+    def set_column_group(self, column_group):
+        """Sets the number of columns drawn as one quad and redraws the terrain with it.
 
         Args:
-            transitions (list of float): The transitions from empty space to solid ground.
+            column_group (int): Number of the columns, divides `terrain.CHUNK_WIDTH`.
+        """
+        if column_group != self.column_group:
+            self.column_group = column_group
+            self._chunk_meshes = {}
+            self.redraw(self._color)
 
-        Yields:
-            float, float: Y coordinate of bottom, top part of the segment.
+    def set_view(self, min_x, max_x):
+        """Sets the range of x coordinates that is visible.
+
+        Only the chunks overlapping this range are drawn.
+
+        Args:
+            min_x (float): The lowest visible x coordinate.
+            max_x (float): The highest visible x coordinate.
         """
-        assert len(transitions) % 2 == 0
-        for i in range(len(transitions) // 2):
-            yield transitions[i * 2], transitions[i * 2 + 1]
+        view = self.model.chunk_range(min_x, max_x)
+        if view != self._view:
+            self._view = view
+            self.redraw(self._color)
 
     def redraw(self, color):
         """Redraw the terrain.
 
-        Redraws the terrain onto the canvas using the `color`.
+        Redraws the terrain in the view onto the canvas using the `color`.
+        Rebuilds only the chunks that changed since they were last drawn.
 
         Args:
             color (float, float, float, float): Color to draw the terrain with.
         """
+        self._color = color
         self.canvas.clear()
         with self.canvas:
             Rectangle(texture=self.background_image.texture, pos=self.pos, size=self.size)
             Color(color[0], color[1], color[2], color[3])
-            for x in range(len(self.solid_parts)):
-                for segment in self._get_segments(self.solid_parts[x]):
-                    # TODO: use GL_LINES to just push all lines into a buffer and draw then with one call
-                    Line(points=[x, segment[0], x, segment[1]])
+        for chunk_idx in self._view:
+            self.canvas.add(self._get_chunk_mesh(chunk_idx))
+
+    def _get_chunk_mesh(self, chunk_idx):
+        """Returns the mesh drawing the chunk `chunk_idx`, rebuilding it if the chunk changed.
+
+        Each segment of solid ground is drawn as a quad `column_group` units wide, all quads of the chunk are drawn
+        with a single mesh.
+
+        Args:
+            chunk_idx (int): Index of the chunk.
+
+        Returns:
+            Mesh: The mesh drawing the chunk.
+        """
+        if chunk_idx in self._chunk_meshes and chunk_idx not in self.model.changed_chunks:
+            return self._chunk_meshes[chunk_idx]
+
+        vertices = []
+        indices = []
+        columns = self.model.chunk_columns(chunk_idx)
+        for x in columns[::self.column_group]:
+            right = min(x + self.column_group, columns.stop)
+            for bot, top in self.model.get_segments(self.model.solid_parts[x]):
+                i = len(vertices) // 4
+                vertices.extend((x, bot, 0, 0, right, bot, 0, 0, right, top, 0, 0, x, top, 0, 0))
+                indices.extend((i, i + 1, i + 2, i + 2, i + 3, i))
+        mesh = Mesh(vertices=vertices, indices=indices, mode='triangles')
+        self._chunk_meshes[chunk_idx] = mesh
+        self.model.changed_chunks.discard(chunk_idx)
+        return mesh
 
     def collide_with(self, rectangle):
         """Checks if the `rectangle` is colliding with any solid part of the terrain.
@@ -444,62 +485,39 @@ class Terrain(Image):
         Returns:
             bool: True if the `rectangle` is colliding with the terrain, False otherwise.
         """
-        min_x, min_y, max_x, max_y = rectangle.get_bbox()
-        for x in range(max(math.floor(min_x), 0), min(math.ceil(max_x), len(self.solid_parts))):
-            for segment in self._get_segments(self.solid_parts[x]):
-                if rectangle.collide_line_segment(Vector(x, segment[0]), Vector(x, segment[1])):
-                    return True
-        return False
+        return self.model.collide_with(rectangle)
 
     def explode(self, circle):
         """Removes the terrain inside the `circle`.
 
-        Removes any terrain that is inside the given `circle`.
-
         Args:
             circle (Circle); Circle to remove the terrain in.
         """
-        min_x, min_y, max_x, max_y = circle.get_bbox()
-        for x in range(max(math.floor(min_x), 0), min(math.ceil(max_x) + 1, len(self.solid_parts))):
-            # go through the segments backwards and change/delete them
-            transitions = self.solid_parts[x]
-            assert len(transitions) % 2 == 0
-            for i in range(len(transitions) // 2 - 1, -1, -1):
-                bot = Vector(x, transitions[i * 2])
-                top = Vector(x, transitions[i * 2 + 1])
-                if not circle.collide_line_segment(bot, top):
-                    continue
-
-                # does collide
-                bot_col = circle.collide_point(bot)
-                top_col = circle.collide_point(top)
-                if bot_col and top_col:
-                    # delete segment
-                    del transitions[i * 2: i * 2 + 2]
-                elif bot_col:
-                    # move bot above the circle
-                    transitions[i * 2] = circle.get_y_at(bot.x)[1]
-                elif top_col:
-                    # move top below the circle
-                    transitions[i * 2 + 1] = circle.get_y_at(top.x)[2]
-                else:
-                    # split the existing segment
-                    c_y = circle.get_y_at(x)
-                    n_trans = [c_y[2], c_y[1]]
-                    transitions[i * 2 + 1: i * 2 + 1] = n_trans
+        self.model.explode(circle)
 
 
 class Map(RelativeLayout):
     """Class representing the whole playing field.
 
     Root class containing the terrain, tanks, shells and traces.
+    The children are positioned in world coordinates, the map displays the part of the world
+    seen by the `camera`.
 
     Attributes:
         terrain (Terrain): Terrain of the map.
         trace_display (TraceDisplay): Component for displaying the traces of shells.
+        shell_display (ShellDisplay): Component for displaying the shells in flight.
+        world_size (ReferenceListProperty): Size of the world in world units.
+        camera (Camera): Camera determining the displayed part of the world.
     """
+    ZOOM_STEP = 1.1
+
     terrain = ObjectProperty(None)
     trace_display = ObjectProperty(None)
+    shell_display = ObjectProperty(None)
+    world_width = NumericProperty(WORLD_SCREEN_WIDTH)
+    world_height = NumericProperty(WORLD_HEIGHT)
+    world_size = ReferenceListProperty(world_width, world_height)
     _terrain_color = (0.1, 0.64, 0.23, 1.0)
 
     def __init__(self, **kwargs):
@@ -508,28 +526,77 @@ class Map(RelativeLayout):
             **kwargs: Arguments are passed to the super constructor.
         """
         super().__init__(**kwargs)
+        self.camera = Camera(world_size=self.world_size, viewport_size=self.size)
+        # transforms the world coordinates of the children into the coordinates of the map
+        with self.canvas.before:
+            PushMatrix()
+            self._camera_scale = Scale(1, 1, 1)
+            self._camera_translate = Translate(0, 0)
+        with self.canvas.after:
+            PopMatrix()
+        self.camera.bind(x=self._on_camera, y=self._on_camera, scale=self._on_camera)
+        self.bind(size=self._on_size, world_size=self._on_world_size)
+
+    def _on_size(self, instance, value):
+        self.camera.viewport_size = value
+
+    def _on_world_size(self, instance, value):
+        self.camera.world_size = value
+
+    def _on_camera(self, instance, value):
+        """Updates the transformation and the visible part of the terrain when the camera moves.
+        """
+        self._camera_scale.xyz = (self.camera.scale, self.camera.scale, 1)
+        self._camera_translate.xy = (-self.camera.x, -self.camera.y)
+        min_x, min_y, max_x, max_y = self.camera.get_visible_rect()
+        self.terrain.set_view(min_x, max_x)
 
-    def terrain_collision(self, shell):
-        """Checks if the shell is colliding with any terrain.
-
-        Checks if the shell is colliding with any part of the terrain.
-        If it is, detonates the shell and removes any terrain in it's explosion radius.
+    def update(self, dt):
+        """Moves the camera towards its target.
 
         Args:
-            shell (Shell): The shell to check the collision with and possibly detonate.
+            dt (float): Time elapsed since the last update.
+        """
+        self.camera.update(dt)
 
-        Returns:
-            bool: True if the shell is colliding with any part of the terrain or is underneath the map, False otherwise.
+    def on_touch_down(self, touch):
+        """Zooms the camera using the mouse wheel and starts dragging the view.
         """
-        rect = shell.get_rectangle()
-        min_x, min_y, max_x, max_y = rect.get_bbox()
-        if min_y < 0:
+        if not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            if touch.button == 'scrolldown':
+                self.camera.zoom_by(self.ZOOM_STEP, self.to_local(*touch.pos))
+            elif touch.button == 'scrollup':
+                self.camera.zoom_by(1 / self.ZOOM_STEP, self.to_local(*touch.pos))
             return True
-        if not self.terrain.collide_with(rect):
-            return False
-        self.terrain.explode(collisions.Circle(rect.center, shell.explosion_radius))
+        touch.grab(self)
         return True
 
+    def on_touch_move(self, touch):
+        """Pans the camera while the view is dragged.
+        """
+        if touch.grab_current is self:
+            self.camera.pan(-touch.dx, -touch.dy)
+            return True
+        return super().on_touch_move(touch)
+
+    def on_touch_up(self, touch):
+        """Stops dragging the view.
+        """
+        if touch.grab_current is self:
+            touch.ungrab(self)
+            return True
+        return super().on_touch_up(touch)
+
+    def add_tank(self, tank):
+        """Adds the `tank` to the map, below the shells in flight.
+
+        Args:
+            tank (Tank): The tank to add.
+        """
+        self.add_widget(tank, index=self.children.index(self.shell_display) + 1)
+
     def redraw(self):
         """Redraws the terrain of the map.
         """
@@ -544,8 +611,11 @@ class Game(Screen):
 
     Attributes:
         map (Map): Map of the level currently played.
-        tracer (Tracer, optional): Instance tracing the path of the current shell. Is present only when `shell` is present.
-        shell (Shell, optional): The shell currently in flight. There can only be one. May not be present.
+        engine (ProjectileEngine): Engine moving all the shells in flight.
+        settler (TerrainSettler): Lets the terrain left floating by explosions fall down.
+        tank_physics (TankPhysics): Lets the tanks without the terrain under them fall down.
+        tracers (dict of (Shell, Tracer)): Instances tracing the paths of the shells fired by the players,
+            submunitions are not traced.
         wind (float, optional): Strength of the wind. Negative value represents wind direction towards lower values of x,
             positive towards higher values of x.
         init_players_count (int): Number of players the current level was started with. Is 0 when no level is currently
@@ -557,6 +627,29 @@ class Game(Screen):
         drag_coef (float): Drag coefficient of shells in the current level.
         explosion_radius (float): Radius of the circle of destroyed terrain by shell explosions in the current level.
         shell_mass (float): Mass of the shells in the current level.
+        map_screens (int): Minimal width of the world of the current level in screens.
+        submunitions (int): Number of submunitions the shells split into at the top of their trajectory in the current
+            level, 0 if the shells do not split.
+        simultaneous_fire (bool): If True, all players aim one after another and then fire at once, otherwise
+            players take turns firing.
+        settle_terrain (bool): If True, the terrain left floating by explosions falls down.
+        validate_maps (bool): If True, the maps on which some tank can not hit any other tank are generated again,
+            see `map_validation`.
+        playback_speed (int): How many times faster than the real time the world is simulated, `INSTANT_PLAYBACK`
+            if the shots are resolved immediately.
+        seed (int): Seed of the random number generator of the levels, 0 for a random seed.
+        level_seed (int): Seed of the random number generator of the current level.
+        random (Random): Random number generator of the current level, all random choices of the level
+            are made by it.
+        state_hashes (list of int): Hashes of the state of the world at the start of each turn of the current level,
+            each chained with the previous one, see `state_hash`.
+        session (NetworkThread, optional): Connection to the other peers of a network game, None in a hot-seat game.
+        network_level (int): Number of the current level of the network game, counted by the host, the hashes
+            of the states are tagged with it.
+        peers (int): Number of the peers controlling the players of the current level, 1 in a hot-seat game.
+        quality (QualityController): Adapts the detail of the rendering to keep the frames within `_FRAME_RATE`.
+        scheduler (SimulationScheduler): Events of the current level in the time of the simulation, advanced
+            with every step of the world.
     """
     _FRAME_RATE = 1.0 / 60.0
 
@@ -565,6 +658,7 @@ class Game(Screen):
     angle_in = ObjectProperty(None)
     wind_out = ObjectProperty(None)
     player_out = ObjectProperty(None)
+    health_out = ObjectProperty(None)
     fire_button = ObjectProperty(None)
     act_bar = ObjectProperty(None)
 
@@ -579,8 +673,14 @@ class Game(Screen):
             **kwargs: Arguments passed to the super constructor.
         """
         super().__init__(**kwargs)
-        self.tracer = None
-        self.shell = None
+        model = self.map.terrain.model
+        # the craters of the shells are compacted like the craters made by the terrain itself
+        self.engine = ProjectileEngine(model.min_span, model.max_segments)
+        self.settler = TerrainSettler(self.map.terrain.model)
+        self.tank_physics = TankPhysics(self.map.terrain.model)
+        self.tracers = {}
+        self.scheduler = SimulationScheduler()
+        self._aimed_shots = []
         self.wind = None
         self.update_event = None
         self.init_player_count = 0
@@ -594,12 +694,40 @@ class Game(Screen):
         self.drag_coef = DRAG_COEFFICIENT
         self.explosion_radius = DEFAULT_SHELL_EXPLOSION_RADIUS
         self.shell_mass = SHELL_MASS
+        self.map_screens = 1
+        self.submunitions = 0
+        self.simultaneous_fire = False
+        self.settle_terrain = False
+        self.validate_maps = False
+        self.playback_speed = 1
+        self.seed = 0
+        self.level_seed = 0
+        self.random = Random()
+        self.state_hashes = []
+        self._time = 0
+        self.session = None
+        self.network_level = 0
+        self.peers = 1
+        self._local_players = []
+        self._pending_inputs = deque()
+        self._validator = MapValidator(VALIDATION_BUDGET) if MapValidator is not None else None
+        self._validation_event = None
+        self._validated_map = None
+        self._level_tanks = []
+        self._map_attempt = 0
+        # the quality is kept across the levels, as it depends on the machine
+        self.quality = QualityController(self._FRAME_RATE)
+        self.quality.bind(level=self._on_quality)
 
     def reset(self):
         """Resets the instance to the state as it was after construction.
         """
-        self.tracer = None
-        self.shell = None
+        self.engine.clear()
+        self.settler.clear()
+        self.tank_physics.clear()
+        self.tracers = {}
+        self.scheduler.clear()
+        self._aimed_shots = []
         self.wind = None
         self.update_event = None
         self.init_player_count = 0
@@ -611,8 +739,68 @@ class Game(Screen):
         self.drag_coef = DRAG_COEFFICIENT
         self.explosion_radius = DEFAULT_SHELL_EXPLOSION_RADIUS
         self.shell_mass = SHELL_MASS
+        self.map_screens = 1
+        self.submunitions = 0
+        self.simultaneous_fire = False
+        self.settle_terrain = False
+        self.validate_maps = False
+        self.playback_speed = 1
+        self.seed = 0
+        self.level_seed = 0
+        self.random = Random()
+        self.state_hashes = []
+        self._time = 0
+        self.peers = 1
+        self._local_players = []
+        self._pending_inputs = deque()
+        self._validated_map = None
+        self._level_tanks = []
+        self._map_attempt = 0
         self._enable_input()
 
+    def set_session(self, session):
+        """Connects the game to the other peers of a network game.
+
+        The messages of the other peers are polled every frame for the whole life of the application.
+
+        Args:
+            session (NetworkThread): The started connection.
+        """
+        self.session = session
+        Clock.schedule_interval(self._poll_session, self._FRAME_RATE)
+
+    def get_settings(self):
+        """Returns the settings of the current level, which the other peers of a network game start the level with.
+
+        Returns:
+            dict: The settings, see `apply_settings`.
+        """
+        return {'players': len(self.players),
+                'gravity': self.gravity,
+                'max_muzzle_shell_vel': self.max_muzzle_shell_vel,
+                'drag_coef': self.drag_coef,
+                'max_wind': self.max_wind,
+                'explosion_radius': self.explosion_radius,
+                'shell_mass': self.shell_mass,
+                'map_screens': self.map_screens,
+                'submunitions': self.submunitions,
+                'simultaneous_fire': self.simultaneous_fire,
+                'settle_terrain': self.settle_terrain,
+                'playback_speed': self.playback_speed,
+                'seed': self.level_seed}
+
+    def apply_settings(self, settings):
+        """Sets the game up to play the next level with the `settings`.
+
+        Args:
+            settings (dict): The settings, the attributes of the game of the same name, except for `players`,
+                which is the number of the players.
+        """
+        self.players = player_list[:settings['players']]
+        for name in ('gravity', 'max_muzzle_shell_vel', 'drag_coef', 'max_wind', 'explosion_radius', 'shell_mass',
+                     'map_screens', 'submunitions', 'simultaneous_fire', 'settle_terrain', 'playback_speed', 'seed'):
+            setattr(self, name, settings[name])
+
     def on_pre_enter(self, *args):
         """Handles the pre_enter event of the screen.
 
@@ -622,42 +810,161 @@ class Game(Screen):
         Args:
             *args:
         """
-        self.init_player_count = len(self.players)
-        tank_x_pos = []
-        # space the tank across the whole map, adding random noise to their x position
-        avg_tank_dist = math.floor(self.map.size[0] / (len(self.players) + 1))
-        for i in range(len(self.players)):
-            tank_x_pos.append(
-                (i + 1) * avg_tank_dist + randrange(math.ceil(-avg_tank_dist / 4), math.floor(avg_tank_dist / 4)))
+        self._start_level()
 
-        # generate terrain with flat spaces at the tank possitions, SPACE_AROUND larger than the tanks
-        SPACE_AROUND = 4
-        self.map.terrain.solid_parts, tank_pos = generate_terrain(self.map.size, tank_x_pos,
-                                                                  (TANK_BODY_SIZE[0] + SPACE_AROUND, TANK_BODY_SIZE[1]))
-        for idx, player in enumerate(self.players):
+    def _start_level(self):
+        """Initializes and starts new level.
+
+        When the maps are validated, the level starts once a map passes the validation, which runs in the background
+        over the following frames. The host of a network game sends the settings of the level to the other peers,
+        which start the same level.
+        """
+        self.init_player_count = len(self.players)
+        self.level_seed = self.seed if self.seed != 0 else randrange(1, MAX_SEED + 1)
+        self.random = Random(self.level_seed)
+        # make the world wide enough so that the tanks are not too close to each other
+        self.map.world_size = (max(self.map_screens * WORLD_SCREEN_WIDTH, (len(self.players) + 1) * MIN_TANK_SPACING),
+                               WORLD_HEIGHT)
+        self._level_tanks = []
+        for player in self.players:
             tank = Tank(player.color, INIT_ANGLE, TANK_BODY_SIZE)
-            self.map.add_widget(tank)
+            # lay the barrel out now, the validation fires from its muzzle before the tank is added to the map
+            tank.do_layout()
+            self._level_tanks.append(tank)
+        self._map_attempt = 0
+        self._disable_input()
+        self._try_map()
+
+    def _try_map(self):
+        """Generates a map of the level and places the tanks of the level on it, then starts its validation
+        or the level.
+        """
+        solid_parts, tank_pos = self._generate_map()
+        for tank, pos in zip(self._level_tanks, tank_pos):
+            tank.set_position((pos[0] + SPACE_AROUND / 2, pos[1]))
+        # the other peers of a network game generate the map from the seed validated by the host
+        if (self.validate_maps and self._validator is not None and (self.session is None or self.session.is_host)
+                and self._map_attempt < MAX_MAP_ATTEMPTS - 1):
+            self._validate_map(solid_parts)
+            self._validated_map = solid_parts
+            self._validation_event = Clock.schedule_interval(self._poll_validation, self._FRAME_RATE)
+        else:
+            self._begin_level(solid_parts)
+
+    def _poll_validation(self, dt):
+        """Starts the level once its map passed the validation, or tries another map if it failed.
+
+        Args:
+            dt (float): Time elapsed since the last call of this method.
+
+        Returns:
+            bool: False when the validation finished, which unschedules this method.
+        """
+        playable = self._validator.poll()
+        if playable is None:
+            return True
+        self._validation_event = None
+        solid_parts = self._validated_map
+        self._validated_map = None
+        if playable:
+            self._begin_level(solid_parts)
+            return False
+        # the seed of the next attempt is derived from the seed of the failed one, so it is repeatable
+        self._map_attempt += 1
+        self.level_seed = self.random.randrange(1, MAX_SEED + 1)
+        self.random = Random(self.level_seed)
+        Logger.info(f'Game: regenerating the map unplayable for some tank with seed {self.level_seed}')
+        self._try_map()
+        return False
+
+    def _begin_level(self, solid_parts):
+        """Starts the level on the map with the tanks of the level placed on it.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns.
+        """
+        if self.session is not None and self.session.is_host:
+            self.peers = self.session.get_peers()
+            self.network_level += 1
+            self.session.send({'type': 'setup', 'settings': self.get_settings(), 'peers': self.peers,
+                               'level': self.network_level})
+        self._local_players = [player for idx, player in enumerate(self.players)
+                               if self.session is None or controls_player(self.session.peer_id, self.peers, idx)]
+        self.map.terrain.set_solid_parts(solid_parts)
+        self.map.camera.reset()
+        self.engine.terrain = self.map.terrain.model
+        self.engine.world_size = tuple(self.map.world_size)
+        for player, tank in zip(self.players, self._level_tanks):
+            self.map.add_tank(tank)
             player.set_tank(tank)
-            tank.set_position((tank_pos[idx][0] + SPACE_AROUND / 2, tank_pos[idx][1]))
+        self._level_tanks = []
 
         # start with random player
-        self._c_player_idx = randrange(len(self.players))
+        self._c_player_idx = self.random.randrange(len(self.players))
         self._switch_player()
+        self._record_state()
         self.map.redraw()
+        self.quality.restart()
         self.update_event = Clock.schedule_interval(self.update, self._FRAME_RATE)
 
+    def _generate_map(self):
+        """Generates the terrain of the level with the random number generator of the level.
+
+        Returns:
+            (list of list of float, list of Vector): The terrain columns and the positions of the tanks,
+                see `generate_terrain`.
+        """
+        tank_x_pos = []
+        # space the tank across the whole map, adding random noise to their x position
+        avg_tank_dist = math.floor(self.map.world_width / (len(self.players) + 1))
+        for i in range(len(self.players)):
+            tank_x_pos.append(
+                (i + 1) * avg_tank_dist + self.random.randrange(math.ceil(-avg_tank_dist / 4),
+                                                                math.floor(avg_tank_dist / 4)))
+
+        # generate terrain with flat spaces at the tank possitions, `SPACE_AROUND` larger than the tanks
+        return generate_terrain(self.map.world_size, tank_x_pos,
+                                (TANK_BODY_SIZE[0] + SPACE_AROUND, TANK_BODY_SIZE[1]),
+                                self.random)
+
+    def _validate_map(self, solid_parts):
+        """Starts checking if every tank of the level can hit some other tank on the generated map.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns, with the tanks of the level placed on them.
+        """
+        tops = [transitions[-1] if len(transitions) != 0 else 0 for transitions in solid_parts]
+        # the shells are fired from the muzzle of the barrel in its initial position
+        muzzles = [tuple(tank.get_muzzle_pos(tank.barrel.get_shell_size()[0])) for tank in self._level_tanks]
+        targets = [tuple(tank.center) for tank in self._level_tanks]
+        physics = {'gravity': self.gravity,
+                   'max_muzzle_shell_vel': self.max_muzzle_shell_vel,
+                   'drag_coef': self.drag_coef,
+                   'max_wind': self.max_wind,
+                   'explosion_radius': self.explosion_radius,
+                   'shell_mass': self.shell_mass,
+                   # all the tanks have the same barrel
+                   'shell_size': tuple(self._level_tanks[0].barrel.get_shell_size())}
+        self._validator.start(tops, muzzles, targets, tuple(self.map.world_size), physics, STEP)
+
     def _end(self):
         """Ends the current level.
 
         Removes all tracers, shells, players.
         Stops update events.
         """
-        self.update_event.cancel()
-        if self.tracer is not None:
-            self.tracer.end()
-
-        if self.shell is not None:
-            self.map.remove_widget(self.shell)
+        if self._validation_event is not None:
+            # the level ends before its map passed the validation
+            self._validation_event.cancel()
+            self._validation_event = None
+            self._validator.cancel()
+        if self.update_event is not None:
+            self.update_event.cancel()
+        for tracer in self.tracers.values():
+            tracer.end()
+
+        self.engine.clear()
+        self.map.shell_display.clear()
 
         for player in self.players.copy():
             self._remove_player(player)
@@ -665,6 +972,12 @@ class Game(Screen):
         self.map.trace_display.clear()
         self.reset()
 
+    def close(self):
+        """Stops the worker process validating the maps, when the application stops.
+        """
+        if self._validator is not None:
+            self._validator.close()
+
     def exit_to_menu(self):
         """Ends the level and switches to main menu.
         """
@@ -693,72 +1006,283 @@ class Game(Screen):
     def update(self, dt):
         """Updates the state of the game, moving it by `dt` in time.
 
-        Updates the state of the game, moving the current shell,
-        possibly calculating collisions and switching to other players.
+        The world is simulated in fixed steps of `STEP` seconds, `playback_speed` steps per frame time.
+        Each step moves the shells in flight, the settling terrain and the falling tanks and handles the impacts
+        of the shells. The turn ends and the next player gets the control only when all the shells detonated
+        and the world came to rest, so that nothing moves while the players aim and the state of the world
+        only depends on the seed and the inputs of the players.
+
+        The frames played back are measured by the `quality` controller.
 
         Args:
             dt (float): Time elapsed since the last call of this method.
         """
-        if self.shell is not None:
-            self.shell.update(dt)
-            collided, player = self._check_collisions(self.shell)
-            if not collided:
-                return
-
-            if len(self.players) == 1:
-                self._victory(self.init_player_count, self.players[0])
-                return
-
-            self.tracer.end()
-            if player is not self.shell.player:
-                self.shell.player.add_trace(Trace(self.shell.init_power,
-                                                  self.shell.init_angle,
-                                                  self.shell.wind,
-                                                  self.tracer.trace_points))
-            self.map.remove_widget(self.shell)
-            self.tracer = None
-            self.shell = None
+        start = time.perf_counter()
+        self.map.update(dt)
+        self._apply_remote_input()
+        if self._is_at_rest():
+            return
+
+        # a peer catching up with a network game resolves the shots instantly until it gets to the current turn
+        instant = self.playback_speed == INSTANT_PLAYBACK or len(self._pending_inputs) != 0
+        if instant:
+            steps = MAX_INSTANT_STEPS
+        else:
+            self._time = min(self._time + dt * self.playback_speed,
+                             MAX_STEPS_PER_UPDATE * self.playback_speed * STEP)
+            steps = 0
+            while self._time >= STEP:
+                self._time -= STEP
+                steps += 1
+        changed = False
+        for i in range(steps):
+            changed = self._step() or changed
+            if self._is_at_rest():
+                break
+        if changed:
+            self.map.redraw()
+
+        self.map.shell_display.draw_shells(self.engine.shells)
+        if len(self.engine.shells) != 0:
+            self.map.camera.follow(self.engine.shells[0].center)
+        if not self._is_at_rest():
+            if not instant:
+                self.quality.add_frame(dt, time.perf_counter() - start)
+            return
+
+        # the turn ended
+        self._time = 0
+        if not self._check_end():
             self._switch_player()
+            self._record_state()
+
+    def _is_at_rest(self):
+        """
+        Returns:
+            bool: True if no shell is in flight and no terrain nor tank is falling.
+        """
+        return len(self.engine.shells) == 0 and not self.settler.active and not self.tank_physics.active
+
+    def _step(self):
+        """Simulates one step of the world.
+
+        Returns:
+            bool: True if the terrain changed.
+        """
+        changed = False
+        if self.settler.active:
+            settled = self.settler.update(STEP)
+            if settled is not None:
+                self.tank_physics.add_columns(*settled, self.players)
+                self.engine.invalidate(*settled)
+                changed = True
+        if self.tank_physics.active:
+            for landing in self.tank_physics.update(STEP):
+                self._on_landing(landing)
+        shells = None
+        if len(self.engine.shells) != 0:
+            shells = self.engine.run(1, self.players)
+        # the events of the step, such as the samples of the tracers, see the shells before their impacts are handled
+        self.scheduler.advance(STEP)
+        if shells is not None:
+            changed = self._handle_shells(*shells) or changed
+        return changed
+
+    def _record_state(self):
+        """Records the hash of the state of the world at the start of a turn.
+        """
+        previous = self.state_hashes[-1] if len(self.state_hashes) != 0 else self.level_seed
+        self.state_hashes.append(hash_state(self.map.terrain.solid_parts, self.players, self.wind, previous))
+        if self.session is not None:
+            self.session.send({'type': 'hash', 'level': self.network_level, 'turn': len(self.state_hashes) - 1,
+                               'hash': self.state_hashes[-1]})
+
+    def _poll_session(self, dt):
+        """Handles the messages received from the other peers of the network game.
+
+        Args:
+            dt (float): Time elapsed since the last call of this method.
+        """
+        while not self.session.messages.empty():
+            message = self.session.messages.get()
+            if message['type'] == 'setup':
+                self._on_setup(message)
+            elif message['type'] == 'input':
+                # inputs of a level this peer left are ignored
+                if self.init_player_count != 0:
+                    self._pending_inputs.append(message)
+            elif message['type'] == 'desync':
+                self._on_desync(message)
+
+    def _on_setup(self, message):
+        """Starts the level the host of the network game started.
+
+        Args:
+            message (dict): The setup message, see `lockstep`.
+        """
+        if self.init_player_count != 0:
+            self._end()
+        self.apply_settings(message['settings'])
+        self.peers = message['peers']
+        self.network_level = message['level']
+        if self.manager.current == 'game':
+            self._start_level()
+        else:
+            self.manager.current = 'game'
 
-    def _check_collisions(self, shell):
-        """Checks if `shell` is colliding with anything.
+    def _on_desync(self, message):
+        """Handles the report of a peer whose state differs from the state of the host.
 
-        Checks whether the `shell` is colliding with any tank or the terrain.
+        The desynced peer can not continue the level, it leaves it and returns to the menu.
+
+        Args:
+            message (dict): The desync message, see `lockstep`.
+        """
+        if message['peer'] != self.session.peer_id:
+            Logger.warning(f"Lockstep: peer {message['peer']} desynced in turn {message['turn']}")
+            return
+        Logger.error(f"Lockstep: the state of the game desynced from the host in turn {message['turn']}")
+        if self.init_player_count != 0:
+            self.exit_to_menu()
+
+    def _apply_remote_input(self):
+        """Fires the shot of the current player received from the other peer, if it arrived and the world is at rest.
+        """
+        turn = len(self.state_hashes) - 1
+        # the inputs of the past turns were already fired, e.g. duplicates of an input
+        while len(self._pending_inputs) != 0 and self._pending_inputs[0]['turn'] < turn:
+            self._pending_inputs.popleft()
+        if len(self._pending_inputs) == 0 or not self._is_at_rest():
+            return
+        message = self._pending_inputs[0]
+        player = self._get_c_player()
+        # the inputs of the later turns and of the other players wait for their turn
+        if message['turn'] != turn or message['player'] != player.name:
+            return
+        self._pending_inputs.popleft()
+        self.power_in.value = message['power']
+        self.angle_in.value = message['angle']
+        # set the barrel exactly to the input of the other peer, whatever the input elements made of the value
+        player.tank.barrel.angle = message['angle']
+        self._fire(message['power'], message['angle'])
+
+    def _handle_shells(self, impacts, changed):
+        """Handles the result of the update of the shells.
 
         Args:
-            shell (Shell): The shell to check for collisions.
+            impacts (list of Impact): Impacts of the shells in the update.
+            changed ((int, int) or None): The range of x coordinates of the terrain changed in the update.
 
         Returns:
-            bool, Player: True, player if the shell collided with players tank,
-                True, None if the shell collided with terrain,
-                False, None if shell did not collide with anything.
+            bool: True if the terrain changed.
         """
-        player = self._collide_players(shell)
-        if player is not None:
-            self._get_c_player().kills += 1
-            self._remove_player(player)
-            return True, player
-        if self.map.terrain_collision(shell):
-            self.map.redraw()
-            return True, None
-        return False, None
+        for impact in impacts:
+            self._on_impact(impact)
+        if changed is None:
+            return False
+        if self.settle_terrain:
+            self.settler.add_columns(*changed)
+        self.tank_physics.add_columns(*changed, self.players)
+        return True
+
+    def _check_end(self):
+        """Ends the level if at most one player survived.
+
+        Returns:
+            bool: True if the level ended.
+        """
+        if len(self.players) == 1:
+            self._victory(self.init_player_count, self.players[0])
+            return True
+        if len(self.players) == 0:
+            # nobody survived
+            self.exit_to_menu()
+            return True
+        return False
+
+    def _on_impact(self, impact):
+        """Handles the end of the flight of a shell.
+
+        Damages the tank that was hit and the tanks in the explosion and records the trace of the shell.
+
+        Args:
+            impact (Impact): The impact of the shell.
+        """
+        shell = impact.shell
+        # the tank might have been destroyed by other shell in the same update
+        if impact.player is not None and impact.player in self.players:
+            self._damage(impact.player, DIRECT_HIT_DAMAGE, shell.player)
+        if impact.explosion is not None:
+            for player in self.players.copy():
+                damage = get_splash_damage(impact.explosion, player.tank.get_collision_bbox())
+                if damage > 0:
+                    self._damage(player, damage, shell.player)
+
+        tracer = self.tracers.pop(shell, None)
+        if tracer is None:
+            return
+        tracer.end()
+        # do not record the trace if the shooter is no longer in the game
+        if shell.player.tank is not None:
+            shell.player.add_trace(Trace(shell.init_power,
+                                         shell.init_angle,
+                                         shell.wind,
+                                         tracer.trace_points))
+
+    def _on_landing(self, landing):
+        """Handles the end of the fall of a tank.
+
+        Damages the tank by the fall, a tank that fell out of the world is destroyed.
+
+        Args:
+            landing (Landing): The landing of the tank.
+        """
+        player = landing.player
+        if player in self.players:
+            self._damage(player, player.health if landing.out_of_world else landing.damage)
+
+    def _damage(self, player, damage, attacker=None):
+        """Damages the tank of the `player`, removing the player from the game when its health runs out.
 
-    def _switch_player(self):
+        Args:
+            player (Player): The damaged player.
+            damage (float): Health the player loses.
+            attacker (Player, optional): Player who caused the damage, None if the damage was caused by a fall,
+                in which case the kill is credited to the last attacker of the `player`.
+        """
+        if attacker is not None:
+            player.last_attacker = attacker
+        player.health -= damage
+        if player.health > 0:
+            if player is self._get_c_player():
+                self.health_out.text = get_health_text(player.health)
+            return
+        if player.last_attacker is not None:
+            player.last_attacker.kills += 1
+        self._remove_player(player)
+
+    def _switch_player(self, new_wind=True):
         """Switches current player.
 
         Switches the player currently receiving user input.
+
+        Args:
+            new_wind (bool): If True, new wind is generated for the turn of the next player.
         """
 
         self._c_player_idx = (self._c_player_idx + 1) % len(self.players)
-        self.wind = self._generate_wind()
+        if new_wind:
+            self.wind = self._generate_wind()
         self.map.trace_display.clear()
+        self.map.camera.follow((self._get_c_player().tank.center_x, self._get_c_player().tank.center_y))
 
         if len(self._get_c_player().traces) > 0:
             last_trace = self._get_c_player().traces[-1]
-            self.map.trace_display.draw_trace(last_trace.points,
+            self.map.trace_display.draw_trace(last_trace.points[::self.quality.settings.trace_point_stride],
                                               self.map.trace_display.colors["previous"])
             self._set_bar_display(self._get_c_player().name,
                                   self._get_c_player().color,
+                                  self._get_c_player().health,
                                   last_trace.angle,
                                   last_trace.power,
                                   self.wind)
@@ -767,22 +1291,28 @@ class Game(Screen):
             # first switch of players
             self._set_bar_display(self._get_c_player().name,
                                   self._get_c_player().color,
+                                  self._get_c_player().health,
                                   INIT_ANGLE,
                                   INIT_POWER,
                                   self.wind)
-        self._enable_input()
+        if self._get_c_player() in self._local_players:
+            self._enable_input()
+        else:
+            self._disable_input()
 
-    def _set_bar_display(self, player_name, player_color, angle, power, wind):
+    def _set_bar_display(self, player_name, player_color, health, angle, power, wind):
         """Sets values on the UI bar.
         Args:
             player_name (str): Name of the current player.
             player_color (float, float, float, float): Color representing the current player.
+            health (float): Health of the current player.
             angle (float): Angle value displayed by the angle input element.
             power (float): Power value displayed by the power input element.
             wind (float): Wind value to be displayed by the wind element.
         """
         self.player_out.text = player_name
         self.player_out.color = player_color
+        self.health_out.text = get_health_text(health)
         self.wind_out.text = get_wind_text(wind)
         self.angle_in.value = angle
         self.power_in.value = power
@@ -801,35 +1331,59 @@ class Game(Screen):
                 the initial shell velocity vector.
         """
         player.shots += 1
-        self.shell = Shell(player,
-                           power,
-                           angle,
-                           self.max_muzzle_shell_vel * power / 100,
-                           self.shell_mass,
-                           self.gravity,
-                           self.wind,
-                           self.drag_coef,
-                           self.explosion_radius)
-        self.shell.size = player.tank.barrel.get_shell_size()
-        self.map.add_widget(self.shell, canvas='after')
-        # update the size of the shell based on the map size
-        self.map.do_layout()
-        self.shell.center = player.tank.get_muzzle_pos(self.shell.width)
-        # draw the shell above everything else
-        self.tracer = Tracer(self.map.trace_display, self.shell)
-
-    def _collide_players(self, shell):
-        """Checks for collisions between `shell` and all players.
-        Args:
-            shell (Shell): The shell to check for collisions.
+        shell = self._make_shell(player, power, angle)
+        self.engine.add(shell)
+        self.tracers[shell] = Tracer(self.map.trace_display, shell, self.scheduler,
+                                     self.quality.settings.trace_time_step)
+
+    def _make_shell(self, player, power, angle, barrel_angle=None):
+        """Creates the shell of the shot of the `player`, see `_shoot`.
+
+        Args:
+            barrel_angle (float, optional): Angle of the barrel of the tank, the current angle by default.
 
         Returns:
-            Player: Player if the `shell` collided with the player, None if the shell did not collide with any players.
+            Shell: The shell at the muzzle of the tank of the `player`.
         """
-        for player in self.players:
-            if player.collide_with(shell):
-                return player
-        return None
+        shell_size = player.tank.barrel.get_shell_size()
+        return Shell(player,
+                     power,
+                     angle,
+                     self.max_muzzle_shell_vel * power / 100,
+                     self.shell_mass,
+                     self.gravity,
+                     self.wind,
+                     self.drag_coef,
+                     self.explosion_radius,
+                     shell_size,
+                     player.tank.get_muzzle_pos(shell_size[0], barrel_angle),
+                     self.submunitions)
+
+    def evaluate_shot(self, power, angle):
+        """Evaluates the shot of the current player without changing the game, see `ProjectileEngine.evaluate`.
+
+        Args:
+            power (float): Power of the shot, see `_shoot`.
+            angle (float): Angle of the shot, see `_shoot`.
+
+        Returns:
+            list of Impact: The impacts of the shell and its submunitions.
+        """
+        # the shell leaves the barrel aimed at the `angle`, without turning the barrel
+        shell = self._make_shell(self._get_c_player(), power, angle, angle)
+        return self.engine.evaluate(shell, self.players)[0]
+
+    def _on_quality(self, instance, value):
+        """Applies the detail of the new quality level to the terrain and the tracers in flight.
+
+        Args:
+            instance (QualityController): The controller.
+            value (int): The new quality level.
+        """
+        settings = instance.settings
+        self.map.terrain.set_column_group(settings.terrain_column_group)
+        for tracer in self.tracers.values():
+            tracer.set_time_step(settings.trace_time_step)
 
     def _on_angle_input(self, instance, value):
         """Handles change in the angle input UI element.
@@ -845,6 +1399,8 @@ class Game(Screen):
         """Handles the press of the FIRE button.
 
         Switches the game to shell flight mode, with disabled input and shell flying.
+        With simultaneous fire, the shot is only aimed and the next player aims, until all players aimed
+        and all the shells are fired at once.
 
         Args:
             instance (Widget): The widget that triggered the event.
@@ -852,7 +1408,32 @@ class Game(Screen):
         self._disable_input()
         # check if player was writing angle value and forgot to hit enter
         self.angle_in.manual_validate_text()
-        self._shoot(self._get_c_player(), self.power_in.value, self.angle_in.value)
+        player = self._get_c_player()
+        if self.session is not None:
+            self.session.send({'type': 'input', 'turn': len(self.state_hashes) - 1, 'player': player.name,
+                               'player_idx': player_list.index(player),
+                               'power': self.power_in.value, 'angle': self.angle_in.value})
+        self._fire(self.power_in.value, self.angle_in.value)
+
+    def _fire(self, power, angle):
+        """Fires the shot of the current player.
+
+        Args:
+            power (float): Power of the shot, see `_shoot`.
+            angle (float): Angle of the shot, see `_shoot`.
+        """
+        self._disable_input()
+        if not self.simultaneous_fire:
+            self._shoot(self._get_c_player(), power, angle)
+            return
+
+        self._aimed_shots.append((self._get_c_player(), power, angle))
+        if len(self._aimed_shots) < len(self.players):
+            self._switch_player(new_wind=False)
+            return
+        for player, power, angle in self._aimed_shots:
+            self._shoot(player, power, angle)
+        self._aimed_shots = []
 
     def _get_c_player(self):
         """Gets the currently active player.
@@ -886,7 +1467,7 @@ class Game(Screen):
         Returns: New random value of wind, with random strength and dirrection, bounded by `self.max_wind`.
 
         """
-        return (random() - 0.5) * self.max_wind
+        return (self.random.random() - 0.5) * self.max_wind
 
     def _disable_input(self):
         """Disables all user input.
@@ -903,34 +1484,164 @@ class Game(Screen):
         self.fire_button.disabled = False
 
 
+def parse_args(argv):
+    """Parses the command line arguments of the application.
+
+    Args:
+        argv (list of str): The command line arguments left by Kivy, i.e. the arguments after `--`.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog='semk4.py', description='Scorched Earth MK4')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--host', nargs='?', const=DEFAULT_PORT, type=int, metavar='PORT',
+                       help=f'host a network game on the PORT, {DEFAULT_PORT} by default')
+    group.add_argument('--join', metavar='HOST[:PORT]', help='join the network game hosted on the HOST')
+    group.add_argument('--soak', type=int, metavar='LEVELS',
+                       help='play the LEVELS levels automatically, recording the resources used by the application')
+    parser.add_argument('--soak-report', default='soak_report.json', metavar='PATH',
+                        help='path of the report of the soak test, soak_report.json by default')
+    return parser.parse_args(argv)
+
+
+def create_session(args):
+    """Starts the network game given by the command line arguments.
+
+    Args:
+        args (argparse.Namespace): The command line arguments, see `parse_args`.
+
+    Returns:
+        NetworkThread or None: The started connection, None for a hot-seat game.
+    """
+    if args.host is not None:
+        peer = LockstepHost(port=args.host)
+    elif args.join is not None:
+        host, _, port = args.join.partition(':')
+        peer = LockstepClient(host, int(port) if port else DEFAULT_PORT)
+    else:
+        return None
+    session = NetworkThread(peer)
+    session.start()
+    return session
+
+
 class SEApp(App):
     """The class representing the whole application.
+
+    Attributes:
+        session (NetworkThread, optional): Connection to the other peers of a network game, None in a hot-seat game.
+        soak (SoakRunner, optional): Plays the levels automatically in a soak test, None in a normal game.
+        loader (BackgroundLoader): Loads the images after the menu appears, None until then.
+        game (Game): The game screen, None until it is built.
     """
+    def __init__(self, session=None, soak_levels=None, soak_report='soak_report.json', **kwargs):
+        """
+        Args:
+            session (NetworkThread, optional): Connection to the other peers of a network game.
+            soak_levels (int, optional): Number of the levels to play automatically in a soak test.
+            soak_report (str): Path of the report of the soak test.
+            **kwargs: Arguments passed to the super constructor.
+        """
+        super().__init__(**kwargs)
+        self.session = session
+        self.soak = None
+        self.loader = None
+        self.game = None
+        self._soak_levels = soak_levels
+        self._soak_report = soak_report
+
     def build(self):
         """Sets up the app window and builds the root element of the Widget hierarchy.
 
-        Returns: The screen manager as the root widget of the hierarchy, with the menu, game and victory screens loaded
-            and the menu screen displayed first.
+        Only the menu screen is built, the game and victory screens are built when they are first used.
+
+        Returns: The screen manager as the root widget of the hierarchy, with the menu screen displayed first.
         """
         # sets the minimum size of the window so that the user input's fit on the action bar
         Window.minimum_width = 800
         Window.minimum_height = 600
-        self.icon = "tank_icon.png"
+        self.icon = ICON_SOURCE
         self.title = "Scorched Earth MK4"
 
-        sm = ScreenManager()
+        sm = LazyScreenManager()
         menu = Menu(name='menu')
         sm.add_widget(menu)
-        sm.add_widget(Game(name='game'))
-        sm.add_widget(Victory(name='victory'))
+        sm.add_lazy_screen('game', self._create_game)
+        sm.add_lazy_screen('victory', lambda name: Victory(name=name))
+        if self.session is not None and not self.session.is_host:
+            # the levels are started by the host
+            menu.start_button.disabled = True
+            menu.start_button.text = 'Waiting for the host to start the game'
 
         menu.player_list = player_list
         menu.GRAVITY = GRAVITY
         menu.MAX_MUZZLE_SHELL_VEL = MAX_MUZZLE_SHELL_VEL
         menu.DRAG_COEFFICIENT = DRAG_COEFFICIENT
         menu.SHELL_MASS = SHELL_MASS
+        menu.WORLD_SCREEN_WIDTH = WORLD_SCREEN_WIDTH
+        menu.MIN_TANK_SPACING = MIN_TANK_SPACING
+        if self._soak_levels is not None:
+            self.soak = SoakRunner(sm, player_list, self._soak_levels, report_path=self._soak_report)
+            self.soak.start()
+        startup_profile.mark('build')
         return sm
 
+    def on_start(self):
+        """Waits for the first frame of the menu to finish the startup.
+        """
+        Window.bind(on_flip=self._on_first_frame)
+
+    def _on_first_frame(self, window):
+        """Logs the startup profile and loads the rest of the application in the background.
+
+        Args:
+            window (Window): The window which drew the frame.
+        """
+        window.unbind(on_flip=self._on_first_frame)
+        startup_profile.mark('first frame')
+        for line in startup_profile.get_report():
+            Logger.info(f'Startup: {line}')
+
+        sm = self.root
+        sm.get_screen('menu').update_analysis()
+        self.loader = BackgroundLoader()
+        if self.session is not None:
+            # the game screen polls the messages of the other peers
+            self.loader.add_task(lambda: sm.get_screen('game'))
+        self.loader.add_image(BACKGROUND_SOURCE)
+        self.loader.add_image(ICON_SOURCE)
+        self.loader.start(self._on_preloaded)
+
+    def _on_preloaded(self):
+        """Logs when the background loading finished.
+        """
+        Logger.info(f"Startup: preloaded at {startup_profile.mark('preloaded') * 1000:.0f} ms")
+
+    def _create_game(self, name):
+        """Builds the game screen.
+
+        Args:
+            name (str): Name of the screen.
+
+        Returns:
+            Game: The game screen, connected to the other peers of a network game.
+        """
+        game = Game(name=name)
+        if self.session is not None:
+            game.set_session(self.session)
+        self.game = game
+        return game
+
+    def on_stop(self):
+        """Disconnects from the other peers of the network game and stops the worker process of the game.
+        """
+        if self.session is not None:
+            self.session.close()
+        if self.game is not None:
+            self.game.close()
+
 
 if __name__ == '__main__':
-    SEApp().run()
+    arguments = parse_args(sys.argv[1:])
+    SEApp(create_session(arguments), arguments.soak, arguments.soak_report).run()
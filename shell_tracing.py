@@ -1,7 +1,6 @@
 from kivy.uix.widget import Widget
 from kivy.graphics.context_instructions import Color
 from kivy.graphics.vertex_instructions import Point
-from kivy.clock import Clock
 
 
 """Implements shell tracers
@@ -17,16 +16,19 @@ class Tracer:
 
     This class periodically samples the `self.shell` position and records it,
     while also pushing it into the give `self.display`, displaying it to the user.
+    The samples are scheduled in the time of the simulation on the `SimulationScheduler` of the game,
+    so that the trace is the same for any speed of the shell playback.
 
     Attributes:
-        TIME_STEP (float): Time interval between samples in seconds.
+        TIME_STEP (float): Default time interval between samples in seconds.
+        time_step (float): Time interval between samples in seconds.
         display (TraceDisplay): Display used to display the trace to the user.
         shell (Shell): The traced shell.
         trace_points (list of (float, float)): The trace points in chronological order.
     """
     TIME_STEP = 0.1
 
-    def __init__(self, trace_display, shell):
+    def __init__(self, trace_display, shell, scheduler, time_step=TIME_STEP):
         """Starts the sampling
 
         Initializes the Tracer and starts the sampling.
@@ -34,19 +36,35 @@ class Tracer:
         Args:
             trace_display (TraceDisplay): Display used to display the trace to the user.
             shell (Shell): The shell to trace.
+            scheduler (SimulationScheduler): Scheduler of the game the samples are scheduled on.
+            time_step (float): Time interval between samples in seconds.
         """
+        self.time_step = time_step
         self.display = trace_display
         self.shell = shell
         self.trace_points = []
-        self._event = Clock.schedule_interval(self.sample, self.TIME_STEP)
+        self._scheduler = scheduler
+        self._event = scheduler.schedule_interval(self.sample, time_step)
 
-    def sample(self, dt):
+    def set_time_step(self, time_step):
+        """Changes the time interval between samples, the next sample is taken `time_step` from now.
+
+        Args:
+            time_step (float): Time interval between samples in seconds.
+        """
+        if time_step == self.time_step or self._event.cancelled:
+            return
+        self.time_step = time_step
+        self._event.cancel()
+        self._event = self._scheduler.schedule_interval(self.sample, time_step)
+
+    def sample(self, dt=None):
         """The sampling method
 
-        Called with `self.TIME_STEP` period, samples the position of the `self.shell`.
+        Called with `self.time_step` period, samples the position of the `self.shell`.
 
         Args:
-            dt: Time elapsed since the last invocation of this method.
+            dt (float, optional): Time of the simulation elapsed since the last sample.
         """
         self.display.draw_point(self.shell.center, self.display.colors['current'])
         self.trace_points.append((self.shell.center_x, self.shell.center_y))
@@ -0,0 +1,275 @@
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.logger import Logger
+from kivy.uix.widget import Widget
+
+from shell_tracing import Tracer
+
+"""Soak testing of long sessions.
+
+The `SoakRunner` plays many consecutive levels on its own, going through the menu, the game and the victory
+screens, firing random shots for all the players. Of a few random shots, the first one which hits another tank is
+fired, evaluated by `Game.evaluate_shot` on the terrain, which is restored after each evaluation, so that the levels
+end and the snapshots of the terrain are soaked too. After every few levels it records a sample of the resources
+which could leak over a long session: the memory traced by `tracemalloc`, the numbers of the canvas instructions
+of the map and its parts, the numbers of live widgets, tracers, scheduled Clock events and events scheduled
+in the time of the simulation, the number of the children of the map and the total length of the traces of the players.
+
+When all the levels are played, the runner writes the samples and the growth of each resource into a JSON report
+and stops the application. A resource is reported as growing if it grew over the second half of the samples,
+so that the caches filled during the first levels are not reported.
+
+Attributes:
+    DRIVE_INTERVAL (float): Interval in seconds in which the runner acts on the current screen.
+    MAX_TURNS (int): Number of turns after which a level that did not end is left.
+    TOP_ALLOCATIONS (int): Number of the source lines with the largest growth of allocated memory reported.
+    AIM_CANDIDATES (int): Number of the random shots evaluated per turn, the last one is fired if none hits.
+"""
+
+DRIVE_INTERVAL = 0.05
+MAX_TURNS = 200
+TOP_ALLOCATIONS = 10
+AIM_CANDIDATES = 5
+
+
+def count_instructions(group):
+    """Counts the graphics instructions in the `group`, including the instructions in the nested groups.
+
+    Args:
+        group (InstructionGroup): The group to count.
+
+    Returns:
+        int: Number of the instructions.
+    """
+    count = 0
+    for instruction in group.children:
+        count += 1
+        if hasattr(instruction, 'children'):
+            count += count_instructions(instruction)
+    return count
+
+
+def count_canvas(widget):
+    """Counts the graphics instructions of the canvas of the `widget`, not of its children.
+
+    Args:
+        widget (Widget): The widget to count.
+
+    Returns:
+        int: Number of the instructions.
+    """
+    canvas = widget.canvas
+    # the before and after groups are created on access, so they are only counted if they exist
+    count = count_instructions(canvas)
+    if canvas.has_before:
+        count += count_instructions(canvas.before)
+    if canvas.has_after:
+        count += count_instructions(canvas.after)
+    return count
+
+
+def count_instances(cls):
+    """Counts the live instances of the `cls` tracked by the garbage collector.
+
+    Args:
+        cls (type): The class of the instances.
+
+    Returns:
+        int: Number of the instances.
+    """
+    # the type of an object is looked up directly, a proxy of a collected object raises on any access
+    return sum(1 for obj in gc.get_objects() if issubclass(type(obj), cls))
+
+
+def get_slope(values):
+    """Computes the slope of the least squares line through the values.
+
+    Args:
+        values (list of float): Values measured in regular intervals.
+
+    Returns:
+        float: The growth of the values per interval, 0 for fewer than two values.
+    """
+    n = len(values)
+    if n < 2:
+        return 0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    var = sum((x - mean_x) ** 2 for x in range(n))
+    return cov / var
+
+
+class SoakRunner:
+    """Plays many levels on its own, recording the resources used by the application.
+
+    Attributes:
+        levels (int): Number of the levels to play.
+        sample_every (int): Number of the levels between the samples.
+        report_path (str): Path of the JSON report.
+        samples (list of dict): The recorded samples.
+    """
+
+    def __init__(self, manager, players, levels, sample_every=1, report_path='soak_report.json', seed=0):
+        """
+        Args:
+            manager (ScreenManager): The screen manager of the application, with the menu, game and victory screens.
+            players (list of Player): All the players the levels can be played by.
+            levels (int): Number of the levels to play.
+            sample_every (int): Number of the levels between the samples.
+            report_path (str): Path of the JSON report.
+            seed (int): Seed of the random shots, 0 for a random seed.
+        """
+        self.levels = levels
+        self.sample_every = sample_every
+        self.report_path = report_path
+        self.samples = []
+        self._manager = manager
+        self._players = players
+        self._random = random.Random(seed if seed != 0 else None)
+        self._played = 0
+        self._turns = 0
+        self._screen = None
+        self._first_snapshot = None
+        self._start = 0
+        self._event = None
+
+    def start(self):
+        """Starts playing the levels.
+        """
+        tracemalloc.start()
+        self._start = time.perf_counter()
+        self._sample()
+        self._first_snapshot = tracemalloc.take_snapshot()
+        self._event = Clock.schedule_interval(self._drive, DRIVE_INTERVAL)
+
+    def _drive(self, dt):
+        """Acts on the current screen like a player would.
+
+        Args:
+            dt (float): Time elapsed since the last call of this method.
+        """
+        screen = self._manager.current_screen
+        if screen.name != self._screen:
+            self._on_screen_change(screen.name)
+        if self._event is None:
+            return False
+        if screen.name == 'menu':
+            screen.start_game()
+        elif screen.name == 'game':
+            self._play(screen)
+        elif screen.name == 'victory':
+            # the scores of the soak are not saved into the leaderboards
+            screen._switch_to_main_menu()
+
+    def _on_screen_change(self, name):
+        """Counts the played levels and samples the resources when the menu is entered after a level.
+
+        Args:
+            name (str): Name of the new current screen.
+        """
+        if name == 'menu' and self._screen is not None:
+            self._played += 1
+            if self._played % self.sample_every == 0 or self._played == self.levels:
+                self._sample()
+            if self._played >= self.levels:
+                self._finish()
+        elif name == 'game':
+            self._turns = 0
+        self._screen = name
+
+    def _play(self, game):
+        """Fires a random shot hitting another tank, if one is found, when the game waits for the input of a player.
+
+        Args:
+            game (Game): The game screen.
+        """
+        if game.fire_button.disabled:
+            return
+        self._turns += 1
+        if self._turns > MAX_TURNS:
+            game.exit_to_menu()
+            return
+        for _ in range(AIM_CANDIDATES):
+            power = self._random.uniform(30, 100)
+            angle = self._random.uniform(game.angle_in.min, game.angle_in.max)
+            if any(impact.player not in (None, impact.shell.player) for impact in game.evaluate_shot(power, angle)):
+                break
+        game.power_in.value = power
+        game.angle_in.value = angle
+        game.fire_button.dispatch('on_press')
+
+    def _sample(self):
+        """Records the current usage of the resources.
+
+        The resources of the game screen are only recorded once the screen is built, sampling them must not build it.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        sample = {
+            'level': self._played,
+            'time': time.perf_counter() - self._start,
+            'traced_memory': current,
+            'peak_traced_memory': peak,
+            'widgets': count_instances(Widget),
+            'tracers': count_instances(Tracer),
+            'player_traces': sum(len(player.traces) for player in self._players),
+            'clock_events': len(Clock.get_events()),
+        }
+        # `screen_names` lists only the built screens, unlike `has_screen` of the lazy screen manager
+        if 'game' in self._manager.screen_names:
+            game = self._manager.get_screen('game')
+            sample.update({
+                'terrain_instructions': count_canvas(game.map.terrain),
+                'trace_display_instructions': count_canvas(game.map.trace_display),
+                'map_instructions': count_canvas(game.map),
+                'map_children': len(game.map.children),
+                'simulation_events': len(game.scheduler),
+            })
+        self.samples.append(sample)
+
+    def get_report(self):
+        """Computes the growth of each of the recorded resources.
+
+        Returns:
+            dict: For each resource the first, last and maximal value, the slope over the second half of the samples
+                in units per sample and whether it is growing. The resources of the game screen are counted from
+                the first sample after the screen was built.
+        """
+        report = {}
+        for key in self.samples[-1]:
+            if key in ('level', 'time'):
+                continue
+            values = [sample[key] for sample in self.samples if key in sample]
+            slope = get_slope(values[len(values) // 2:])
+            report[key] = {'first': values[0],
+                           'last': values[-1],
+                           'max': max(values),
+                           'slope': slope,
+                           'growing': slope > 0 and values[-1] > values[len(values) // 2]}
+        return report
+
+    def _finish(self):
+        """Writes the report and stops the application.
+        """
+        self._event.cancel()
+        self._event = None
+        snapshot = tracemalloc.take_snapshot()
+        allocations = [{'source': str(stat.traceback), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                       for stat in snapshot.compare_to(self._first_snapshot, 'lineno')[:TOP_ALLOCATIONS]]
+        tracemalloc.stop()
+        report = self.get_report()
+        with open(self.report_path, 'w', encoding='utf-8') as report_file:
+            json.dump({'levels': self._played, 'growth': report, 'top_allocations': allocations,
+                       'samples': self.samples}, report_file, indent=2)
+        for key, growth in report.items():
+            if growth['growing']:
+                Logger.warning(f"Soak: {key} grows by {growth['slope']:.1f} per sample, "
+                               f"from {growth['first']} to {growth['last']}")
+        Logger.info(f'Soak: played {self._played} levels, report written to {self.report_path}')
+        App.get_running_app().stop()
@@ -0,0 +1,96 @@
+import builtins
+import sys
+import time
+
+"""Profiling of the startup of the application.
+
+The `StartupProfile` measures how long the imports of the modules take and when the phases of the startup,
+such as the building of the application or the first frame of the menu, are reached. This module only uses
+the standard library, so that it can be imported before any other module of the application and measure all
+their imports.
+
+Attributes:
+    REPORTED_IMPORTS (int): Number of the slowest imports listed in the report.
+"""
+
+REPORTED_IMPORTS = 10
+
+
+class StartupProfile:
+    """Measures the imports and the phases of the startup.
+
+    Only the outermost imports are measured, the time of an import includes the imports of all the modules
+    it imports itself. Modules which are already imported are not measured.
+
+    Attributes:
+        start (float): Time of the creation of the profile, from `time.perf_counter`.
+        imports (dict): Time in seconds spent importing each module.
+        phases (list of (str, float)): The reached phases and the times in seconds since the `start`
+            they were reached at.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = {}
+        self.phases = []
+        self._original_import = None
+        self._depth = 0
+
+    def trace_imports(self):
+        """Starts measuring the imports.
+        """
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def stop_tracing(self):
+        """Stops measuring the imports.
+        """
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Imports the module like `builtins.__import__`, measuring the time of the outermost imports.
+        """
+        outermost = self._depth == 0 and level == 0 and name not in sys.modules
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if outermost:
+                self.imports[name] = self.imports.get(name, 0) + time.perf_counter() - start
+
+    def mark(self, phase):
+        """Records that the startup reached the `phase`.
+
+        Args:
+            phase (str): Name of the phase.
+
+        Returns:
+            float: Time in seconds since the `start`.
+        """
+        elapsed = time.perf_counter() - self.start
+        self.phases.append((phase, elapsed))
+        return elapsed
+
+    def get_report(self):
+        """Describes where the startup time went.
+
+        Returns:
+            list of str: Lines of the report, the phases in the order they were reached and the
+                `REPORTED_IMPORTS` slowest imports.
+        """
+        lines = []
+        previous = 0
+        for phase, elapsed in self.phases:
+            lines.append(f'{phase}: at {elapsed * 1000:.0f} ms (+{(elapsed - previous) * 1000:.0f} ms)')
+            previous = elapsed
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:REPORTED_IMPORTS]
+        total = sum(self.imports.values())
+        lines.append(f'imports: {total * 1000:.0f} ms in {len(self.imports)} modules, the slowest:')
+        for name, duration in slowest:
+            lines.append(f'    {name}: {duration * 1000:.0f} ms')
+        return lines
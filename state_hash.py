@@ -0,0 +1,60 @@
+import struct
+import zlib
+from array import array
+from itertools import chain
+
+"""Hashing of the state of the game world.
+
+A hash of the world state is computed after every turn and chained with the hash of the previous turn, so that
+two runs of the same game can be compared turn by turn by comparing a single number. The hash covers the terrain,
+the tanks and the wind, all the state the outcome of the following turns depends on. Floats are hashed by their
+exact binary representation, so the hashes match only for bit-exact simulations.
+"""
+
+
+def hash_terrain(solid_parts, value=0):
+    """Hashes the terrain columns.
+
+    Args:
+        solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        value (int, optional): Hash to continue from.
+
+    Returns:
+        int: The hash.
+    """
+    value = zlib.crc32(array('I', [len(transitions) for transitions in solid_parts]).tobytes(), value)
+    return zlib.crc32(array('d', chain.from_iterable(solid_parts)).tobytes(), value)
+
+
+def hash_players(players, value=0):
+    """Hashes the state of the `players` and their tanks.
+
+    Args:
+        players (list of Player): The players in the game.
+        value (int, optional): Hash to continue from.
+
+    Returns:
+        int: The hash.
+    """
+    for player in players:
+        tank = player.tank
+        value = zlib.crc32(player.name.encode(), value)
+        value = zlib.crc32(struct.pack('<4d', tank.x, tank.y, tank.barrel.angle, player.health), value)
+    return value
+
+
+def hash_state(solid_parts, players, wind, previous=0):
+    """Hashes the state of the world, chained with the hash of the `previous` state.
+
+    Args:
+        solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        players (list of Player): The players in the game.
+        wind (float): The wind.
+        previous (int, optional): Hash of the previous state.
+
+    Returns:
+        int: The hash.
+    """
+    value = zlib.crc32(struct.pack('<Id', previous, wind or 0))
+    value = hash_terrain(solid_parts, value)
+    return hash_players(players, value)
@@ -0,0 +1,151 @@
+import math
+
+"""Falling of the tanks and the damage they take.
+
+Tanks are not destroyed by the first hit, each player has `MAX_HEALTH` points of health, which are lost by direct
+hits, by the splash of explosions nearby and by falling down when the terrain under the tank is destroyed.
+
+Whether a tank is supported is only checked for the tanks above the columns changed by explosions or settling
+terrain, and is answered by the terrain skyline, so that the tanks standing on untouched terrain cost nothing.
+
+Attributes:
+    MAX_HEALTH (float): Health of a tank at the start of the game.
+    DIRECT_HIT_DAMAGE (float): Damage of a shell hitting the tank.
+    SPLASH_DAMAGE (float): Damage of an explosion right next to the tank, the damage decreases linearly
+        to 0 at the edge of the explosion.
+    FALL_ACCELERATION (float): Acceleration of the falling tanks in world units per second squared.
+    SAFE_FALL_HEIGHT (float): Height a tank can fall from without taking any damage.
+    FALL_DAMAGE (float): Damage per world unit of fall above the `SAFE_FALL_HEIGHT`.
+    SUPPORT_TOLERANCE (float): Distance between the tank and the terrain below it at which the tank is
+        still considered standing on the terrain.
+"""
+
+MAX_HEALTH = 100
+DIRECT_HIT_DAMAGE = 70
+SPLASH_DAMAGE = 60
+FALL_ACCELERATION = 400
+SAFE_FALL_HEIGHT = 20
+FALL_DAMAGE = 0.5
+SUPPORT_TOLERANCE = 0.5
+
+
+def get_splash_damage(explosion, bbox):
+    """Returns the damage done by the `explosion` to a tank with the bounding box `bbox`.
+
+    Args:
+        explosion (Circle): The explosion.
+        bbox (float, float, float, float): min x, min y, max x, max y of the tank.
+
+    Returns:
+        float: The damage, 0 if the tank is outside the explosion.
+    """
+    # distance to the closest point of the box
+    dx = max(bbox[0] - explosion.pos.x, 0, explosion.pos.x - bbox[2])
+    dy = max(bbox[1] - explosion.pos.y, 0, explosion.pos.y - bbox[3])
+    dist = math.hypot(dx, dy)
+    if dist >= explosion.r:
+        return 0
+    return SPLASH_DAMAGE * (1 - dist / explosion.r)
+
+
+def get_fall_damage(height):
+    """Returns the damage done to a tank by a fall from `height`.
+
+    Args:
+        height (float): Distance the tank fell.
+
+    Returns:
+        float: The damage.
+    """
+    return max(height - SAFE_FALL_HEIGHT, 0) * FALL_DAMAGE
+
+
+class Landing:
+    """End of the fall of a tank.
+
+    Attributes:
+        player (Player): Player whose tank fell.
+        height (float): Distance the tank fell.
+        damage (float): Damage the tank took by the fall.
+        out_of_world (bool): True if there was no terrain under the tank and it fell out of the world.
+    """
+    def __init__(self, player, height, out_of_world=False):
+        self.player = player
+        self.height = height
+        self.damage = get_fall_damage(height)
+        self.out_of_world = out_of_world
+
+
+class TankPhysics:
+    """Lets the tanks without the terrain under them fall down.
+
+    Attributes:
+        terrain (TerrainModel): The terrain the tanks stand on.
+    """
+
+    def __init__(self, terrain):
+        """
+        Args:
+            terrain (TerrainModel): The terrain the tanks stand on.
+        """
+        self.terrain = terrain
+        # falling players, the velocity of their fall and the height they started to fall from
+        self._falling = {}
+
+    @property
+    def active(self):
+        """bool: True if any tank is falling."""
+        return len(self._falling) != 0
+
+    def add_columns(self, first, last, players):
+        """Starts the fall of the tanks of the `players` standing over the changed columns without support.
+
+        Args:
+            first (int): The first changed column.
+            last (int): The last changed column.
+            players (list of Player): Players whose tanks may have lost the support.
+        """
+        for player in players:
+            if player in self._falling:
+                continue
+            min_x, max_x, bottom = player.tank.get_footprint()
+            if math.ceil(max_x) <= first or math.floor(min_x) > last:
+                continue
+            if self.terrain.get_support(min_x, max_x, bottom) < bottom - SUPPORT_TOLERANCE:
+                self._falling[player] = (0, bottom)
+
+    def update(self, dt):
+        """Moves the falling tanks by `dt` in time.
+
+        Args:
+            dt (float): Time elapsed since the last update.
+
+        Returns:
+            list of Landing: The tanks that landed in this update.
+        """
+        landings = []
+        for player, (velocity, start) in list(self._falling.items()):
+            if player.tank is None:
+                # the player was removed from the game during the fall
+                del self._falling[player]
+                continue
+            min_x, max_x, bottom = player.tank.get_footprint()
+            velocity += FALL_ACCELERATION * dt
+            support = self.terrain.get_support(min_x, max_x, bottom)
+            bottom = max(bottom - velocity * dt, support)
+            if bottom < 0:
+                del self._falling[player]
+                landings.append(Landing(player, start, out_of_world=True))
+                continue
+            player.tank.set_position((min_x, bottom))
+            if bottom == support:
+                del self._falling[player]
+                landings.append(Landing(player, start - bottom))
+            else:
+                self._falling[player] = (velocity, start)
+        return landings
+
+    def clear(self):
+        """Stops the fall of all the tanks.
+        """
+        self._falling = {}
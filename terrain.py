@@ -0,0 +1,504 @@
+import math
+import struct
+import weakref
+from array import array
+from itertools import chain
+
+from kivy.vector import Vector
+
+from explosions import ExplosionQueue, MIN_SPAN, MAX_SEGMENTS
+from terrain_index import Skyline, ColumnPyramid, OccupancyMask, NO_TERRAIN
+
+"""Terrain model.
+
+Implements the representation of the map terrain, independent of its graphical representation.
+The terrain is stored as vertical slices (columns) of the map, one column per unit of the world x axis.
+Columns are grouped into chunks of `CHUNK_WIDTH` columns. Chunks are the unit of the rendering
+bookkeeping, so that on maps many screens wide only the chunks in the view are drawn.
+The `skyline` of the terrain is maintained with every change, so that the columns under a shell
+are only checked for collisions when the shell is not above all of them, and the `mask` of the cells
+containing terrain rejects the shells in empty space under the skyline without walking the segments.
+
+The columns are never modified in place, a changed column is always replaced by a new list. Thanks to that,
+a `TerrainSnapshot` only keeps the original lists of the columns changed after it was taken, so rewinding a turn
+or evaluating what a shot would do costs memory proportional to the crater, not to the map.
+
+Every change of the terrain is recorded in the `TerrainJournal` of the terrain as a `TerrainDelta`,
+so the consumers of the terrain, such as renderers, network peers and replays, can follow the terrain
+by applying just the changes since the version they saw last.
+
+Attributes:
+    CHUNK_WIDTH (int): Number of columns in one chunk.
+"""
+
+CHUNK_WIDTH = 64
+
+
+class TerrainModel:
+    """Column based terrain representation.
+
+    Attributes:
+        solid_parts (list of list of float): Represents the solid parts of the terrain. The outer list is indexed
+            by x coordinates, the inner list contains ordered list of y coordinates of start/end of the terrain.
+            The list is ordered in increasing order, i.e. from bottom to top of the map.
+
+            In other words, represents vertical slices of the map, where in each slice we remember
+            where the terrain starts/ends. After generation, the first value is always 0, representing the start
+            of the terrain at 0.
+        skyline (Skyline): Top of the terrain in each column.
+        pyramid (ColumnPyramid): Bounds of the terrain in blocks of columns, used for the line casts.
+        mask (OccupancyMask): The world cells containing solid terrain.
+        changed_chunks (set of int): Indexes of the chunks changed since the last time they were drawn.
+        journal (TerrainJournal): The changes of the terrain.
+        min_span (float): Minimal thickness of the segments and the gaps left by the explosions,
+            see `explosions.compact_transitions`.
+        max_segments (int): Maximal number of segments of a column left by the explosions.
+    """
+
+    def __init__(self, solid_parts=None, min_span=MIN_SPAN, max_segments=MAX_SEGMENTS):
+        """
+        Args:
+            solid_parts (list of list of float, optional): Initial terrain, see `solid_parts`.
+            min_span (float): Minimal thickness of the segments and the gaps left by the explosions.
+            max_segments (int): Maximal number of segments of a column left by the explosions.
+        """
+        self.min_span = min_span
+        self.max_segments = max_segments
+        self.solid_parts = []
+        self.skyline = Skyline([])
+        self.pyramid = ColumnPyramid([])
+        self.mask = OccupancyMask([])
+        self.changed_chunks = set()
+        self._snapshots = weakref.WeakSet()
+        self.journal = TerrainJournal()
+        self.set_solid_parts(solid_parts if solid_parts is not None else [])
+
+    @property
+    def width(self):
+        """int: Number of columns of the terrain."""
+        return len(self.solid_parts)
+
+    @property
+    def num_chunks(self):
+        """int: Number of chunks of the terrain, the last one may be narrower than `CHUNK_WIDTH`."""
+        return math.ceil(len(self.solid_parts) / CHUNK_WIDTH)
+
+    def set_solid_parts(self, solid_parts):
+        """Replaces the whole terrain.
+
+        Args:
+            solid_parts (list of list of float): The new terrain, see `solid_parts`.
+        """
+        for snapshot in self._snapshots:
+            snapshot._on_replaced()
+        self.solid_parts = solid_parts
+        self.journal.append(0, list(solid_parts), reset=True)
+        self.skyline = Skyline(solid_parts)
+        self.pyramid = ColumnPyramid(solid_parts)
+        self.mask = OccupancyMask(solid_parts)
+        self.changed_chunks = set(range(self.num_chunks))
+
+    def chunk_range(self, min_x, max_x):
+        """Returns the indexes of chunks overlapping the x interval [`min_x`, `max_x`].
+
+        Args:
+            min_x (float): Lower bound of the interval.
+            max_x (float): Upper bound of the interval.
+
+        Returns:
+            range: Indexes of the chunks, clipped to the chunks of the terrain.
+        """
+        first = max(math.floor(min_x) // CHUNK_WIDTH, 0)
+        last = min(math.floor(max_x) // CHUNK_WIDTH, self.num_chunks - 1)
+        return range(first, last + 1)
+
+    def chunk_columns(self, chunk_idx):
+        """Returns the x coordinates of the columns in the chunk `chunk_idx`.
+
+        Args:
+            chunk_idx (int): Index of the chunk.
+
+        Returns:
+            range: x coordinates of the columns of the chunk.
+        """
+        start = chunk_idx * CHUNK_WIDTH
+        return range(start, min(start + CHUNK_WIDTH, len(self.solid_parts)))
+
+    def get_max_top(self, min_x, max_x):
+        """Returns the height of the highest terrain in the x interval [`min_x`, `max_x`].
+
+        Args:
+            min_x (float): Lower bound of the interval.
+            max_x (float): Upper bound of the interval.
+
+        Returns:
+            float: The highest y coordinate of any solid terrain in the interval, `NO_TERRAIN` if there is none.
+        """
+        return self.skyline.max_top(math.floor(min_x), math.ceil(max_x))
+
+    def get_support(self, min_x, max_x, y):
+        """Returns the height of the highest terrain surface at or below `y` in the x interval [`min_x`, `max_x`].
+
+        When all the terrain in the interval is below `y`, the answer is given by the skyline, the segments
+        of the columns are only searched when some terrain reaches above `y`.
+
+        Args:
+            min_x (float): Lower bound of the interval.
+            max_x (float): Upper bound of the interval.
+            y (float): The height to search the surface below.
+
+        Returns:
+            float: The height of the surface, `y` if the terrain at `y` is solid, `NO_TERRAIN` if there is
+                no terrain below `y`.
+        """
+        min_col = max(math.floor(min_x), 0)
+        max_col = min(math.ceil(max_x), len(self.solid_parts)) - 1
+        top = self.skyline.max_top(min_col, max_col)
+        if top <= y:
+            return top
+        support = NO_TERRAIN
+        tops = self.skyline.tops
+        for x in range(min_col, max_col + 1):
+            if tops[x] <= y:
+                support = max(support, tops[x])
+                continue
+            for bot, top in self.get_segments(self.solid_parts[x]):
+                if bot > y:
+                    break
+                if top >= y:
+                    return y
+                support = max(support, top)
+        return support
+
+    def is_solid(self, x, y):
+        """Checks if the world cell containing the point contains solid terrain.
+
+        Args:
+            x (float): x coordinate of the point.
+            y (float): y coordinate of the point.
+
+        Returns:
+            bool: True if the cell contains solid terrain, see `OccupancyMask`.
+        """
+        return self.mask.is_solid(x, y)
+
+    @staticmethod
+    def get_segments(transitions):
+        """Generates segments of solid ground from the transitions.
+
+        Generates segments of solid ground from the given transitions, which represent
+        just the transitions from empty space to solid ground.
+
+        Segments are generated from bottom to top, i.e. from lower y values to higher y values.
+        Each segment is represented by two y values, first of the bottom edge, second of the top edge.
+
+        Args:
+            transitions (list of float): The transitions from empty space to solid ground.
+
+        Yields:
+            float, float: Y coordinate of bottom, top part of the segment.
+        """
+        assert len(transitions) % 2 == 0
+        for i in range(len(transitions) // 2):
+            yield transitions[i * 2], transitions[i * 2 + 1]
+
+    def collide_with(self, rectangle):
+        """Checks if the `rectangle` is colliding with any solid part of the terrain.
+
+        The `rectangle` above the skyline is rejected without checking any columns, otherwise only the columns
+        whose cells under the bounding box of the `rectangle` contain terrain are checked.
+
+        Args:
+            rectangle (Rectangle): The rectangle to check.
+
+        Returns:
+            bool: True if the `rectangle` is colliding with the terrain, False otherwise.
+        """
+        min_x, min_y, max_x, max_y = rectangle.get_bbox()
+        min_col = max(math.floor(min_x), 0)
+        max_col = min(math.ceil(max_x), len(self.solid_parts)) - 1
+        if self.skyline.max_top(min_col, max_col) < min_y:
+            return False
+        rows = self.mask.get_rows(min_y, max_y)
+        columns = self.mask.columns
+        for x in range(min_col, max_col + 1):
+            if columns[x] & rows == 0:
+                continue
+            for segment in self.get_segments(self.solid_parts[x]):
+                if rectangle.collide_line_segment(Vector(x, segment[0]), Vector(x, segment[1])):
+                    return True
+        return False
+
+    def explode(self, circle):
+        """Removes the terrain inside the `circle`.
+
+        Removes any terrain that is inside the given `circle`. To remove the terrain of multiple explosions,
+        use `ExplosionQueue`, which merges the overlapping explosions. The changed columns are compacted
+        with the `min_span` and `max_segments` of the terrain.
+
+        Args:
+            circle (Circle); Circle to remove the terrain in.
+
+        Returns:
+            (int, int) or None: The range of x coordinates of the changed columns, None if nothing changed.
+        """
+        queue = ExplosionQueue(self.min_span, self.max_segments)
+        queue.add(circle)
+        return queue.apply(self)
+
+    def set_columns(self, columns):
+        """Replaces the transitions of the given columns.
+
+        The lists of transitions are never modified in place, a changed column is always given a new list.
+
+        Args:
+            columns (dict of (int, list of float)): New transitions for each changed column.
+
+        Returns:
+            (int, int): The range of x coordinates of the changed columns.
+        """
+        for snapshot in self._snapshots:
+            snapshot._on_changed(self.solid_parts, columns)
+        for x, transitions in columns.items():
+            self.solid_parts[x] = transitions
+        first = min(columns)
+        last = max(columns)
+        self.journal.append(first, self.solid_parts[first:last + 1])
+        self._columns_changed(first, last)
+        return first, last
+
+    def snapshot(self):
+        """Takes a snapshot of the terrain, which the terrain can be restored to later.
+
+        The snapshot shares all the columns with the terrain, it only keeps the original of each column
+        when the column is changed. A snapshot which is no longer referenced is dropped by the terrain.
+
+        Returns:
+            TerrainSnapshot: The snapshot of the current terrain.
+        """
+        snapshot = TerrainSnapshot(self)
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    def _columns_changed(self, min_x, max_x):
+        """Updates the skyline, the pyramid and the chunk bookkeeping after the columns in [`min_x`, `max_x`] were changed.
+
+        Args:
+            min_x (int): The first changed column.
+            max_x (int): The last changed column.
+        """
+        if max_x < min_x:
+            return
+        self.skyline.update(self.solid_parts, min_x, max_x)
+        self.pyramid.update(self.solid_parts, min_x, max_x)
+        self.mask.update(self.solid_parts, min_x, max_x)
+        self.changed_chunks.update(self.chunk_range(min_x, max_x))
+
+
+class TerrainDelta:
+    """A change of the terrain, the new transitions of a range of columns.
+
+    Attributes:
+        version (int): Version of the terrain after the change.
+        first (int): The first changed column.
+        columns (list of list of float): The new transitions of the columns from `first` on,
+            see `TerrainModel.solid_parts`. The range may include unchanged columns between the changed ones.
+        reset (bool): True if the change replaced the whole terrain, `columns` are then all the columns.
+    """
+    _HEADER = struct.Struct('<IIIB')
+
+    def __init__(self, version, first, columns, reset=False):
+        """
+        Args:
+            version (int): Version of the terrain after the change.
+            first (int): The first changed column.
+            columns (list of list of float): The new transitions of the columns from `first` on.
+            reset (bool): True if the change replaced the whole terrain.
+        """
+        self.version = version
+        self.first = first
+        self.columns = columns
+        self.reset = reset
+
+    @property
+    def last(self):
+        """int: The last changed column."""
+        return self.first + len(self.columns) - 1
+
+    def apply(self, solid_parts):
+        """Applies the change to a copy of the terrain.
+
+        Args:
+            solid_parts (list of list of float): The terrain of the previous version, changed in place.
+        """
+        if self.reset:
+            solid_parts[:] = self.columns
+        else:
+            solid_parts[self.first:self.last + 1] = self.columns
+
+    def encode(self):
+        """Encodes the change into bytes, e.g. to send it to a network peer or to store it in a replay.
+
+        Returns:
+            bytes: The encoded change, see `decode`.
+        """
+        lengths = array('H', [len(transitions) for transitions in self.columns])
+        values = array('d', chain.from_iterable(self.columns))
+        return (self._HEADER.pack(self.version, self.first, len(self.columns), self.reset)
+                + lengths.tobytes() + values.tobytes())
+
+    @classmethod
+    def decode(cls, data):
+        """Decodes a change encoded by `encode`.
+
+        Args:
+            data (bytes): The encoded change.
+
+        Returns:
+            TerrainDelta: The change.
+        """
+        version, first, count, reset = cls._HEADER.unpack_from(data)
+        start = cls._HEADER.size
+        lengths = array('H', data[start:start + count * 2])
+        values = array('d', data[start + count * 2:])
+        columns = []
+        pos = 0
+        for length in lengths:
+            columns.append(values[pos:pos + length].tolist())
+            pos += length
+        return cls(version, first, columns, bool(reset))
+
+
+class TerrainJournal:
+    """Append-only journal of the changes of a terrain.
+
+    Each change increases the version of the terrain by one. A reset replacing the whole terrain makes all the
+    previous changes obsolete, so they are dropped, a consumer behind the reset only needs the reset.
+    The changes share the column lists with the terrain, so keeping them costs little memory.
+
+    Attributes:
+        version (int): Version of the terrain after the last change, 0 for no change.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._deltas = []
+
+    def __len__(self):
+        return len(self._deltas)
+
+    def append(self, first, columns, reset=False):
+        """Records a change of the terrain.
+
+        Args:
+            first (int): The first changed column.
+            columns (list of list of float): The new transitions of the columns from `first` on.
+            reset (bool): True if the change replaced the whole terrain.
+
+        Returns:
+            TerrainDelta: The recorded change.
+        """
+        self.version += 1
+        delta = TerrainDelta(self.version, first, columns, reset)
+        if reset:
+            self._deltas = []
+        self._deltas.append(delta)
+        return delta
+
+    def since(self, version):
+        """Returns the changes made after the `version`.
+
+        Args:
+            version (int): The version of the terrain the consumer has.
+
+        Returns:
+            list of TerrainDelta: The changes to apply in order, starting with a reset if the `version` is older
+                than the oldest change kept.
+        """
+        if len(self._deltas) == 0:
+            return []
+        first_kept = self._deltas[0].version
+        return self._deltas[max(version + 1 - first_kept, 0):]
+
+
+class TerrainSnapshot:
+    """Copy-on-write snapshot of a `TerrainModel`.
+
+    The snapshot is taken by `TerrainModel.snapshot` and stays valid through any number of changes
+    of the terrain. It can be restored any number of times, e.g. to evaluate several shots from the same terrain.
+
+    Attributes:
+        terrain (TerrainModel): The terrain the snapshot was taken of.
+    """
+
+    def __init__(self, terrain):
+        """
+        Args:
+            terrain (TerrainModel): The terrain to take the snapshot of.
+        """
+        self.terrain = terrain
+        # original transitions of the columns changed since the snapshot was taken
+        self._columns = {}
+        # the whole terrain, when it was replaced since the snapshot was taken
+        self._solid_parts = None
+
+    @property
+    def changed_columns(self):
+        """int: Number of the columns the terrain differs from the snapshot in, the width of the terrain
+        if the whole terrain was replaced."""
+        if self._solid_parts is not None:
+            return len(self._solid_parts)
+        return len(self._columns)
+
+    def get_solid_parts(self):
+        """Returns the terrain of the snapshot.
+
+        Returns:
+            list of list of float: The terrain columns, see `TerrainModel.solid_parts`, sharing the column lists
+                with the terrain.
+        """
+        solid_parts = list(self._solid_parts if self._solid_parts is not None else self.terrain.solid_parts)
+        for x, transitions in self._columns.items():
+            solid_parts[x] = transitions
+        return solid_parts
+
+    def restore(self):
+        """Restores the terrain to the state of the snapshot.
+
+        Only the columns changed since the snapshot was taken are set, unless the whole terrain was replaced.
+
+        Returns:
+            (int, int) or None: The range of x coordinates of the changed columns, None if nothing changed.
+        """
+        if self._solid_parts is not None:
+            self.terrain.set_solid_parts(self.get_solid_parts())
+            self._solid_parts = None
+            self._columns = {}
+            return 0, self.terrain.width - 1
+        if len(self._columns) == 0:
+            return None
+        columns = self._columns
+        changed = self.terrain.set_columns(columns)
+        # the terrain is now the same as the snapshot, the originals recorded by the restoration are not needed
+        self._columns = {}
+        return changed
+
+    def _on_changed(self, solid_parts, columns):
+        """Keeps the originals of the columns the terrain is going to change.
+
+        Args:
+            solid_parts (list of list of float): The current terrain.
+            columns (dict of (int, list of float)): The columns which are going to be changed.
+        """
+        if self._solid_parts is not None:
+            return
+        for x in columns:
+            if x not in self._columns:
+                self._columns[x] = solid_parts[x]
+
+    def _on_replaced(self):
+        """Keeps the terrain which is going to be replaced.
+        """
+        if self._solid_parts is None:
+            self._solid_parts = self.get_solid_parts()
+            self._columns = {}
@@ -0,0 +1,375 @@
+import struct
+import time
+from array import array
+from itertools import accumulate, chain
+from multiprocessing import shared_memory
+
+"""Export of the terrain and the tanks into shared memory.
+
+Analyses running in worker processes, such as shot searches, need the current terrain and tanks. Instead of
+pickling `TerrainModel.solid_parts` to every worker, the game publishes the state into a shared memory block
+with `TerrainExport`, and the workers map the block with `TerrainReader` and read it in place.
+
+The block starts with a header, followed by three arrays:
+
+- offsets (uint32, `width` + 1): the transitions of the column x are the transitions [offsets[x], offsets[x + 1]).
+- transitions (float64): the transitions of all the columns, see `TerrainModel.solid_parts`.
+- tanks (float64, 4 per tank): x, y, barrel angle and health of each tank.
+
+The header is little endian, the arrays are in the native byte order of the machine. The header contains
+a generation counter, which is odd while the state is being written. A reader reads the generation before and
+after reading the state, and the state is consistent only when both generations are the same and even.
+
+When the state outgrows the block, the exporter creates a larger block with a new name, writes the name into
+the header of the old block and marks the old block as stale. The readers still attached to the old block find
+the name there and move to the new block. The first block is kept until the export is closed and always names
+the current block, the readers attach to it and return to it when the block they follow was replaced too.
+
+Attributes:
+    MAGIC (bytes): The first bytes of the block.
+    LAYOUT_VERSION (int): Version of the layout of the block, a reader only maps blocks of the same version.
+    STALE_GENERATION (int): Generation of a block which was replaced by a larger block with a new name.
+    TANK_FIELDS (int): Number of values stored per tank.
+    PUBLISH_TIMEOUT (float): Time in seconds a reader waits for a publication in progress to finish.
+    MIN_BACKOFF (float): The first sleep in seconds after a publication in progress is seen the second time.
+    MAX_BACKOFF (float): The longest sleep in seconds between the checks of a publication in progress.
+"""
+
+MAGIC = b'SEMK'
+LAYOUT_VERSION = 2
+STALE_GENERATION = 2 ** 64 - 1
+TANK_FIELDS = 4
+PUBLISH_TIMEOUT = 1.0
+MIN_BACKOFF = 0.00001
+MAX_BACKOFF = 0.001
+
+# magic, layout version, generation, width, transitions, tanks, width capacity, transitions capacity,
+# tanks capacity, wind, name of the block replacing this one
+_HEADER = struct.Struct('<4sIQIIIIIId32s')
+_GENERATION = struct.Struct('<Q')
+_GENERATION_OFFSET = 8
+_SUCCESSOR = struct.Struct('<32s')
+_SUCCESSOR_OFFSET = _HEADER.size - _SUCCESSOR.size
+
+
+class StaleStateError(Exception):
+    """Raised when the shared state can not be read consistently.
+    """
+    pass
+
+
+def _get_layout(width_capacity, transitions_capacity, tanks_capacity):
+    """Computes the offsets of the arrays in the block.
+
+    Args:
+        width_capacity (int): Maximal number of columns.
+        transitions_capacity (int): Maximal number of transitions of all the columns.
+        tanks_capacity (int): Maximal number of tanks.
+
+    Returns:
+        (int, int, int, int): Offsets of the offsets, transitions and tanks arrays and the size of the block.
+    """
+    offsets = _HEADER.size
+    # the float arrays are aligned to 8 bytes
+    transitions = offsets + (width_capacity + 1) * 4
+    transitions += -transitions % 8
+    tanks = transitions + transitions_capacity * 8
+    size = tanks + tanks_capacity * TANK_FIELDS * 8
+    return offsets, transitions, tanks, size
+
+
+class SharedState:
+    """The state mapped from the shared memory, without copying it.
+
+    The columns and tanks are views into the block, valid only until the next publication,
+    see `TerrainReader.read`.
+
+    Attributes:
+        generation (int): Generation of the state.
+        wind (float): The wind.
+        tanks (memoryview): x, y, barrel angle and health of each tank, `TANK_FIELDS` values per tank.
+    """
+
+    def __init__(self, buf, generation):
+        """
+        Args:
+            buf (memoryview): The block.
+            generation (int): Generation of the state read from the header.
+
+        Raises:
+            ValueError: If the header does not describe a state which fits into the block, e.g. when it is torn
+                by a publication.
+        """
+        (_, _, _, width, transitions, tanks, width_cap, transitions_cap, tanks_cap, wind,
+         _) = _HEADER.unpack_from(buf)
+        offsets_start, transitions_start, tanks_start, size = _get_layout(width_cap, transitions_cap, tanks_cap)
+        # no views are made of a malformed state, so that there are none to release
+        if size > len(buf) or width > width_cap or transitions > transitions_cap or tanks > tanks_cap:
+            raise ValueError('the header of the terrain export is malformed')
+        self.generation = generation
+        self.wind = wind
+        self._offsets = buf[offsets_start:offsets_start + (width + 1) * 4].cast('I')
+        self._transitions = buf[transitions_start:transitions_start + transitions * 8].cast('d')
+        self.tanks = buf[tanks_start:tanks_start + tanks * TANK_FIELDS * 8].cast('d')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, x):
+        """Returns the transitions of the column `x`.
+
+        Args:
+            x (int): The column.
+
+        Returns:
+            memoryview: The transitions, see `TerrainModel.solid_parts`.
+        """
+        return self._transitions[self._offsets[x]:self._offsets[x + 1]]
+
+    @property
+    def solid_parts(self):
+        """SharedState: The terrain columns, indexable like `TerrainModel.solid_parts`."""
+        return self
+
+    def get_tank(self, idx):
+        """Returns the state of the tank.
+
+        Args:
+            idx (int): Index of the tank.
+
+        Returns:
+            (float, float, float, float): x, y, barrel angle and health of the tank.
+        """
+        return tuple(self.tanks[idx * TANK_FIELDS:(idx + 1) * TANK_FIELDS])
+
+    def release(self):
+        """Releases the views into the block, which must be done before the reader detaches.
+        """
+        self._offsets.release()
+        self._transitions.release()
+        self.tanks.release()
+
+
+def _retire(shm, successor):
+    """Marks the block as stale.
+
+    Args:
+        shm (SharedMemory): The block.
+        successor (str): Name of the block replacing it, empty if the export is closed.
+    """
+    _SUCCESSOR.pack_into(shm.buf, _SUCCESSOR_OFFSET, successor.encode())
+    _GENERATION.pack_into(shm.buf, _GENERATION_OFFSET, STALE_GENERATION)
+
+
+class TerrainExport:
+    """Publishes the terrain and the tanks into a shared memory block.
+
+    When the state does not fit into the block, a larger block is created and the old one is marked as stale.
+    The first block, whose `name` the readers attach to, names the current block.
+
+    Attributes:
+        generation (int): Generation of the last published state.
+    """
+
+    def __init__(self, width, transitions=None, tanks=10):
+        """
+        Args:
+            width (int): Expected number of columns.
+            transitions (int, optional): Expected number of transitions of all the columns,
+                four per column by default.
+            tanks (int): Expected number of tanks.
+        """
+        self.generation = 0
+        self._shm = None
+        self._create(width, transitions if transitions is not None else 4 * width, tanks)
+        self._first = self._shm
+
+    @property
+    def name(self):
+        """str: Name of the first shared memory block, which the workers attach to."""
+        return self._first.name
+
+    def _create(self, width, transitions, tanks):
+        """Creates a new block with the given capacities.
+        """
+        size = _get_layout(width, transitions, tanks)[3]
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._capacity = (width, transitions, tanks)
+        _HEADER.pack_into(self._shm.buf, 0, MAGIC, LAYOUT_VERSION, self.generation, 0, 0, 0,
+                          width, transitions, tanks, 0.0, b'')
+
+    def publish(self, solid_parts, players, wind):
+        """Writes the state into the block.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+            players (list of Player): The players whose tanks are published.
+            wind (float): The wind.
+
+        Returns:
+            int: Generation of the published state.
+        """
+        width = len(solid_parts)
+        transitions = sum(len(column) for column in solid_parts)
+        tanks = len(players)
+        width_cap, transitions_cap, tanks_cap = self._capacity
+        if width > width_cap or transitions > transitions_cap or tanks > tanks_cap:
+            old = self._shm
+            self._create(max(width, width_cap), max(transitions, 2 * transitions_cap), max(tanks, tanks_cap))
+            # the readers of the old block and of the first block move to the new one
+            _retire(self._first, self._shm.name)
+            if old is not self._first:
+                _retire(old, self._shm.name)
+                old.close()
+                old.unlink()
+
+        buf = self._shm.buf
+        offsets_start, transitions_start, tanks_start, _ = _get_layout(*self._capacity)
+        self.generation += 1
+        _GENERATION.pack_into(buf, _GENERATION_OFFSET, self.generation)
+
+        offsets = array('I', [0])
+        offsets.extend(accumulate(len(column) for column in solid_parts))
+        buf[offsets_start:offsets_start + len(offsets) * 4] = offsets.tobytes()
+        values = array('d', chain.from_iterable(solid_parts))
+        buf[transitions_start:transitions_start + len(values) * 8] = values.tobytes()
+        for idx, player in enumerate(players):
+            tank = player.tank
+            struct.pack_into('<4d', buf, tanks_start + idx * TANK_FIELDS * 8,
+                             tank.x, tank.y, tank.barrel.angle, player.health)
+        _HEADER.pack_into(buf, 0, MAGIC, LAYOUT_VERSION, self.generation + 1, width, transitions, tanks,
+                          *self._capacity, wind or 0, b'')
+        self.generation += 1
+        return self.generation
+
+    def close(self):
+        """Marks the block as stale and frees it.
+        """
+        if self._shm is None:
+            return
+        for shm in {self._first, self._shm}:
+            _retire(shm, '')
+            shm.close()
+            shm.unlink()
+        self._shm = self._first = None
+
+
+class TerrainReader:
+    """Maps the block published by `TerrainExport` in a worker process.
+
+    When the exporter replaces the block by a larger one, the reader moves to the new block.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name (str): Name of the block, see `TerrainExport.name`.
+
+        Raises:
+            ValueError: If the block is not a terrain export of the same layout version.
+        """
+        self._first = name
+        self._shm = None
+        self._attach(name)
+
+    @property
+    def name(self):
+        """str: Name of the block the reader is attached to."""
+        return self._shm.name
+
+    def _attach(self, name):
+        """Attaches to the block, detaching from the current one.
+
+        Args:
+            name (str): Name of the block.
+
+        Raises:
+            ValueError: If the block is not a terrain export of the same layout version.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        magic, version = struct.unpack_from('<4sI', shm.buf)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            shm.close()
+            raise ValueError(f'{name} is not a terrain export of layout version {LAYOUT_VERSION}')
+        if self._shm is not None:
+            self._shm.close()
+        self._shm = shm
+
+    def _follow(self):
+        """Moves to the block which replaced the current stale block.
+
+        Raises:
+            StaleStateError: If the export was closed.
+        """
+        successor = _SUCCESSOR.unpack_from(self._shm.buf, _SUCCESSOR_OFFSET)[0].rstrip(b'\0').decode()
+        if successor == '':
+            raise StaleStateError('the terrain export was closed')
+        try:
+            self._attach(successor)
+        except FileNotFoundError:
+            # the new block was replaced and freed too, the first block names the current one
+            try:
+                self._attach(self._first)
+            except FileNotFoundError:
+                raise StaleStateError('the terrain export was closed') from None
+
+    @property
+    def generation(self):
+        """int: Generation of the state currently in the block."""
+        return _GENERATION.unpack_from(self._shm.buf, _GENERATION_OFFSET)[0]
+
+    def read(self, analyze, retries=100, timeout=PUBLISH_TIMEOUT):
+        """Calls `analyze` with the state in the block until it reads a consistent state.
+
+        The state is not copied, `analyze` reads it in place. If the state is published again while
+        `analyze` runs, its result is thrown away and it is called again with the new state. While a publication
+        is in progress, the reader waits for it to finish, sleeping for longer and longer times.
+
+        Args:
+            analyze (callable): Called with the `SharedState`, must not keep any of its views.
+            retries (int): Maximal number of calls of `analyze`.
+            timeout (float): Time in seconds the reader waits for the publications in progress in total.
+
+        Returns:
+            The result of `analyze` of a consistent state.
+
+        Raises:
+            StaleStateError: If the export was closed, no consistent state was read in `retries` calls or
+                a publication did not finish in `timeout`.
+        """
+        deadline = time.perf_counter() + timeout
+        backoff = 0
+        calls = 0
+        while calls < retries:
+            generation = self.generation
+            if generation == STALE_GENERATION:
+                self._follow()
+                continue
+            if generation % 2 != 0:
+                if time.perf_counter() > deadline:
+                    raise StaleStateError(f'the publication did not finish in {timeout} s')
+                # the first wait only yields to the writer, the next ones sleep
+                time.sleep(backoff)
+                backoff = min(max(backoff * 2, MIN_BACKOFF), MAX_BACKOFF)
+                continue
+            calls += 1
+            state = None
+            try:
+                state = SharedState(self._shm.buf, generation)
+                result = analyze(state)
+            except (IndexError, TypeError, ValueError):
+                # a state torn by a publication can be malformed, the error only counts if the state was consistent
+                if self.generation == generation:
+                    raise
+                continue
+            finally:
+                if state is not None:
+                    state.release()
+            if self.generation == generation:
+                return result
+        raise StaleStateError(f'no consistent state read in {retries} attempts')
+
+    def close(self):
+        """Detaches from the block.
+        """
+        self._shm.close()
@@ -7,6 +7,8 @@ from kivy.vector import Vector
 Implements the terrain generation algorithms for randomized generation of the map terrain.
 Generated terrain consists of preset number of topological features of different types. The types of the 
 features and their parameters are chosen randomly, with some restrictions on repetition of types.
+All the functions take the random number generator `rng` to use, so that a seeded generator generates
+the same terrain every time.
 
 Attributes:
     FEATURE_SIZE (int): Size of the features, which determines the number of features that fit onto the map.
@@ -17,28 +19,41 @@ FEATURE_SIZE = 200
 NOISE_SIZE = 4
 
 
-def generate_terrain(map_size, tank_x_positions, tank_size):
+def generate_terrain(map_size, tank_x_positions, tank_size, rng=random):
+    """Generates the terrain with flat spaces for the tanks.
+
+    Args:
+        map_size (int, int): Size of the map.
+        tank_x_positions (list of int): x coordinates of the tanks.
+        tank_size (int, int): Size of the flat space for a tank.
+        rng (Random, optional): Random number generator to use, the `random` module by default.
+
+    Returns:
+        (list of list of float, list of Vector): The terrain columns and the positions of the tanks.
+    """
     solid_parts = []
     # limit the height so that tanks always fit above the terrain with some room to spare
     max_height = map_size[1] - (tank_size[1] * 2)
     # generate the initial hight
-    prev_height = min(random.randrange(map_size[1]), max_height)
+    prev_height = min(rng.randrange(map_size[1]), max_height)
 
     # sorted tank position based on the x axis, so that we can pop the lowest once from the back of the list
     s_t_p = sorted(tank_x_positions, reverse=True)
     next_tank_pos = s_t_p.pop()
 
     # generates the topological features
-    feature_points = get_topology(prev_height, map_size, max_height)
+    feature_points = get_topology(prev_height, map_size, max_height, rng)
     feature_points.reverse()
     next_feature_pos = feature_points.pop()
 
     tank_positions = []
     for x in range(map_size[0]):
         if x < next_tank_pos:
-            terrain_top = get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos)
+            terrain_top = get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos,
+                                              rng)
         elif next_tank_pos == x:
-            terrain_top = get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos)
+            terrain_top = get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos,
+                                              rng)
             tank_positions.append(Vector(x, terrain_top))
         elif next_tank_pos < x < next_tank_pos + tank_size[0] - 1:
             # leaves terrain level for the tank
@@ -59,7 +74,7 @@ def generate_terrain(map_size, tank_x_positions, tank_size):
     return solid_parts, tank_positions
 
 
-def get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos):
+def get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, next_feature_pos, rng=random):
     """Generates terrain height based on the previous height and the current topological feature.
 
     Generates the height so that we reach the position specified by the topological feature `next_feature_pos`.
@@ -73,6 +88,7 @@ def get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, nex
         next_tank_pos (int): x coordinate of the beggining of the tank position.
         tank_size (int): Size of tanks in the current level.
         next_feature_pos (float, float): (x,y) position we are trying to reach to generate the topological feature.
+        rng (Random, optional): Random number generator to use.
 
     Returns: The height of the terrain at `x` position.
 
@@ -87,10 +103,10 @@ def get_terrain_height(x, prev_height, max_height, next_tank_pos, tank_size, nex
     else:
         height_diff = dist_y
     next_height = math.ceil(prev_height + height_diff)
-    return random.randrange(max(next_height - NOISE_SIZE, 1), min(next_height + NOISE_SIZE, max_height))
+    return rng.randrange(max(next_height - NOISE_SIZE, 1), min(next_height + NOISE_SIZE, max_height))
 
 
-def create_valley(map_height, prev_height, max_height, size):
+def create_valley(map_height, prev_height, max_height, size, rng=random):
     """Generates a part of a terrain with lower height.
 
     Generates on of a few types of valley topologies, generally creating a part of a terrain with lower height.
@@ -100,13 +116,14 @@ def create_valley(map_height, prev_height, max_height, size):
         prev_height (int): Height of the previous topology, i.e. the topology with lower x coordinate.
         max_height (int): Max generated height.
         size (int): Size of the topological feature on the x axis.
+        rng (Random, optional): Random number generator to use.
 
     Returns:
         list of (float, float): List of points the generated height should go through, basically waypoints for
             generating terrain.
 
     """
-    form = random.choice(['deep', 'shallow', 'wavy'])
+    form = rng.choice(['deep', 'shallow', 'wavy'])
 
     if form == 'deep':
         if prev_height > map_height/2:
@@ -119,7 +136,7 @@ def create_valley(map_height, prev_height, max_height, size):
         return [(size/4, prev_height/2), (size / 2, prev_height), (size * 3/4, prev_height/2), (size, prev_height)]
 
 
-def create_hill(map_height, prev_height, max_height, size):
+def create_hill(map_height, prev_height, max_height, size, rng=random):
     """Generates a part of a terrain with greater height.
 
         Generates on of a few types of hill topologies, generally creating a part of a terrain with greater height.
@@ -129,12 +146,13 @@ def create_hill(map_height, prev_height, max_height, size):
             prev_height (int): Height of the previous topology, i.e. the topology with lower x coordinate.
             max_height (int): Max generated height.
             size (int): Size of the topological feature on the x axis.
+            rng (Random, optional): Random number generator to use.
 
         Returns:
             list of (float, float): List of points the generated height should go through, basically waypoints for
                 generating terrain.
     """
-    form = random.choice(['steep', 'concave'])
+    form = rng.choice(['steep', 'concave'])
 
     if form == 'steep':
         if prev_height < map_height/2:
@@ -145,7 +163,7 @@ def create_hill(map_height, prev_height, max_height, size):
         return [(size/2, map_height/2), (size, map_height * 3/4)]
 
 
-def create_plateau(map_height, prev_height, max_height, size):
+def create_plateau(map_height, prev_height, max_height, size, rng=random):
     """Generates a part of a terrain with constant height.
 
         Generates a plateau topology, creating part of the terrain with a constant height.
@@ -155,16 +173,17 @@ def create_plateau(map_height, prev_height, max_height, size):
             prev_height (int): Height of the previous topology, i.e. the topology with lower x coordinate.
             max_height (int): Max generated height.
             size (int): Size of the topological feature on the x axis.
+            rng (Random, optional): Random number generator to use.
 
         Returns:
             list of (float, float): List of points the generated height should go through, basically waypoints for
                 generating terrain.
     """
-    height = random.randrange(map_height/20, max_height)
+    height = rng.randrange(map_height/20, max_height)
     return [((size/4), height), (size, height)]
 
 
-def get_topology(init_height, map_size, max_height):
+def get_topology(init_height, map_size, max_height, rng=random):
     """Generates list of waypoints the height generation should go through to create topologies.
 
     Creates random list of topological features and generates a list of points the terrain generation should
@@ -174,6 +193,7 @@ def get_topology(init_height, map_size, max_height):
         init_height (int): Starting height at `x == 0`.
         map_size (int, int): Size of the map in (x,y) coordinates.
         max_height (int): Upper limit on the generated height.
+        rng (Random, optional): Random number generator to use.
 
     Returns:
         list of (float, float): List of waypoints the height generation should go through to recreate generated
@@ -181,15 +201,15 @@ def get_topology(init_height, map_size, max_height):
     """
     num_features = math.ceil(map_size[0] / FEATURE_SIZE)
     generators = [create_valley, create_hill, create_plateau]
-    previous = [random.randrange(len(generators)), random.randrange(len(generators))]
+    previous = [rng.randrange(len(generators)), rng.randrange(len(generators))]
     feature_points = []
     for i in range(num_features):
         while True:
-            idx = random.randrange(len(generators))
+            idx = rng.randrange(len(generators))
             # do not repeat topology more than once
             if previous.count(idx) != 2:
                 break
-        new_points = generators[idx](map_size[1], init_height, max_height, FEATURE_SIZE)
+        new_points = generators[idx](map_size[1], init_height, max_height, FEATURE_SIZE, rng)
         for idp in range(len(new_points)):
             # as the feature points are generated in local coordinates, shift them on the x axis to the correct part
             # of the terrain.
@@ -0,0 +1,436 @@
+import math
+
+"""Acceleration structures for the terrain queries.
+
+This module implements structures maintained alongside the terrain columns, which answer common questions
+about the terrain without scanning the segments of the columns, such as the height of the surface
+at some x coordinate, whether a box is above all the terrain, whether a box overlaps any terrain cell
+or where a line first hits the terrain.
+The structures are updated incrementally, only for the columns changed by the generation or the explosions.
+
+Attributes:
+    NO_TERRAIN (float): Top of a column without any terrain.
+    PYRAMID_BRANCHING (int): Number of blocks of a level of the `ColumnPyramid` merged into one block
+        of the next level.
+"""
+
+NO_TERRAIN = -1
+PYRAMID_BRANCHING = 8
+
+
+class MinMaxTree:
+    """Segment tree answering minimum and maximum of a range of values.
+
+    Both queries and updates of a single value take O(log n) time, update of a range of k values takes
+    O(k + log n) time.
+    """
+
+    def __init__(self, values):
+        """
+        Args:
+            values (list of float): The initial values.
+        """
+        self._count = len(values)
+        self._size = 1
+        while self._size < len(values):
+            self._size *= 2
+        self._max = [float('-inf')] * (2 * self._size)
+        self._min = [float('inf')] * (2 * self._size)
+        self._max[self._size: self._size + len(values)] = values
+        self._min[self._size: self._size + len(values)] = values
+        for node in range(self._size - 1, 0, -1):
+            self._max[node] = max(self._max[2 * node], self._max[2 * node + 1])
+            self._min[node] = min(self._min[2 * node], self._min[2 * node + 1])
+
+    def __len__(self):
+        return self._count
+
+    def set_range(self, first, values):
+        """Replaces the values starting at the index `first`.
+
+        Args:
+            first (int): Index of the first replaced value.
+            values (list of float): The new values.
+        """
+        if len(values) == 0:
+            return
+        low = first + self._size
+        high = low + len(values) - 1
+        self._max[low: high + 1] = values
+        self._min[low: high + 1] = values
+        while low > 1:
+            low //= 2
+            high //= 2
+            for node in range(low, high + 1):
+                self._max[node] = max(self._max[2 * node], self._max[2 * node + 1])
+                self._min[node] = min(self._min[2 * node], self._min[2 * node + 1])
+
+    def max(self, first, last):
+        """Returns the maximum of the values with indexes in [`first`, `last`].
+
+        Args:
+            first (int): The first index, clipped to the valid indexes.
+            last (int): The last index, clipped to the valid indexes.
+
+        Returns:
+            float: The maximum, -inf for an empty range.
+        """
+        result = float('-inf')
+        low = max(first, 0) + self._size
+        high = min(last, self._count - 1) + self._size + 1
+        while low < high:
+            if low & 1:
+                result = max(result, self._max[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                result = max(result, self._max[high])
+            low //= 2
+            high //= 2
+        return result
+
+    def min(self, first, last):
+        """Returns the minimum of the values with indexes in [`first`, `last`].
+
+        Args:
+            first (int): The first index, clipped to the valid indexes.
+            last (int): The last index, clipped to the valid indexes.
+
+        Returns:
+            float: The minimum, inf for an empty range.
+        """
+        result = float('inf')
+        low = max(first, 0) + self._size
+        high = min(last, self._count - 1) + self._size + 1
+        while low < high:
+            if low & 1:
+                result = min(result, self._min[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                result = min(result, self._min[high])
+            low //= 2
+            high //= 2
+        return result
+
+
+class Skyline:
+    """Top of the terrain in each column.
+
+    Attributes:
+        tops (list of float): The highest y coordinate of solid terrain in each column, `NO_TERRAIN` for columns
+            without terrain.
+    """
+
+    def __init__(self, solid_parts):
+        """
+        Args:
+            solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        """
+        self.tops = [self._get_top(transitions) for transitions in solid_parts]
+        self._tree = MinMaxTree(self.tops)
+
+    @staticmethod
+    def _get_top(transitions):
+        return transitions[-1] if len(transitions) != 0 else NO_TERRAIN
+
+    def update(self, solid_parts, first, last):
+        """Updates the skyline after the columns in [`first`, `last`] changed.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns.
+            first (int): The first changed column.
+            last (int): The last changed column.
+        """
+        tops = [self._get_top(solid_parts[x]) for x in range(first, last + 1)]
+        self.tops[first: last + 1] = tops
+        self._tree.set_range(first, tops)
+
+    def surface_at(self, x):
+        """Returns the height of the terrain surface in the column `x`.
+
+        Args:
+            x (int): The column.
+
+        Returns:
+            float: The top of the terrain, `NO_TERRAIN` if there is no terrain in the column
+                or the column is outside the terrain.
+        """
+        if 0 <= x < len(self.tops):
+            return self.tops[x]
+        return NO_TERRAIN
+
+    def max_top(self, first, last):
+        """Returns the height of the highest terrain in the columns [`first`, `last`].
+
+        Args:
+            first (int): The first column.
+            last (int): The last column.
+
+        Returns:
+            float: The highest top, `NO_TERRAIN` if there is no terrain in the columns.
+        """
+        return max(self._tree.max(first, last), NO_TERRAIN)
+
+    def min_top(self, first, last):
+        """Returns the height of the lowest terrain surface in the columns [`first`, `last`].
+
+        Args:
+            first (int): The first column.
+            last (int): The last column.
+
+        Returns:
+            float: The lowest top, `NO_TERRAIN` if any of the columns is without terrain
+                or the range contains no columns.
+        """
+        result = self._tree.min(first, last)
+        return result if result != float('inf') else NO_TERRAIN
+
+
+class OccupancyMask:
+    """Bit mask of the world cells containing solid terrain.
+
+    Each column is a single integer, whose bit y is set if the column has solid terrain in [y, y + 1].
+    The mask is conservative, a cell touched by the terrain only on its boundary is solid too, so an empty
+    cell is guaranteed to be free of terrain.
+
+    Attributes:
+        columns (list of int): The bits of each column.
+    """
+
+    def __init__(self, solid_parts):
+        """
+        Args:
+            solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        """
+        self.columns = [self._get_bits(transitions) for transitions in solid_parts]
+
+    @staticmethod
+    def _get_bits(transitions):
+        bits = 0
+        for i in range(0, len(transitions), 2):
+            low = max(math.floor(transitions[i]), 0)
+            high = math.floor(transitions[i + 1])
+            if high >= low:
+                bits |= ((1 << (high - low + 1)) - 1) << low
+        return bits
+
+    def update(self, solid_parts, first, last):
+        """Updates the mask after the columns in [`first`, `last`] changed.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns.
+            first (int): The first changed column.
+            last (int): The last changed column.
+        """
+        self.columns[first: last + 1] = [self._get_bits(solid_parts[x]) for x in range(first, last + 1)]
+
+    def is_solid(self, x, y):
+        """Checks if the cell containing the point is solid.
+
+        Args:
+            x (float): x coordinate of the point.
+            y (float): y coordinate of the point.
+
+        Returns:
+            bool: True if the cell contains solid terrain, False if it is empty or outside the terrain.
+        """
+        col = math.floor(x)
+        row = math.floor(y)
+        if col < 0 or col >= len(self.columns) or row < 0:
+            return False
+        return (self.columns[col] >> row) & 1 == 1
+
+    def get_rows(self, min_y, max_y):
+        """Returns the bits of the rows of cells overlapping the y interval [`min_y`, `max_y`].
+
+        Args:
+            min_y (float): Lower bound of the interval.
+            max_y (float): Upper bound of the interval.
+
+        Returns:
+            int: The bits of the rows, 0 if the interval is below the terrain.
+        """
+        low = max(math.floor(min_y), 0)
+        high = math.floor(max_y)
+        if high < low:
+            return 0
+        return ((1 << (high - low + 1)) - 1) << low
+
+    def any_solid(self, first, last, min_y, max_y):
+        """Checks if any cell of the columns [`first`, `last`] overlapping the y interval [`min_y`, `max_y`] is solid.
+
+        Args:
+            first (int): The first column.
+            last (int): The last column.
+            min_y (float): Lower bound of the interval.
+            max_y (float): Upper bound of the interval.
+
+        Returns:
+            bool: True if any of the cells is solid.
+        """
+        rows = self.get_rows(min_y, max_y)
+        columns = self.columns
+        for x in range(max(first, 0), min(last, len(columns) - 1) + 1):
+            if columns[x] & rows:
+                return True
+        return False
+
+
+class ColumnPyramid:
+    """Multi level pyramid of the bounds of the terrain in blocks of columns.
+
+    The level 0 holds the lowest bottom and the highest top of the terrain of each column, every block of the next
+    level holds the bounds of `PYRAMID_BRANCHING` blocks of the level below. The casts only descend into the blocks
+    whose bounds the cast line passes through, so long stretches of empty sky are skipped in a few steps.
+
+    Column x occupies the x interval [x, x + 1], as it is drawn.
+    """
+
+    def __init__(self, solid_parts):
+        """
+        Args:
+            solid_parts (list of list of float): The terrain columns, see `TerrainModel.solid_parts`.
+        """
+        self._solid_parts = solid_parts
+        self._bottoms = [[transitions[0] if len(transitions) != 0 else float('inf') for transitions in solid_parts]]
+        self._tops = [[transitions[-1] if len(transitions) != 0 else float('-inf') for transitions in solid_parts]]
+        while len(self._tops[-1]) > 1:
+            bottoms, tops = self._bottoms[-1], self._tops[-1]
+            self._bottoms.append([min(bottoms[i: i + PYRAMID_BRANCHING])
+                                  for i in range(0, len(bottoms), PYRAMID_BRANCHING)])
+            self._tops.append([max(tops[i: i + PYRAMID_BRANCHING]) for i in range(0, len(tops), PYRAMID_BRANCHING)])
+
+    def update(self, solid_parts, first, last):
+        """Updates the pyramid after the columns in [`first`, `last`] changed.
+
+        Args:
+            solid_parts (list of list of float): The terrain columns.
+            first (int): The first changed column.
+            last (int): The last changed column.
+        """
+        self._solid_parts = solid_parts
+        for x in range(first, last + 1):
+            transitions = solid_parts[x]
+            self._bottoms[0][x] = transitions[0] if len(transitions) != 0 else float('inf')
+            self._tops[0][x] = transitions[-1] if len(transitions) != 0 else float('-inf')
+        for level in range(1, len(self._tops)):
+            first //= PYRAMID_BRANCHING
+            last //= PYRAMID_BRANCHING
+            bottoms, tops = self._bottoms[level - 1], self._tops[level - 1]
+            for block in range(first, last + 1):
+                start = block * PYRAMID_BRANCHING
+                self._bottoms[level][block] = min(bottoms[start: start + PYRAMID_BRANCHING])
+                self._tops[level][block] = max(tops[start: start + PYRAMID_BRANCHING])
+
+    def cast_segment(self, start, end):
+        """Finds the first point of the terrain on the line segment from `start` to `end`.
+
+        Args:
+            start (float, float): The start of the segment.
+            end (float, float): The end of the segment.
+
+        Returns:
+            (float, float) or None: The first point of the segment inside the terrain, None if the whole segment
+                is in the air.
+        """
+        x0, y0 = start
+        dx, dy = end[0] - x0, end[1] - y0
+        min_col = max(math.floor(min(x0, x0 + dx)), 0)
+        max_col = min(math.floor(max(x0, x0 + dx)), len(self._tops[0]) - 1)
+        if min_col > max_col:
+            return None
+        # blocks to visit, the block visited next is on the top
+        stack = [(len(self._tops) - 1, 0)]
+        while len(stack) != 0:
+            level, block = stack.pop()
+            size = PYRAMID_BRANCHING ** level
+            first = max(block * size, min_col)
+            last = min(block * size + size - 1, max_col)
+            if first > last:
+                continue
+            t_start, t_end = self._get_t_range(x0, dx, first, last + 1)
+            y_a, y_b = y0 + dy * t_start, y0 + dy * t_end
+            if max(y_a, y_b) < self._bottoms[level][block] or min(y_a, y_b) > self._tops[level][block]:
+                continue
+            if level == 0:
+                t = self._cast_column(block, y0, dy, t_start, t_end)
+                if t is not None:
+                    return x0 + dx * t, y0 + dy * t
+                continue
+            children = range(block * PYRAMID_BRANCHING,
+                             min(block * PYRAMID_BRANCHING + PYRAMID_BRANCHING, len(self._tops[level - 1])))
+            # the children are visited in the direction of the segment
+            for child in (reversed(children) if dx >= 0 else children):
+                stack.append((level - 1, child))
+        return None
+
+    def cast_ray(self, origin, direction, length):
+        """Finds the first point of the terrain on the ray from `origin` in the `direction`.
+
+        Args:
+            origin (float, float): The origin of the ray.
+            direction (float, float): Direction of the ray, does not need to be normalized.
+            length (float): Length of the ray.
+
+        Returns:
+            (float, float) or None: The first point of the ray inside the terrain, None if there is none.
+        """
+        norm = math.hypot(direction[0], direction[1])
+        if norm == 0:
+            return self.cast_segment(origin, origin)
+        return self.cast_segment(origin, (origin[0] + direction[0] / norm * length,
+                                          origin[1] + direction[1] / norm * length))
+
+    def cast_polyline(self, points):
+        """Finds the first point of the terrain along the polyline through the `points`.
+
+        Args:
+            points (list of (float, float)): The vertices of the polyline.
+
+        Returns:
+            ((float, float), int) or None: The first point inside the terrain and the index of the segment it lies
+                on, segment i going from `points[i]` to `points[i + 1]`, None if the polyline is in the air.
+        """
+        for i in range(len(points) - 1):
+            hit = self.cast_segment(points[i], points[i + 1])
+            if hit is not None:
+                return hit, i
+        return None
+
+    def line_of_sight(self, a, b):
+        """Checks if there is no terrain between the points `a` and `b`.
+
+        Args:
+            a (float, float): The first point.
+            b (float, float): The second point.
+
+        Returns:
+            bool: True if the segment between the points is in the air.
+        """
+        return self.cast_segment(a, b) is None
+
+    @staticmethod
+    def _get_t_range(x0, dx, min_x, max_x):
+        """Returns the range of the segment parameter t, for which the segment is in [`min_x`, `max_x`]."""
+        if dx == 0:
+            return 0, 1
+        t_a, t_b = (min_x - x0) / dx, (max_x - x0) / dx
+        return max(min(t_a, t_b), 0), min(max(t_a, t_b), 1)
+
+    def _cast_column(self, x, y0, dy, t_start, t_end):
+        """Returns the lowest t in [`t_start`, `t_end`] at which the segment is in the terrain of the column `x`."""
+        transitions = self._solid_parts[x]
+        result = None
+        for i in range(0, len(transitions), 2):
+            bot, top = transitions[i], transitions[i + 1]
+            if dy == 0:
+                if bot <= y0 <= top:
+                    return t_start
+                continue
+            t_bot, t_top = (bot - y0) / dy, (top - y0) / dy
+            low = max(min(t_bot, t_top), t_start)
+            high = min(max(t_bot, t_top), t_end)
+            if low <= high and (result is None or low < result):
+                result = low
+        return result
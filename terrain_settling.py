@@ -0,0 +1,114 @@
+"""Settling of the terrain left floating after explosions.
+
+Explosions can remove the terrain below parts of a column, leaving the upper parts floating in the air.
+The `TerrainSettler` lets such parts fall down and merge with the terrain below them. Only the columns with
+floating terrain are processed, and the fall is animated over several frames by updating the terrain
+a bit each frame.
+
+Attributes:
+    SETTLE_ACCELERATION (float): Acceleration of the falling terrain in world units per second squared.
+"""
+
+SETTLE_ACCELERATION = 4000
+
+
+def is_floating(transitions):
+    """Checks if any part of the column is not supported from below.
+
+    Args:
+        transitions (list of float): Transitions of the column, see `TerrainModel.solid_parts`.
+
+    Returns:
+        bool: True if the column contains terrain that should fall, False otherwise.
+    """
+    return len(transitions) > 2 or (len(transitions) == 2 and transitions[0] > 0)
+
+
+def fall(transitions, distance):
+    """Moves the floating segments of a column down by `distance`.
+
+    The segments never fall through the segments below them, segments that land on the segment below them
+    are merged with it. The number of segments therefore never increases.
+
+    Args:
+        transitions (list of float): Transitions of the column, see `TerrainModel.solid_parts`.
+        distance (float): Distance the floating segments fall by.
+
+    Returns:
+        list of float: Transitions of the column after the fall.
+    """
+    result = []
+    # top of the terrain supporting the current segment
+    ground = 0
+    for i in range(0, len(transitions), 2):
+        bot, top = transitions[i], transitions[i + 1]
+        drop = min(distance, bot - ground)
+        bot -= drop
+        top -= drop
+        if len(result) != 0 and bot <= result[-1]:
+            # landed on the segment below
+            result[-1] = top
+        else:
+            result.append(bot)
+            result.append(top)
+        ground = result[-1]
+    return result
+
+
+class TerrainSettler:
+    """Lets the floating parts of the terrain fall down.
+
+    Attributes:
+        terrain (TerrainModel): The settled terrain.
+    """
+
+    def __init__(self, terrain):
+        """
+        Args:
+            terrain (TerrainModel): The terrain to settle.
+        """
+        self.terrain = terrain
+        # falling columns and the velocity of their fall
+        self._falling = {}
+
+    @property
+    def active(self):
+        """bool: True if any part of the terrain is falling."""
+        return len(self._falling) != 0
+
+    def add_columns(self, first, last):
+        """Checks the columns in the range [`first`, `last`] and starts settling the floating ones.
+
+        Args:
+            first (int): The first column to check.
+            last (int): The last column to check.
+        """
+        for x in range(first, last + 1):
+            if x not in self._falling and is_floating(self.terrain.solid_parts[x]):
+                self._falling[x] = 0
+
+    def update(self, dt):
+        """Moves the falling terrain by `dt` in time.
+
+        Args:
+            dt (float): Time elapsed since the last update.
+
+        Returns:
+            (int, int) or None: The range of x coordinates of the changed columns, None if nothing is falling.
+        """
+        if len(self._falling) == 0:
+            return None
+        columns = {}
+        for x, velocity in self._falling.items():
+            velocity += SETTLE_ACCELERATION * dt
+            self._falling[x] = velocity
+            columns[x] = fall(self.terrain.solid_parts[x], velocity * dt)
+        for x, transitions in columns.items():
+            if not is_floating(transitions):
+                del self._falling[x]
+        return self.terrain.set_columns(columns)
+
+    def clear(self):
+        """Stops settling all the columns.
+        """
+        self._falling = {}
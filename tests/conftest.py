@@ -0,0 +1,11 @@
+import os
+import sys
+
+# the modules of the game are at the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Kivy must not parse the arguments of pytest, and the window is created offscreen when there is no display
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+if 'DISPLAY' not in os.environ and 'WAYLAND_DISPLAY' not in os.environ:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
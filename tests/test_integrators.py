@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+from projectiles import ADAPTIVE, EULER, RK4, STEP, Shell
+
+WORLD_SIZE = (10000, 10000)
+
+
+def make_shell(center=(500, 0), angle=60, velocity=300, drag_coef=0.0025, wind=10):
+    return Shell(None, 1, angle, velocity, 100, 200, wind, drag_coef, 0, (10, 5), center)
+
+
+def fly(shell, integrator, dt, duration):
+    steps = 0
+    for _ in range(round(duration / dt)):
+        steps += shell.update(dt, *WORLD_SIZE, integrator)
+    return steps
+
+
+def distance(shell, other):
+    return math.hypot(shell.center_x - other.center_x, shell.center_y - other.center_y)
+
+
+def test_higher_order_integrators_are_exact_without_drag():
+    expected = make_shell(drag_coef=0)
+    duration = 2
+    x = expected.center_x + expected.velocity_x * duration
+    y = expected.center_y + expected.velocity_y * duration - expected.gravity * duration ** 2 / 2
+    euler, rk4, adaptive = make_shell(drag_coef=0), make_shell(drag_coef=0), make_shell(drag_coef=0)
+    fly(euler, EULER, STEP, duration)
+    fly(rk4, RK4, 0.1, duration)
+    fly(adaptive, ADAPTIVE, duration, duration)
+    assert math.hypot(euler.center_x - x, euler.center_y - y) > 1
+    assert rk4.center_x == pytest.approx(x) and rk4.center_y == pytest.approx(y)
+    assert adaptive.center_x == pytest.approx(x) and adaptive.center_y == pytest.approx(y)
+
+
+def test_adaptive_is_more_accurate_than_euler_in_fewer_steps():
+    duration = 3
+    reference = make_shell()
+    fly(reference, RK4, STEP / 32, duration)
+    euler, adaptive = make_shell(), make_shell()
+    euler_steps = fly(euler, EULER, STEP, duration)
+    adaptive_steps = fly(adaptive, ADAPTIVE, duration, duration)
+    assert distance(adaptive, reference) < distance(euler, reference) / 100
+    assert adaptive_steps < euler_steps / 10
+
+
+def test_adaptive_bounces_off_the_wall():
+    duration = 1.5
+    reference = make_shell((9800, 0), 20, 600)
+    fly(reference, RK4, STEP / 256, duration)
+    adaptive = make_shell((9800, 0), 20, 600)
+    fly(adaptive, ADAPTIVE, duration, duration)
+    assert reference.velocity_x < 0
+    assert adaptive.velocity_x == pytest.approx(reference.velocity_x, rel=1e-4)
+    assert distance(adaptive, reference) < 0.1
+
+
+def test_euler_update_is_the_step_of_the_game():
+    shell = make_shell()
+    x, y, vel_x, vel_y = shell.center_x, shell.center_y, shell.velocity_x, shell.velocity_y
+    shell.update(STEP, *WORLD_SIZE)
+    vel_y_after_gravity = vel_y - shell.gravity * STEP
+    drag = shell.drag_coef * math.hypot(vel_x - shell.wind, vel_y_after_gravity) / shell.mass
+    assert (shell.center_x, shell.center_y) == (x + vel_x * STEP, y + vel_y * STEP)
+    assert shell.velocity_x == vel_x - (vel_x - shell.wind) * drag
+    assert shell.velocity_y == vel_y_after_gravity - vel_y_after_gravity * drag
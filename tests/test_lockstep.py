@@ -0,0 +1,87 @@
+import asyncio
+
+from lockstep import LockstepClient, LockstepHost, controls_player
+
+
+async def wait_for(condition, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('the condition was not met in time')
+
+
+def setup(level, peers=2):
+    return {'type': 'setup', 'settings': {'seed': level}, 'peers': peers, 'level': level}
+
+
+def run(test):
+    async def main():
+        host = LockstepHost('127.0.0.1', 0)
+        await host.start()
+        client = LockstepClient('127.0.0.1', host.port)
+        await client.connect()
+        await wait_for(lambda: host.peers == 2)
+        try:
+            await test(host, client)
+        finally:
+            client.close()
+            host.close()
+    asyncio.run(main())
+
+
+def test_controls_player():
+    assert controls_player(0, 2, 0) and controls_player(1, 2, 1) and controls_player(0, 2, 2)
+    assert not controls_player(1, 2, 0)
+    # a late joiner only watches
+    assert not controls_player(2, 2, 0) and not controls_player(2, 2, 2)
+
+
+def test_early_hash_after_setup_keeps_the_peer_connected():
+    async def test(host, client):
+        host.send(setup(1))
+        client.send({'type': 'hash', 'level': 1, 'turn': 0, 'hash': 5})
+        await asyncio.sleep(0.1)
+        assert host.peers == 2
+        host.send({'type': 'hash', 'turn': 0, 'hash': 5})
+        assert host.desynced == {}
+        host.send({'type': 'input', 'player': 'a', 'player_idx': 0, 'turn': 0, 'power': 50, 'angle': 45})
+        await wait_for(lambda: any(message['type'] == 'input' for message in list(client.messages.queue)))
+    run(test)
+
+
+def test_differing_hash_is_reported():
+    async def test(host, client):
+        host.send(setup(1))
+        host.send({'type': 'hash', 'turn': 0, 'hash': 5})
+        client.send({'type': 'hash', 'level': 1, 'turn': 0, 'hash': 6})
+        await wait_for(lambda: host.desynced == {1: 0})
+        await wait_for(lambda: any(message['type'] == 'desync' for message in list(client.messages.queue)))
+    run(test)
+
+
+def test_hash_of_previous_level_is_ignored():
+    async def test(host, client):
+        host.send(setup(1))
+        host.send(setup(2))
+        host.send({'type': 'hash', 'turn': 0, 'hash': 5})
+        # a late hash of the same turn of the previous level
+        client.send({'type': 'hash', 'level': 1, 'turn': 0, 'hash': 6})
+        client.send({'type': 'hash', 'level': 2, 'turn': 0, 'hash': 5})
+        await asyncio.sleep(0.1)
+        assert host.peers == 2
+        assert host.desynced == {}
+    run(test)
+
+
+def test_input_for_other_peers_player_is_dropped():
+    async def test(host, client):
+        host.send(setup(1))
+        client.send({'type': 'input', 'player': 'a', 'player_idx': 0, 'turn': 0, 'power': 50, 'angle': 45})
+        client.send({'type': 'input', 'player': 'b', 'player_idx': 1, 'turn': 0, 'power': 50, 'angle': 45})
+        client.send({'type': 'input', 'player': 'b', 'player_idx': 1, 'turn': 0, 'power': 60, 'angle': 45})
+        await wait_for(lambda: not host.messages.empty())
+        await asyncio.sleep(0.1)
+        inputs = list(host.messages.queue)
+        assert [(message['player_idx'], message['power']) for message in inputs] == [(1, 50)]
+    run(test)
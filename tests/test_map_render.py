@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from map_render import render_map
+
+RED = (1, 0, 0, 1)
+
+
+def make_player(bbox, traces=()):
+    return SimpleNamespace(color=RED, traces=list(traces), tank=SimpleNamespace(get_collision_bbox=lambda: bbox))
+
+
+def test_terrain_is_drawn_from_the_bottom():
+    image = render_map([[0, 10]] * 50 + [[20, 30]] * 50, (100, 100), (100, 100))
+    assert image.shape == (100, 100, 3)
+    assert (image[-10:, :50] == 255).all() and (image[:-10, :50] == 0).all()
+    assert (image[-30:-20, 50:] == 255).all() and (image[-20:, 50:] == 0).all()
+
+
+def test_tank_is_drawn_as_its_collision_box():
+    image = render_map([[0, 10]] * 100, (100, 100), (100, 100), [make_player((40.5, 10.5, 59.5, 29.5))])
+    red = np.argwhere((image == (255, 0, 0)).all(axis=2))
+    rows, columns = red[:, 0], red[:, 1]
+    assert (columns.min(), columns.max()) == (40, 59)
+    # the rows of the image go down from the top of the world
+    assert (rows.min(), rows.max()) == (100 - 30, 100 - 11)
+    assert len(red) == 20 * 20
+
+
+def test_tank_outside_the_image_is_not_drawn():
+    image = render_map([[0, 10]] * 100, (100, 100), (100, 100), [make_player((40, 150, 60, 170)),
+                                                                 make_player((-40, 20, -20, 40))])
+    assert not (image == (255, 0, 0)).all(axis=2).any()
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from map_validation import MapValidator, find_unreachable
+
+PHYSICS = {'gravity': 200, 'max_muzzle_shell_vel': 750, 'drag_coef': 0.0025, 'max_wind': 10,
+           'explosion_radius': 50, 'shell_mass': 100, 'shell_size': (10, 5)}
+STEP = 1 / 60
+
+
+def get_worker_modules():
+    return 'kivy' in sys.modules, os.path.basename(sys.modules['__main__'].__file__)
+
+
+def wait_for(validator, timeout=10):
+    for _ in range(int(timeout / 0.01)):
+        result = validator.poll()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError('the validation did not finish in time')
+
+
+def test_walled_in_tank_is_unreachable():
+    tops = [100] * 1000
+    assert find_unreachable(tops, [(100, 130), (900, 130)], [(100, 112), (900, 112)], (1000, 1000), PHYSICS,
+                            STEP) == []
+    # a wall higher than the world around the first tank
+    tops[150:160] = [2000] * 10
+    assert find_unreachable(tops, [(100, 130), (900, 130)], [(100, 112), (900, 112)], (1000, 1000), PHYSICS,
+                            STEP) == [0, 1]
+
+
+def test_validator_runs_in_a_worker_without_kivy():
+    validator = MapValidator(10)
+    try:
+        validator.start([100] * 1000, [(100, 130), (900, 130)], [(100, 112), (900, 112)], (1000, 1000), PHYSICS,
+                        STEP)
+        assert validator.running
+        assert wait_for(validator) is True
+        assert not validator.running
+        # the worker imports this module, but not the main module of the parent
+        assert validator._pool.apply(get_worker_modules) == (False, 'map_validation.py')
+    finally:
+        validator.close()
+
+
+def test_validation_over_budget_accepts_the_map():
+    validator = MapValidator(10)
+    try:
+        validator.start([100] * 1000, [(100, 130), (900, 130)], [(100, 112), (900, 112)], (1000, 1000), PHYSICS,
+                        STEP, budget=0)
+        assert wait_for(validator) is True
+    finally:
+        validator.close()
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope='module')
+def menu():
+    import semk4
+    from kivy.lang import Builder
+    from menu import Menu
+
+    Builder.load_file(os.path.join(ROOT, 'se.kv'))
+    menu = Menu(name='menu')
+    menu.player_list = semk4.player_list
+    menu.GRAVITY = semk4.GRAVITY
+    menu.MAX_MUZZLE_SHELL_VEL = semk4.MAX_MUZZLE_SHELL_VEL
+    menu.DRAG_COEFFICIENT = semk4.DRAG_COEFFICIENT
+    menu.SHELL_MASS = semk4.SHELL_MASS
+    menu.WORLD_SCREEN_WIDTH = semk4.WORLD_SCREEN_WIDTH
+    menu.MIN_TANK_SPACING = semk4.MIN_TANK_SPACING
+    return menu
+
+
+def test_update_analysis_shows_the_reach(menu):
+    menu.update_analysis()
+    assert menu._sweep_event is not None
+    while menu._advance_analysis(0):
+        pass
+    assert menu._sweep_event is None
+    assert menu.analysis.text.startswith('Range ')
+
+
+def test_changed_setting_restarts_the_analysis(menu):
+    menu.update_analysis()
+    sweep = menu._sweep
+    menu.gravity_perc.value = 150
+    assert menu._sweep is not sweep
+    while menu._advance_analysis(0):
+        pass
+    assert 'apex' in menu.analysis.text
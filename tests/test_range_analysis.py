@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from projectiles import ADAPTIVE, EULER, RK4, STEP, Shell
+from range_analysis import RangeSweep, fly_shell
+
+
+def run(sweep):
+    while not sweep.advance(1):
+        pass
+    return sweep.get_result()
+
+
+def test_fly_shell_without_drag_lands_at_the_ballistic_range():
+    shell = Shell(None, 1, 45, 300, 100, 200, 0, 0, 0, (0, 0), (0, 0))
+    distance, flight_time, apex, steps = fly_shell(shell, ADAPTIVE, 60)
+    assert distance == pytest.approx(300 ** 2 / 200, rel=1e-6)
+    assert flight_time == pytest.approx(2 * 300 * 2 ** -0.5 / 200, rel=1e-6)
+    assert apex == pytest.approx(300 ** 2 / 2 / 2 / 200, abs=1)
+    assert steps < flight_time / STEP
+
+
+@pytest.mark.parametrize('integrator', [RK4, ADAPTIVE])
+def test_sweep_with_higher_order_integrator_agrees_with_euler(integrator):
+    euler = RangeSweep(200, 750, 0.0025, 100, 5)
+    accurate = RangeSweep(200, 750, 0.0025, 100, 5, integrator)
+    euler_result, accurate_result = run(euler), run(accurate)
+    assert accurate_result.tailwind_range > accurate_result.headwind_range
+    # the Euler steps of the game stray from the exact flight by about half a percent
+    assert accurate_result.tailwind_range == pytest.approx(euler_result.tailwind_range, rel=0.02)
+    assert accurate_result.headwind_range == pytest.approx(euler_result.headwind_range, rel=0.02)
+    assert accurate_result.apex == pytest.approx(euler_result.apex, rel=0.02)
+    assert accurate_result.flight_times[-1] == pytest.approx(euler_result.flight_times[-1], rel=0.02)
+    # the steps of the Euler sweep move all the shells at once, until the longest flight ends
+    assert accurate.steps / len(accurate._shells) < euler.steps / 2
+    assert euler.integrator == EULER
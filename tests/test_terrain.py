@@ -0,0 +1,161 @@
+from types import SimpleNamespace
+
+from kivy.vector import Vector
+
+from collisions import Circle, Rectangle
+from projectiles import ProjectileEngine, Shell
+from terrain import TerrainDelta, TerrainModel
+from terrain_settling import TerrainSettler
+
+WIDTH = 200
+HEIGHT = 100
+
+
+def make_terrain():
+    return TerrainModel([[0, HEIGHT] for _ in range(WIDTH)])
+
+
+def copy_columns(solid_parts):
+    return [list(transitions) for transitions in solid_parts]
+
+
+def settle(terrain, first, last):
+    settler = TerrainSettler(terrain)
+    settler.add_columns(first, last)
+    while settler.active:
+        settler.update(1 / 60)
+
+
+def test_snapshot_is_not_changed_by_explosions_and_settling():
+    terrain = make_terrain()
+    original = copy_columns(terrain.solid_parts)
+    snapshot = terrain.snapshot()
+    # the crater under the surface leaves the terrain above it floating
+    first, last = terrain.explode(Circle((100, 50), 20))
+    settle(terrain, first, last)
+    terrain.explode(Circle((30, HEIGHT), 10))
+    assert terrain.solid_parts != original
+    assert snapshot.get_solid_parts() == original
+    assert snapshot.changed_columns == len(range(first, last + 1)) + 21
+
+
+def test_restored_snapshot_can_be_restored_again():
+    terrain = make_terrain()
+    original = copy_columns(terrain.solid_parts)
+    snapshot = terrain.snapshot()
+    terrain.explode(Circle((100, HEIGHT), 20))
+    assert snapshot.restore() is not None
+    assert terrain.solid_parts == original
+    assert terrain.skyline.tops[100] == HEIGHT
+    terrain.explode(Circle((150, HEIGHT), 20))
+    snapshot.restore()
+    assert terrain.solid_parts == original
+    assert snapshot.restore() is None
+
+
+def test_snapshot_survives_replacing_the_terrain():
+    terrain = make_terrain()
+    original = copy_columns(terrain.solid_parts)
+    snapshot = terrain.snapshot()
+    terrain.set_solid_parts([[0, 10]] * 50)
+    assert snapshot.get_solid_parts() == original
+    snapshot.restore()
+    assert terrain.solid_parts == original
+
+
+def make_shell(center, angle, velocity):
+    return Shell(None, 50, angle, velocity, 100, 200, 0, 0, 10, (4, 2), center)
+
+
+def test_evaluated_shot_leaves_the_terrain_unchanged():
+    terrain = make_terrain()
+    original = copy_columns(terrain.solid_parts)
+    engine = ProjectileEngine()
+    engine.terrain = terrain
+    engine.world_size = (WIDTH, 1000)
+    shell = make_shell((20, HEIGHT + 10), 45, 100)
+    impacts, changed = engine.evaluate(shell, [])
+    assert len(impacts) == 1 and impacts[0].explosion is not None
+    first, last = changed
+    assert first <= impacts[0].explosion.pos.x <= last
+    assert terrain.solid_parts == original
+    assert (shell.center_x, shell.center_y) == (20, HEIGHT + 10)
+    assert engine.shells == []
+
+
+def test_evaluated_shot_hits_the_tank():
+    terrain = make_terrain()
+    engine = ProjectileEngine()
+    engine.terrain = terrain
+    engine.world_size = (WIDTH, 1000)
+    # the ballistic range of the shell is 50
+    bbox = (65, HEIGHT, 75, HEIGHT + 10)
+    shape = Rectangle(Vector(70, HEIGHT + 5), Vector(10, 10), Vector(-5, -5), 0)
+    player = SimpleNamespace(tank=SimpleNamespace(get_collision_bbox=lambda: bbox,
+                                                  get_collision_rectangles=lambda: [shape]))
+    impacts, changed = engine.evaluate(make_shell((20, HEIGHT + 5), 45, 100), [player])
+    assert impacts[0].player is player
+    assert changed is None
+
+
+def test_journal_deltas_round_trip_to_a_copy_of_the_terrain():
+    terrain = make_terrain()
+    copy = []
+    for delta in terrain.journal.since(0):
+        TerrainDelta.decode(delta.encode()).apply(copy)
+    version = terrain.journal.version
+    assert copy == terrain.solid_parts
+
+    terrain.explode(Circle((100, 50), 20))
+    terrain.explode(Circle((30, HEIGHT), 10))
+    terrain.explode(Circle((110, 70), 15))
+    deltas = terrain.journal.since(version)
+    assert [delta.version for delta in deltas] == [version + 1, version + 2, version + 3]
+    for delta in deltas:
+        decoded = TerrainDelta.decode(delta.encode())
+        assert (decoded.version, decoded.first, decoded.last, decoded.reset) == (delta.version, delta.first,
+                                                                                 delta.last, False)
+        decoded.apply(copy)
+    assert copy == terrain.solid_parts
+    assert terrain.journal.since(terrain.journal.version) == []
+
+
+def test_journal_of_replaced_terrain_starts_with_the_reset():
+    terrain = make_terrain()
+    terrain.explode(Circle((100, HEIGHT), 20))
+    terrain.set_solid_parts([[0, 10]] * 50)
+    terrain.explode(Circle((20, 10), 5))
+    deltas = terrain.journal.since(0)
+    assert len(deltas) == 2 and deltas[0].reset
+    copy = [[0, HEIGHT]] * WIDTH
+    for delta in deltas:
+        TerrainDelta.decode(delta.encode()).apply(copy)
+    assert copy == terrain.solid_parts
+
+
+
+def test_slivers_thinner_than_the_min_span_are_dropped():
+    # the crater leaves a sliver 0.5 thick at the bottom of the column
+    crater = Circle((100, 20.5), 20)
+    terrain = make_terrain()
+    terrain.explode(crater)
+    assert terrain.solid_parts[100] == [40.5, HEIGHT]
+    terrain = TerrainModel([[0, HEIGHT] for _ in range(WIDTH)], min_span=0.1)
+    terrain.explode(crater)
+    assert terrain.solid_parts[100] == [0, 0.5, 40.5, HEIGHT]
+
+    # the craters of the shells are compacted with the limits of the engine
+    engine = ProjectileEngine(min_span=0.1)
+    engine.terrain = make_terrain()
+    engine.explosions.add(crater)
+    assert engine.run(0, [])[1] is not None
+    assert engine.terrain.solid_parts[100] == [0, 0.5, 40.5, HEIGHT]
+
+
+def test_columns_are_limited_to_the_max_segments():
+    limited, terrain = TerrainModel([[0, HEIGHT] for _ in range(WIDTH)], max_segments=2), make_terrain()
+    for y in (20, 50, 80):
+        limited.explode(Circle((100, y), 5))
+        terrain.explode(Circle((100, y), 5))
+    assert len(terrain.solid_parts[100]) == 8
+    assert len(limited.solid_parts[100]) == 4
@@ -0,0 +1,126 @@
+import struct
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from terrain_export import StaleStateError, TerrainExport, TerrainReader
+
+
+def make_player(x, y, angle, health):
+    return SimpleNamespace(tank=SimpleNamespace(x=x, y=y, barrel=SimpleNamespace(angle=angle)), health=health)
+
+
+def copy_state(state):
+    return [list(state.solid_parts[x]) for x in range(len(state))], state.get_tank(0), state.wind
+
+
+@pytest.fixture
+def export():
+    export = TerrainExport(4, 8, 1)
+    yield export
+    export.close()
+
+
+def test_reader_reads_the_published_state(export):
+    solid_parts = [[0, 10], [0, 12, 20, 30], [], [0, 5]]
+    export.publish(solid_parts, [make_player(1, 2, 45, 100)], 3)
+    reader = TerrainReader(export.name)
+    try:
+        assert reader.read(copy_state) == (solid_parts, (1, 2, 45, 100), 3)
+    finally:
+        reader.close()
+
+
+def test_reader_follows_the_replaced_block(export):
+    reader = TerrainReader(export.name)
+    try:
+        export.publish([[0, 10]] * 4, [make_player(1, 2, 45, 100)], 0)
+        assert reader.read(copy_state)[0] == [[0, 10]] * 4
+        # more transitions than the block holds, twice
+        export.publish([[0, 10, 20, 30]] * 4, [make_player(1, 2, 45, 100)], 0)
+        solid_parts = [[0, 10, 20, 30]] * 6
+        export.publish(solid_parts, [make_player(1, 2, 45, 100)], 0)
+        assert reader.read(copy_state)[0] == solid_parts
+        assert reader.name != export.name
+        # a new reader attaches to the first block too
+        other = TerrainReader(export.name)
+        assert other.read(copy_state)[0] == solid_parts
+        other.close()
+    finally:
+        reader.close()
+
+
+def test_reader_of_closed_export_raises():
+    export = TerrainExport(4)
+    export.publish([[0, 10]] * 4, [], 0)
+    reader = TerrainReader(export.name)
+    try:
+        export.close()
+        with pytest.raises(StaleStateError):
+            reader.read(copy_state)
+    finally:
+        reader.close()
+
+
+def test_state_published_during_analysis_is_read_again(export):
+    export.publish([[0, 10]] * 4, [make_player(1, 2, 45, 100)], 0)
+    reader = TerrainReader(export.name)
+    calls = []
+
+    def analyze(state):
+        calls.append(state.generation)
+        if len(calls) == 1:
+            # a publication tears the state the first call reads
+            export.publish([[0, 20]] * 2, [make_player(1, 2, 45, 100)], 0)
+        return copy_state(state)
+
+    try:
+        assert reader.read(analyze)[0] == [[0, 20]] * 2
+        assert calls == [2, 4]
+    finally:
+        reader.close()
+
+
+def test_malformed_consistent_state_raises(export):
+    export.publish([[0, 10]] * 4, [], 0)
+    # a width larger than the capacity of the block, with an even generation
+    struct.pack_into('<I', export._shm.buf, 16, 1000)
+    reader = TerrainReader(export.name)
+    try:
+        with pytest.raises(ValueError):
+            reader.read(copy_state)
+    finally:
+        reader.close()
+
+
+def test_concurrent_reads_see_only_whole_states(export):
+    reader = TerrainReader(export.name)
+    done = threading.Event()
+
+    def publish():
+        value = 0
+        while not done.is_set():
+            value += 1
+            # the sizes of the states differ, so a torn state would mix the columns or the headers of two states
+            width = 1 + value % 5
+            export.publish([[value] * (1 + value % 3)] * width, [make_player(value, value, value, value)], value)
+
+    def analyze(state):
+        values = {value for x in range(len(state)) for value in state.solid_parts[x]}
+        values.update(state.get_tank(0))
+        values.add(state.wind)
+        return values, len(state)
+
+    export.publish([[0]], [make_player(0, 0, 0, 0)], 0)
+    writer = threading.Thread(target=publish)
+    writer.start()
+    try:
+        for _ in range(2000):
+            values, width = reader.read(analyze)
+            assert len(values) == 1
+            assert width == 1 + values.pop() % 5
+    finally:
+        done.set()
+        writer.join()
+        reader.close()
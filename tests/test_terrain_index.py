@@ -0,0 +1,169 @@
+import math
+import random
+
+import pytest
+
+from collisions import Circle
+from terrain import TerrainModel
+from terrain_index import NO_TERRAIN, ColumnPyramid, OccupancyMask, Skyline
+
+WIDTH = 100
+HEIGHT = 200
+# steps of the brute force sampling of a segment
+SAMPLES = 4000
+
+
+def make_solid_parts(seed):
+    generator = random.Random(seed)
+    solid_parts = []
+    for _ in range(WIDTH):
+        count = generator.choice((0, 1, 1, 2, 3))
+        transitions = sorted(generator.uniform(0, HEIGHT) for _ in range(2 * count))
+        if count != 0 and generator.random() < 0.5:
+            transitions[0] = 0
+        solid_parts.append(transitions)
+    return solid_parts
+
+
+def is_inside(solid_parts, x, y, eps=1e-6):
+    # column x occupies [x, x + 1], a point on the boundary of two columns is in both
+    for col in {math.floor(x - eps), math.floor(x + eps)}:
+        if 0 <= col < len(solid_parts):
+            transitions = solid_parts[col]
+            for i in range(0, len(transitions), 2):
+                if transitions[i] - eps <= y <= transitions[i + 1] + eps:
+                    return True
+    return False
+
+
+def sample_first_hit(solid_parts, start, end):
+    for i in range(SAMPLES + 1):
+        t = i / SAMPLES
+        x, y = start[0] + (end[0] - start[0]) * t, start[1] + (end[1] - start[1]) * t
+        if 0 <= x < len(solid_parts) and is_inside(solid_parts, x, y, 0):
+            return t
+    return None
+
+
+def get_t(start, end, point):
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    if abs(dx) >= abs(dy):
+        return (point[0] - start[0]) / dx
+    return (point[1] - start[1]) / dy
+
+
+def make_segments(seed, count):
+    generator = random.Random(seed)
+    return [((generator.uniform(-10, WIDTH + 10), generator.uniform(0, HEIGHT + 20)),
+             (generator.uniform(-10, WIDTH + 10), generator.uniform(0, HEIGHT + 20))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_cast_segment_finds_the_first_sampled_hit(seed):
+    solid_parts = make_solid_parts(seed)
+    pyramid = ColumnPyramid(solid_parts)
+    for start, end in make_segments(seed, 200):
+        hit = pyramid.cast_segment(start, end)
+        sampled = sample_first_hit(solid_parts, start, end)
+        if hit is not None:
+            assert is_inside(solid_parts, *hit)
+        if sampled is not None:
+            assert hit is not None
+            # the hit is not after the first sample inside the terrain
+            assert get_t(start, end, hit) <= sampled + 1e-9
+        assert pyramid.line_of_sight(start, end) == (hit is None)
+
+
+def test_cast_ray_and_polyline_agree_with_the_segments():
+    solid_parts = make_solid_parts(7)
+    pyramid = ColumnPyramid(solid_parts)
+    segments = make_segments(7, 100)
+    for start, end in segments:
+        length = math.hypot(end[0] - start[0], end[1] - start[1])
+        direction = ((end[0] - start[0]) * 3, (end[1] - start[1]) * 3)
+        ray_hit = pyramid.cast_ray(start, direction, length)
+        segment_hit = pyramid.cast_segment(start, end)
+        assert (ray_hit is None) == (segment_hit is None)
+        if ray_hit is not None:
+            assert ray_hit == pytest.approx(segment_hit)
+
+    points = [start for start, end in segments[:20]]
+    hits = [pyramid.cast_segment(points[i], points[i + 1]) for i in range(len(points) - 1)]
+    first = next((i for i, hit in enumerate(hits) if hit is not None), None)
+    if first is None:
+        assert pyramid.cast_polyline(points) is None
+    else:
+        assert pyramid.cast_polyline(points) == (hits[first], first)
+    assert pyramid.cast_polyline([(-5, HEIGHT + 10), (WIDTH + 5, HEIGHT + 10), (WIDTH + 5, -5)]) is None
+
+
+def test_casts_see_the_updated_columns():
+    solid_parts = [[0, 10]] * WIDTH
+    pyramid = ColumnPyramid(solid_parts)
+    assert pyramid.line_of_sight((0, 50), (WIDTH, 50))
+    solid_parts = list(solid_parts)
+    solid_parts[60] = [0, 10, 40, 60]
+    pyramid.update(solid_parts, 60, 60)
+    assert pyramid.cast_segment((0, 50), (WIDTH, 50)) == pytest.approx((60, 50))
+    assert pyramid.cast_segment((WIDTH, 50), (0, 50)) == pytest.approx((61, 50))
+    assert not pyramid.line_of_sight((0, 50), (WIDTH, 50))
+
+
+def cell_overlaps_terrain(solid_parts, col, row):
+    transitions = solid_parts[col]
+    return any(transitions[i] <= row + 1 and transitions[i + 1] >= row for i in range(0, len(transitions), 2))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_mask_is_solid_in_the_cells_of_the_terrain(seed):
+    solid_parts = make_solid_parts(seed)
+    terrain = TerrainModel(solid_parts)
+    generator = random.Random(seed)
+    for _ in range(5000):
+        x, y = generator.uniform(-5, WIDTH + 5), generator.uniform(-5, HEIGHT + 5)
+        solid = terrain.is_solid(x, y)
+        # an empty cell is free of terrain, a solid cell overlaps the terrain
+        if 0 <= x < WIDTH and is_inside(solid_parts, x, y, 0):
+            assert solid
+        if solid:
+            assert cell_overlaps_terrain(solid_parts, math.floor(x), math.floor(y))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_mask_any_solid_is_any_solid_cell_of_the_box(seed):
+    mask = OccupancyMask(make_solid_parts(seed))
+    generator = random.Random(seed)
+    for _ in range(300):
+        first = generator.randrange(-5, WIDTH + 5)
+        last = first + generator.randrange(0, 10)
+        min_y = generator.uniform(-5, HEIGHT + 5)
+        max_y = min_y + generator.uniform(0, 10)
+        expected = any(mask.is_solid(col, row) for col in range(first, last + 1)
+                       for row in range(math.floor(min_y), math.floor(max_y) + 1))
+        assert mask.any_solid(first, last, min_y, max_y) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_skyline_surface_and_min_top_are_the_tops_of_the_columns(seed):
+    solid_parts = make_solid_parts(seed)
+    skyline = Skyline(solid_parts)
+    tops = [transitions[-1] if len(transitions) != 0 else NO_TERRAIN for transitions in solid_parts]
+    assert [skyline.surface_at(x) for x in range(-2, WIDTH + 2)] == [NO_TERRAIN] * 2 + tops + [NO_TERRAIN] * 2
+    generator = random.Random(seed)
+    for _ in range(300):
+        first = generator.randrange(-5, WIDTH + 5)
+        last = first + generator.randrange(0, 30)
+        columns = [tops[x] for x in range(max(first, 0), min(last, WIDTH - 1) + 1)]
+        assert skyline.min_top(first, last) == (min(columns) if len(columns) != 0 else NO_TERRAIN)
+        assert skyline.max_top(first, last) == (max(columns) if len(columns) != 0 else NO_TERRAIN)
+
+
+def test_structures_follow_the_explosions():
+    terrain = TerrainModel(make_solid_parts(11))
+    generator = random.Random(11)
+    for _ in range(20):
+        terrain.explode(Circle((generator.uniform(0, WIDTH), generator.uniform(0, HEIGHT)), generator.uniform(2, 20)))
+    rebuilt_skyline, rebuilt_mask = Skyline(terrain.solid_parts), OccupancyMask(terrain.solid_parts)
+    assert terrain.skyline.tops == rebuilt_skyline.tops
+    assert terrain.skyline.min_top(0, WIDTH - 1) == rebuilt_skyline.min_top(0, WIDTH - 1)
+    assert terrain.mask.columns == rebuilt_mask.columns